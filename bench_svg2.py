@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''Usage: bench_svg2.py [-n COUNT] [NAME ...]
+
+Runs the named benchmarks (or all of them if none are named) using COUNT
+shapes or colors each (default 1,000,000) and prints their timings.
+'''
+
+import array
+import asyncio
+import contextlib
+import gzip
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from xml.etree import ElementTree
+
+from svg2 import Color, ColorArray, Svg
+from svg2.Color import _str_for_n
+
+
+def bench_color_str(count):
+    '''Formatting of colors repeated across a document's shapes.'''
+    palette = _palette(256)
+    colors = [random.choice(palette) for _ in range(count)]
+    _timed('color: str() unmemoized', count,
+           lambda: [_str_for_n(color._n) for color in colors])
+    _timed('color: str() memoized', count,
+           lambda: [str(color) for color in colors])
+    svg = Svg()
+    for i, color in enumerate(colors):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=3, fill=color)
+    _timed('color: dumps() circles', count, svg.dumps)
+
+
+def bench_color_core(count):
+    '''Per-operation cost of Color component access, equality and hashing.
+    '''
+    palette = _palette(256)
+    colors = [random.choice(palette) for _ in range(count)]
+    black = Color.BLACK
+    _timed('color: .red', count, lambda: [color.red for color in colors])
+    _timed('color: .alpha', count,
+           lambda: [color.alpha for color in colors])
+    _timed('color: != Color.BLACK', count,
+           lambda: [color != black for color in colors])
+    _timed('color: hash()', count, lambda: [hash(color) for color in colors])
+    _timed('color: Color(r, g, b)', count,
+           lambda: [Color(i & 0xFF, 0x7F, 0) for i in range(count)])
+
+
+def bench_color_space(count):
+    '''Batch color space conversions of colors from a 4096 color palette.
+    '''
+    palette = _palette(4096)
+    colors = ColorArray.from_colors(
+        [random.choice(palette) for _ in range(count)])
+    for name in ('to_hsl', 'to_hsv', 'to_lab', 'luminance'):
+        _timed(f'color space: Color.{name}()', count,
+               lambda: getattr(Color, name)(colors))
+    lab = Color.to_lab(colors)
+    _timed('color space: Color.from_lab()', count,
+           lambda: Color.from_lab(lab))
+
+
+def bench_shape_memory(count):
+    '''Bytes per shape for each shape class (with default styles).'''
+    count = min(count, 200_000)
+    makers = (('Line', lambda i: Svg.Line(i, i, i + 1, i + 1)),
+              ('Rect', lambda i: Svg.Rect(i, i, width=2, height=3)),
+              ('Circle', lambda i: Svg.Circle(i, i, radius=2)),
+              ('Ellipse', lambda i: Svg.Ellipse(i, i, xradius=2, yradius=3)),
+              ('Polyline', lambda i: Svg.Polyline([i, i, i + 1, i + 1])),
+              ('Circle (fill=red)',
+               lambda i: Svg.Circle(i, i, radius=2, fill='red')))
+    for name, make in makers:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        shapes = [make(i) for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del shapes
+        print(f'shape memory: {name:27} {size / count:8.1f} bytes/shape')
+
+
+def bench_style(count):
+    '''dumps() of circles sharing a handful of styles, and with a style
+    each.'''
+    palette = _palette(8)
+    strokes = [Svg.Stroke(color, width=1.5) for color in palette]
+    for label, stroke_for_i in (('8 shared styles', lambda i: strokes[i % 8]),
+                                ('own styles', lambda i: Svg.Stroke(
+                                    palette[i % 8], width=1.5))):
+        svg = Svg()
+        for i in range(count):
+            svg += Svg.Circle(i % 1000, i // 1000, radius=2,
+                              stroke=stroke_for_i(i), fill=palette[i % 7])
+        _timed(f'style: dumps() {label}', count, svg.dumps)
+
+
+def bench_extract_styles(count):
+    '''Output size and dumps() time of circles sharing 5 styles with and
+    without extract_styles.'''
+    palette = _palette(5)
+    strokes = [Svg.Stroke(color, width=1.5, opacity=0.5) for color in palette]
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill=palette[i % 5],
+                          stroke=strokes[-i % 5])
+    for extract_styles in (False, True):
+        options = Svg.Options(extract_styles=extract_styles)
+        _timed(f'extract styles: {extract_styles}', count,
+               lambda: svg.dumps(options=options))
+        size = len(svg.dumps(options=options))
+        print(f'extract styles: {extract_styles} {size / 1e6:24.1f} MB')
+
+
+def bench_stream(count):
+    '''Peak memory and time writing COUNT circles to os.devnull via an Svg
+    and save() vs. via an Svg.Writer.'''
+    def via_svg():
+        svg = Svg()
+        for i in range(count):
+            svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+        svg.save(os.devnull)
+
+    def via_writer():
+        with Svg.Writer(os.devnull) as svg:
+            for i in range(count):
+                svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+
+    for name, function in (('Svg.save()', via_svg),
+                           ('Svg.Writer', via_writer)):
+        tracemalloc.start()
+        _timed(f'stream: {name}', count, function)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'stream: {name} peak {peak / 1e6:22.2f} MB')
+
+
+def bench_chunked(count):
+    '''Writing COUNT circles as UTF-8 shape by shape vs. in chunks, to an
+    unbuffered file, a gzip file and a pipe; and shape by shape to a
+    (buffered) text file.'''
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+    per_shape = Svg.Options(chunk_size=0)
+    chunked = Svg.Options()
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'bench.svg')
+        for kind, opener in (
+                ('text', lambda: open(filename, 'wt', encoding='utf-8')),
+                ('unbuffered', lambda: open(filename, 'wb', buffering=0)),
+                ('gzip', lambda: gzip.open(filename + 'z', 'wb')),
+                ('pipe', _pipe)):
+            for label, options in (('per-shape', per_shape),
+                                   ('chunked', chunked)):
+                def write():
+                    with opener() as out:
+                        svg.write(out, options)
+                _timed(f'chunked: {kind} {label}', count, write)
+
+
+def bench_compress(count):
+    '''Time and size of save() to .svgz of COUNT circles for each
+    compresslevel and number of compress_threads.'''
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+    threads = sorted({1, 2, 4, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'bench.svgz')
+        for compresslevel in (1, 3, 6, 9):
+            for compress_threads in threads:
+                options = Svg.Options(compresslevel=compresslevel,
+                                      compress_threads=compress_threads)
+                _timed(f'compress: level {compresslevel} threads '
+                       f'{compress_threads}', count,
+                       lambda: svg.save(filename, options=options))
+                size = os.path.getsize(filename)
+                print(f'compress: level {compresslevel} threads '
+                      f'{compress_threads} {size / 1e6:17.2f} MB')
+
+
+def bench_parallel(count):
+    '''dumps() of COUNT circles serially and by 2, 4 and CPU count
+    workers.'''
+    palette = _palette(8)
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i / 1000, radius=2, fill=palette[i % 8])
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        options = Svg.Options(workers=workers)
+        _timed(f'parallel: dumps() workers {workers}', count,
+               lambda: svg.dumps(options=options))
+
+
+def bench_dumpb(count):
+    '''Peak memory and time of dumps().encode() vs. dumpb() for COUNT
+    circles.'''
+    svg = Svg('Bytes ©')
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+    for name, function in (
+            ('dumps().encode()', lambda: svg.dumps().encode('utf-8')),
+            ('dumpb()', svg.dumpb),
+            ('dumpb(view=True)', lambda: svg.dumpb(view=True))):
+        _timed(f'dumpb: {name}', count, function)
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'dumpb: {name + " peak":33} {peak / 1e6:8.1f} MB')
+
+
+def bench_load(count):
+    '''Throughput and peak memory of Svg.load() vs. xml.etree parse() and
+    iterparse() (clearing elements as they're read) of a file of COUNT
+    circles.'''
+    palette = _palette(8)
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i / 1000, radius=2, fill=palette[i % 8])
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'bench.svg')
+        svg.save(filename)
+        del svg
+        size = os.path.getsize(filename) / 1e6
+
+        def iterparse():
+            for _, element in ElementTree.iterparse(filename):
+                element.clear()
+
+        for name, function in (
+                ('ElementTree.parse()', lambda: ElementTree.parse(filename)),
+                ('ElementTree.iterparse()', iterparse),
+                ('Svg.load()', lambda: Svg.load(filename))):
+            secs = _timed(f'load: {name}', count, function)
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'load: {name + " MB/sec":33} {size / secs:8.1f} '
+                  f'peak {peak / 1e6:6.1f} MB')
+
+
+def bench_lazy(count):
+    '''Changing 10 of COUNT circles in a file (every 1000th has an id) and
+    saving it using Svg.load() and save() vs. Svg.Lazy().'''
+    palette = _palette(8)
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'bench.svg')
+        with open(filename, 'w', encoding='utf-8') as file:
+            file.write('<svg xmlns="http://www.w3.org/2000/svg">\n')
+            for i in range(count):
+                id = f' id="c{i}"' if i % 1000 == 0 else ''
+                file.write(f'<circle{id} cx="{i % 1000}" cy="{i / 1000}" '
+                           f'r="2" style="fill:{palette[i % 8]}"/>\n')
+            file.write('</svg>\n')
+        size = os.path.getsize(filename) / 1e6
+        ids = [f'c{i}' for i in range(0, count, 1000)]
+        ids = ids[::max(1, len(ids) // 10)][:10]
+        target = os.path.join(folder, 'new.svg')
+
+        def load_and_save():
+            svg = Svg.load(filename)
+            for i in range(0, count, max(1, count // 10))[:10]:
+                svg._shapes[i].radius = 3
+            svg.save(target)
+
+        def open_lazy():
+            with Svg.Lazy(filename) as svg:
+                return len(svg)
+
+        def lazy_and_save():
+            with Svg.Lazy(filename) as svg:
+                for id in ids:
+                    svg.get(id).radius = 3
+                svg.save(target)
+
+        print(f'lazy: {size:.1f} MB file')
+        for name, function in (('Svg.load() and save()', load_and_save),
+                               ('Svg.Lazy()', open_lazy),
+                               ('Svg.Lazy() and save()', lazy_and_save)):
+            _timed(f'lazy: {name}', count, function)
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'lazy: {name + " peak":33} {peak / 1e6:8.1f} MB')
+
+
+def bench_incremental(count):
+    '''dumps() of COUNT circles after changing 10 of them, without and
+    with incremental re-serialization.'''
+    rand = random.Random(1)
+    palette = _palette(8)
+    circles = [Svg.Circle(i % 1000, i // 1000, radius=2,
+                          fill=palette[i % 8]) for i in range(count)]
+    svg = Svg()
+    for circle in circles:
+        svg += circle
+    for incremental in (False, True):
+        options = Svg.Options(incremental=incremental)
+        svg.dumps(options=options)
+
+        def update_and_dumps():
+            for circle in rand.sample(circles, 10):
+                circle.radius = rand.choice((2, 3))
+            svg.dumps(options=options)
+
+        _timed(f'incremental: dumps() {incremental}', count,
+               update_and_dumps)
+    print(f'incremental: {svg.fragments}')
+
+
+def bench_template(count):
+    '''Rendering a dashboard tile (axes, grid, legend, title and 50 bars)
+    by rebuilding and dumpb()'ing it vs. SvgTemplate.render(), by
+    precision; uses up to 10,000 renders.'''
+    count = min(count, 10_000)
+    palette = _palette(5)
+
+    def tile(title, bars):
+        svg = Svg('Tile')
+        svg += Svg.Line(0, 0, 0, 100, stroke='black')
+        svg += Svg.Line(0, 100, 200, 100, stroke='black')
+        for i in range(1, 10):
+            svg += Svg.Line(0, i * 10, 200, i * 10, stroke='lightgray')
+        for i, color in enumerate(palette):
+            svg += Svg.Rect(210, i * 12, width=8, height=8, fill=color)
+            svg += Svg.Text(222, i * 12 + 8, f'Series {i}', fill='black')
+        svg += Svg.Text(100, -5, title, fill='black')
+        svg += bars
+        return svg
+
+    rand = random.Random(1)
+    heights = [rand.uniform(0, 100) for _ in range(50)]
+
+    def bars():
+        return Svg.RectBatch([i * 4 for i in range(50)],
+                             [100 - height for height in heights],
+                             [3] * 50, heights, fill='steelblue')
+
+    for precision in (None, 1):
+        options = Svg.Options(precision=precision)
+        template = Svg.Template(tile(Svg.Slot('title'), Svg.Slot('bars')),
+                                options=options)
+        _timed(f'template: rebuild + dumpb() {precision}', count,
+               lambda: [tile(f'Tile {i}', bars()).dumpb(options=options)
+                        for i in range(count)])
+        _timed(f'template: render() {precision}', count,
+               lambda: [template.render(title=f'Tile {i}', bars=bars())
+                        for i in range(count)])
+
+
+def bench_async(count):
+    '''Time to the first byte, total time, and longest event loop stall of
+    dumps() vs. aiter_bytes() for COUNT circles.'''
+    svg = Svg()
+    for i in range(count):
+        svg += Svg.Circle(i % 1000, i // 1000, radius=2, fill='red')
+
+    async def dumps():
+        yield svg.dumps().encode('utf-8')
+
+    async def measure(chunks):
+        stall = 0
+        done = False
+
+        async def ticker():
+            nonlocal stall
+            last = time.perf_counter()
+            while not done:
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                stall = max(stall, now - last)
+                last = now
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        first = None
+        async for _ in chunks():
+            if first is None:
+                first = time.perf_counter()
+        total = time.perf_counter() - start
+        done = True
+        await task
+        return first - start, total, stall
+
+    for name, chunks in (('dumps()', dumps),
+                         ('aiter_bytes()', svg.aiter_bytes)):
+        first, total, stall = asyncio.run(measure(chunks))
+        print(f'async: {name:14} first byte {first * 1e3:8.1f} ms '
+              f'total {total:6.3f} sec max stall {stall * 1e3:8.1f} ms')
+
+
+@contextlib.contextmanager
+def _pipe():
+    process = subprocess.Popen(['cat'], stdin=subprocess.PIPE,
+                               stdout=subprocess.DEVNULL)
+    try:
+        yield process.stdin
+    finally:
+        process.stdin.close()
+        process.wait()
+
+
+def bench_batch(count):
+    '''Memory and dumps() time of circles as shapes vs. as a CircleBatch.
+    '''
+    rand = random.Random(1)
+    xs = [rand.randrange(1000) for _ in range(count)]
+    ys = [rand.uniform(0, 1000) for _ in range(count)]
+    for name, make in (
+            ('Circle', lambda: [Svg.Circle(x, y, radius=3, fill='red')
+                                for x, y in zip(xs, ys)]),
+            ('CircleBatch', lambda: [Svg.CircleBatch(xs, ys, [3] * count,
+                                                     fill='red')])):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        shapes = make()
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print(f'batch: {name:33} {size / count:8.1f} bytes/shape')
+        svg = Svg()
+        for shape in shapes:
+            svg += shape
+        _timed(f'batch: dumps() {name}', count, svg.dumps)
+
+
+def bench_polyline(count):
+    '''Filling and writing a Polyline of COUNT vertices.'''
+    rand = random.Random(1)
+    coords = array.array('d', (rand.uniform(0, 1000)
+                               for _ in range(count * 2)))
+    polyline = Svg.Polyline()
+    _timed('polyline: add()', count,
+           lambda: [polyline.add(x, y)
+                    for x, y in zip(coords[::2], coords[1::2])])
+    _timed('polyline: set() array', count, lambda: polyline.set(coords))
+    _timed('polyline: set() memoryview', count,
+           lambda: polyline.set(memoryview(coords)))
+    _timed('polyline: set() list', count,
+           lambda: polyline.set(coords.tolist()))
+    svg = Svg()
+    svg += polyline
+    _timed('polyline: dumps()', count, svg.dumps)
+    _timed('polyline: dumps() coord_comma', count,
+           lambda: svg.dumps(options=Svg.Options(coord_comma=True)))
+
+
+def bench_precision(count):
+    '''Output size and dumps() time of a point-heavy document (a Polyline
+    and a CircleBatch with COUNT vertices and circles) by precision.'''
+    rand = random.Random(1)
+    svg = Svg()
+    svg += Svg.Polyline(array.array('d', (rand.uniform(0, 1000)
+                                          for _ in range(count * 2))))
+    svg += Svg.CircleBatch([rand.uniform(0, 1000) for _ in range(count)],
+                           [rand.uniform(0, 1000) for _ in range(count)],
+                           [rand.choice((2, 2.5, 3)) for _ in range(count)])
+    for precision in (None, 3, 2, 1):
+        options = Svg.Options(precision=precision)
+        size = len(svg.dumps(options=options))
+        _timed(f'precision: dumps() {precision} ({size / 1e6:.1f} MB)',
+               count, lambda: svg.dumps(options=options))
+
+
+def _palette(size, seed=1):
+    rand = random.Random(seed)
+    return [Color(rand.randrange(256), rand.randrange(256),
+                  rand.randrange(256)) for _ in range(size)]
+
+
+def _timed(label, count, function):
+    start = time.perf_counter()
+    function()
+    secs = time.perf_counter() - start
+    print(f'{label:40} {secs:8.3f} sec {secs * 1e9 / count:10.1f} ns/item')
+    return secs
+
+
+BENCHMARKS = {name[6:]: function for name, function in globals().items()
+              if name.startswith('bench_')}
+
+
+def main():
+    args = sys.argv[1:]
+    count = 1_000_000
+    if args[:1] in (['-h'], ['--help']):
+        raise SystemExit(__doc__)
+    if args[:1] == ['-n']:
+        count = int(args[1])
+        args = args[2:]
+    for name in args or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise SystemExit(f'unknown benchmark {name!r}: use one of: '
+                             f'{" ".join(BENCHMARKS)}')
+        BENCHMARKS[name](count)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,20 +2,32 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-from .Color import Color
+import operator
+
 from .Fill import Fill
 from .Stroke import Stroke
 
 
 class AbstractShape:
 
+    __slots__ = ('_css_classes', '_css_style', '_fragment')
+
+    def __init_subclass__(Class, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Class._get_values = _values_getter(Class) # used by _state()
+
+
     def __init__(self):
-        self._css_classes = []
-        self._css_style = {}
+        self._css_classes = None # created on demand by add_css_class()
+        self._css_style = None # created on demand by add_css_style()
+        self._fragment = None # set by _fragment_svg()
 
 
     def add_css_style(self, name, value):
+        if self._css_style is None:
+            self._css_style = {}
         self._css_style[name] = value
+        self._fragment = None
 
 
     def css_style(self, sep): # TODO accept options and do sep better
@@ -28,8 +40,11 @@ class AbstractShape:
 
 
     def add_css_class(self, css_class):
+        if self._css_classes is None:
+            self._css_classes = []
         if css_class not in self._css_classes:
             self._css_classes.append(css_class)
+            self._fragment = None
             return True
         return False
 
@@ -42,8 +57,52 @@ class AbstractShape:
         return ''
 
 
+    def _fragment_svg(self, indent, options):
+        # Returns the shape's SVG and whether it was reused: the fragment
+        # cached by the previous call is reused if the options and indent
+        # are the same and the shape's state hasn't changed since. Changes
+        # made in place (e.g., by add_css_class()) also clear the fragment.
+        # Equal ints and floats (e.g., 2 and 2.0) are only written
+        # differently if precision is None and strip_zeros is False, so
+        # only then must the attributes' values be the same objects.
+        state = self._state()
+        fragment = self._fragment
+        if (fragment is not None and fragment[0] is options and
+                fragment[1] == indent and fragment[2] == state and
+                (options.strip_zeros or options.precision is not None or
+                 all(map(operator.is_, fragment[2][0], state[0])))):
+            return fragment[3], True
+        text = self.svg(indent, options)
+        self._fragment = (options, indent, state, text)
+        return text, False
+
+
+    def _state(self):
+        # Returns the values of the shape's attributes and the versions of
+        # its unshared (changeable) styles
+        return (self._get_values(self), self._versions())
+
+
+    def _versions(self):
+        return tuple(style._version for style in self._iter_styles()
+                     if style is not None and not style._shared)
+
+
+def _values_getter(Class):
+    # Returns an attrgetter of the values of all the Class's slots (except
+    # the fragment that keeps them)
+    names = []
+    for Base in Class.__mro__:
+        slots = getattr(Base, '__slots__', ())
+        names += [slots] if isinstance(slots, str) else slots
+    return operator.attrgetter(*(name for name in names
+                                 if name not in {'_fragment', '__weakref__'}))
+
+
 class AbstractStroke(AbstractShape):
 
+    __slots__ = ('_stroke',)
+
     def __init__(self, stroke=None):
         super().__init__()
         self.stroke = stroke
@@ -51,27 +110,68 @@ class AbstractStroke(AbstractShape):
 
     @property
     def stroke(self):
-        return self._stroke
+        stroke = self._stroke
+        return _STROKE if stroke is None else stroke
 
 
     @stroke.setter
     def stroke(self, stroke):
-        '''Can set with a Stroke, Color, or color string.'''
-        if stroke is None:
-            stroke = Stroke()
-        elif isinstance(stroke, str):
-            stroke = Stroke(Color(stroke))
-        elif isinstance(stroke, Color):
-            stroke = Stroke(stroke)
-        self._stroke = stroke
+        '''Can set with a Stroke, Color, or color string.
+        Use None for the default stroke.
+
+        Shapes whose stroke is set from the same Color or color string share
+        one Stroke (see `Stroke.intern()`), as do those with the default
+        stroke. A shared Stroke can't be changed: use `own_stroke()` to get
+        a Stroke that can.'''
+        if stroke is not None and not isinstance(stroke, Stroke):
+            stroke = Stroke.intern(stroke)
+        self._stroke = stroke # if None use _STROKE until own one is needed
+
+
+    def own_stroke(self):
+        '''Returns the shape's Stroke for changing, first giving the shape
+        its own copy if its Stroke is shared.'''
+        stroke = self._stroke
+        if stroke is None or stroke._shared: # copy on write
+            stroke = self._stroke = self.stroke.copy()
+        return stroke
 
 
     def svg(self, options):
-        return self.stroke.svg(options)
+        stroke = self._stroke
+        return (_STROKE if stroke is None else stroke).svg(options)
+
+
+    def _style_svg(self, options):
+        # Returns the class and style (or stroke) attributes text
+        stroke = self._stroke
+        if stroke is None:
+            stroke = _STROKE
+        if self._css_style or self._css_classes:
+            return _attributes(self._css_classes, stroke.svg(options),
+                               self.css_style(options.sep), options)
+        return _style_svg(stroke, None, options)
+
+
+    def _add_style_classes(self, options):
+        self._style_svg(options) # adds any new style to style_classes
+
+
+    def _iter_styles(self):
+        yield self._stroke
+
+
+    def _versions(self):
+        stroke = self._stroke
+        if stroke is None or stroke._shared:
+            return ()
+        return (stroke._version,)
 
 
 class AbstractStrokeFill(AbstractStroke):
 
+    __slots__ = ('_fill',)
+
     def __init__(self, stroke=None, fill=None):
         super().__init__(stroke)
         self.fill = fill # Fill
@@ -79,35 +179,171 @@ class AbstractStrokeFill(AbstractStroke):
 
     @property
     def fill(self):
-        return self._fill
+        fill = self._fill
+        return _FILL if fill is None else fill
 
 
     @fill.setter
     def fill(self, fill):
         '''Can set with a Fill, Color, or color string.
-        Use 'none' for transparent.
+        Use 'none' for transparent and None for the default fill.
+
+        Shapes whose fill is set from the same Color or color string share
+        one Fill (see `Fill.intern()`), as do those with the default fill.
+        A shared Fill can't be changed: use `own_fill()` to get a Fill that
+        can.
         '''
-        if fill is None:
-            fill = Fill()
-        elif isinstance(fill, str):
-            fill = Fill(Color(fill))
-        elif isinstance(fill, Color):
-            fill = Fill(fill)
-        self._fill = fill
+        if fill is not None and not isinstance(fill, Fill):
+            fill = Fill.intern(fill)
+        self._fill = fill # if None use _FILL until own one is needed
+
+
+    def own_fill(self):
+        '''Returns the shape's Fill for changing, first giving the shape its
+        own copy if its Fill is shared.'''
+        fill = self._fill
+        if fill is None or fill._shared: # copy on write
+            fill = self._fill = self.fill.copy()
+        return fill
 
 
     def svg(self, options):
-        stroke = self.stroke.svg(options)
-        fill = self.fill.svg(options)
-        if stroke and fill:
-            sep = f';{options.sep}' if options.use_style else ' '
-            return stroke + sep + fill
-        return stroke + fill # one or both are ''
+        return _stroke_fill_svg(self._stroke, self._fill, options)
+
+
+    def _style_svg(self, options):
+        # Returns the class and style (or stroke and fill) attributes text
+        if self._css_style or self._css_classes:
+            return _attributes(
+                self._css_classes,
+                _stroke_fill_svg(self._stroke, self._fill, options),
+                self.css_style(options.sep), options)
+        stroke = self._stroke
+        fill = self._fill
+        return _style_svg(_STROKE if stroke is None else stroke,
+                          _FILL if fill is None else fill, options)
+
+
+    def _iter_styles(self):
+        yield self._stroke
+        yield self._fill
+
+
+    def _versions(self):
+        stroke = self._stroke
+        fill = self._fill
+        if (stroke is None or stroke._shared) and (fill is None or
+                                                   fill._shared):
+            return () # the usual case
+        return AbstractShape._versions(self)
 
 
 class AbstractPositionStrokeFill(AbstractStrokeFill):
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y, stroke=None, fill=None):
         super().__init__(stroke, fill)
         self.x = x
         self.y = y
+
+
+# Shapes that use the default stroke or fill share these and only get their
+# own if own_stroke() or own_fill() is called. Being shared these can't be
+# changed.
+_STROKE = Stroke.intern(Stroke())
+_FILL = Fill.intern(Fill())
+
+
+def _stroke_fill_svg(stroke, fill, options):
+    stroke = (_STROKE if stroke is None else stroke).svg(options)
+    fill = (_FILL if fill is None else fill).svg(options)
+    if stroke and fill:
+        sep = f';{options.sep}' if options.use_style else ' '
+        return stroke + sep + fill
+    return stroke + fill # one or both are ''
+
+
+class _StyleCache:
+
+    __slots__ = ('options', 'svgs')
+
+    def __init__(self):
+        self.options = None
+        # key: (stroke, fill or None); value: (_svg() text, stroke._version,
+        # fill._version or None)
+        self.svgs = {}
+
+
+_style_cache = _StyleCache()
+_STYLE_CACHE_SIZE = 0x10000
+
+
+def _style_svg(stroke, fill, options):
+    # Returns the _svg() text for the stroke and fill (None for shapes
+    # without a fill, e.g., Lines), memoized for the most recent options.
+    # Entries are only valid if the stroke and fill haven't been changed
+    # since, i.e., if they still have the versions the entry was made with.
+    cache = _style_cache
+    if cache.options is not options:
+        cache.options = options
+        cache.svgs = {}
+    key = (stroke, fill)
+    fill_version = None if fill is None else fill._version
+    entry = cache.svgs.get(key)
+    if (entry is None or entry[1] != stroke._version or
+            entry[2] != fill_version):
+        if len(cache.svgs) >= _STYLE_CACHE_SIZE:
+            cache.svgs.clear()
+        text = (stroke.svg(options) if fill is None else
+                _stroke_fill_svg(stroke, fill, options))
+        entry = cache.svgs[key] = (_attributes(None, text, '', options),
+                                   stroke._version, fill_version)
+    return entry[0]
+
+
+def _attributes(css_classes, svg, css_style, options):
+    # Returns the class and style attributes text (or the class and stroke
+    # and fill attributes text). If the options have style_classes the
+    # stroke and fill style is replaced by its class, with a new class
+    # name generated for any new style.
+    style_classes = options.style_classes
+    if style_classes is not None and svg:
+        name = style_classes.get(svg)
+        if name is None:
+            name = style_classes[svg] = _class_name(len(style_classes))
+        css_classes = (css_classes or []) + [name]
+        svg = ''
+    if css_classes:
+        classes = ' '.join(css_classes)
+        return f' class="{classes}"' + _svg(options.use_style, svg,
+                                            css_style)
+    return _svg(options.use_style, svg, css_style)
+
+
+def _svg(use_style, svg, css_style):
+    if use_style:
+        if svg and css_style:
+            svg = svg + '; ' + css_style
+        else:
+            svg = svg + css_style
+        return f' style="{svg}"' if svg else ''
+    if not svg:
+        return ''
+    return svg if svg.startswith((' ', ';')) else f' {svg}'
+
+
+def _class_name(i):
+    # Returns a short class name that won't clash with those users add:
+    # svg2-s0 ... svg2-s9, svg2-sa ... svg2-sz, svg2-s10 ...
+    digits = []
+    while True:
+        i, digit = divmod(i, 36)
+        digits.append(_DIGITS[digit])
+        if not i:
+            break
+    return _CLASS_PREFIX + ''.join(reversed(digits))
+
+
+_CLASS_PREFIX = 'svg2-s'
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
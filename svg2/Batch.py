@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import array
+import itertools
+
+from . import AbstractShape
+from .Color import Color
+from .Fill import Fill
+from .Number import nums
+from .AbstractShape import _attributes
+from .Shape import (WriteMixin, _doubles, _extend_doubles,
+                    _extended_ints, _int_flags, _int_texts, _is_int)
+from .Stroke import Stroke
+from .SvgError import SvgError
+
+
+class _Batch(AbstractShape.AbstractShape, WriteMixin):
+    '''A batch holds many shapes of one kind as columns of numbers (each an
+    array('d')) rather than as one object per shape, and writes exactly the
+    same SVG as the equivalent individual shapes would.
+
+    A batch's stroke (and fill) is either shared by all its shapes (a
+    Stroke, Color, or color string, or None for the default), or is given
+    per shape as a sequence of Strokes, Colors, color strings, or Nones
+    (e.g., a list or a ColorArray) with one item for each shape.
+
+    Column arguments may be any sequences of numbers; NumPy float64 arrays
+    (and anything else supporting the buffer protocol with C doubles) are
+    copied in without creating Python floats.
+    '''
+
+    __slots__ = ('_columns', '_ints', '_strokes', '_fills')
+
+    _TAG = ''
+    _ATTRS = '' # format string with one {} per column
+    _CHUNK_SIZE = 10_000 # shapes per out.write() in write()
+
+    def __init__(self, columns, stroke, fill):
+        super().__init__()
+        columns = [column if hasattr(column, '__len__') else list(column)
+                   for column in columns]
+        self._columns = tuple(_doubles(column) for column in columns)
+        self._ints = [_int_flags(column) for column in columns]
+        size = len(self._columns[0])
+        if any(len(column) != size for column in self._columns[1:]):
+            raise SvgError('all the columns must be the same length, got '
+                           f'{[len(column) for column in self._columns]}')
+        self._strokes = _styles(Stroke, stroke, size, 'stroke')
+        self._fills = _styles(Fill, fill, size, 'fill')
+
+
+    def __len__(self):
+        return len(self._columns[0])
+
+
+    def _add(self, values, stroke, fill):
+        self._check_styles(stroke, fill, False)
+        self._fragment = None
+        for index, (column, value) in enumerate(zip(self._columns, values)):
+            column.append(value)
+            self._ints[index] = _extended_ints(
+                self._ints[index], len(column) - 1,
+                array.array('b', (1,)) if _is_int(value) else None, 1)
+        if isinstance(self._strokes, list):
+            self._strokes.append(_style(Stroke, stroke))
+        if isinstance(self._fills, list):
+            self._fills.append(_style(Fill, fill))
+
+
+    def _extend(self, columns, strokes, fills):
+        self._check_styles(strokes, fills, True)
+        columns = [column if hasattr(column, '__len__') else list(column)
+                   for column in columns]
+        size = len(columns[0])
+        if any(len(column) != size for column in columns[1:]):
+            raise SvgError('all the columns must be the same length, got '
+                           f'{[len(column) for column in columns]}')
+        if isinstance(self._strokes, list):
+            strokes = _styles(Stroke, strokes, size, 'stroke')
+        if isinstance(self._fills, list):
+            fills = _styles(Fill, fills, size, 'fill')
+        self._fragment = None
+        for index, (doubles, column) in enumerate(zip(self._columns,
+                                                      columns)):
+            _extend_doubles(doubles, column)
+            self._ints[index] = _extended_ints(
+                self._ints[index], len(doubles) - size, _int_flags(column),
+                size)
+        if isinstance(self._strokes, list):
+            self._strokes += strokes
+        if isinstance(self._fills, list):
+            self._fills += fills
+
+
+    def _check_styles(self, stroke, fill, many):
+        for styles, style, name in ((self._strokes, stroke, 'stroke'),
+                                    (self._fills, fill, 'fill')):
+            if style is not None and not isinstance(styles, list):
+                raise SvgError(f'this batch\'s {name} is shared by all its '
+                               'shapes')
+            if many and style is None and isinstance(styles, list):
+                raise SvgError(f'this batch needs a {name} for each shape')
+
+
+    def _iter_styles(self):
+        for styles in (self._strokes, self._fills):
+            if isinstance(styles, list):
+                yield from styles
+            else:
+                yield styles
+
+
+    def svg(self, indent, options):
+        return ''.join(self._iter_svg(indent, options))
+
+
+    def write(self, out, indent, options):
+        for chunk in self._iter_svg(indent, options):
+            out.write(chunk)
+
+
+    def _iter_write(self, out, indent, options, slice_size):
+        # Writes the shapes slice_size at a time, yielding how many were
+        # written after each slice (see aiter_bytes())
+        for i, chunk in enumerate(self._iter_svg(indent, options,
+                                                 slice_size)):
+            out.write(chunk)
+            yield min(slice_size, len(self) - i * slice_size)
+
+
+    def _iter_svg(self, indent, options, chunk_size=None):
+        # Yields the SVG of up to chunk_size (default _CHUNK_SIZE) shapes at
+        # a time
+        if chunk_size is None:
+            chunk_size = self._CHUNK_SIZE
+        start = f'{indent}<{self._TAG}{self._ATTRS}'
+        css_style = self.css_style(options.sep)
+        end = f'/>{options.nl}'
+        strokes = self._strokes
+        fills = self._fills
+        shared = (not isinstance(strokes, list) and
+                  not isinstance(fills, list))
+        if shared:
+            tail = self._tail(strokes, fills, css_style, end, options).replace(
+                '{', '{{').replace('}', '}}')
+            format = (start + tail).format
+        else:
+            format = (start + '{}').format
+            tails = {} # key: (stroke, fill); value: tail text
+        size = len(self)
+        as_ints = options.precision is None and not options.strip_zeros
+        for i in range(0, size, chunk_size):
+            j = i + chunk_size
+            texts = [nums(column[i:j], options)
+                     for column in self._columns]
+            if as_ints: # else ints and integral floats are written alike
+                for text, column, ints in zip(texts, self._columns,
+                                              self._ints):
+                    if ints is not None:
+                        _int_texts(text, column, ints, i)
+            if shared:
+                yield ''.join(map(format, *texts))
+            else:
+                chunk = []
+                for stroke, fill in zip(
+                        strokes[i:j] if isinstance(strokes, list) else
+                        itertools.repeat(strokes, min(j, size) - i),
+                        fills[i:j] if isinstance(fills, list) else
+                        itertools.repeat(fills, min(j, size) - i)):
+                    tail = tails.get((stroke, fill))
+                    if tail is None:
+                        tail = tails[stroke, fill] = self._tail(
+                            stroke, fill, css_style, end, options)
+                    chunk.append(tail)
+                yield ''.join(map(format, *texts, chunk))
+
+
+    def _tail(self, stroke, fill, css_style, end, options):
+        return _attributes(self._css_classes,
+                           self._svg(stroke, fill, options), css_style,
+                           options) + end
+
+
+    def _add_style_classes(self, options):
+        strokes = self._strokes
+        fills = self._fills
+        if not isinstance(strokes, list):
+            strokes = itertools.repeat(strokes, len(self))
+        if not isinstance(fills, list):
+            fills = itertools.repeat(fills, len(self))
+        for stroke, fill in dict.fromkeys(zip(strokes, fills)):
+            _attributes(None, self._svg(stroke, fill, options), '', options)
+
+
+    def _svg(self, stroke, fill, options):
+        return AbstractShape._stroke_fill_svg(stroke, fill, options)
+
+
+class CircleBatch(_Batch):
+
+    __slots__ = ()
+
+    _TAG = 'circle'
+    _ATTRS = ' cx="{}" cy="{}" r="{}"'
+
+    def __init__(self, xs=(), ys=(), radii=(), *, stroke=None, fill=None):
+        '''A batch of circles, e.g., for a scatter plot.
+        The stroke can be a Stroke, Color, or color string (e.g., 'red',
+        '#ABC123') shared by all the circles, or a sequence with a stroke
+        for each circle. Similarly for the fill.'''
+        super().__init__((xs, ys, radii), stroke, fill)
+
+
+    def add(self, x, y, radius, *, stroke=None, fill=None):
+        '''Adds a circle; its stroke and fill may only be given if the
+        batch has a stroke and fill for each shape.'''
+        self._add((x, y, radius), stroke, fill)
+
+
+    def extend(self, xs, ys, radii, *, strokes=None, fills=None):
+        '''Adds a circle for each x, y, and radius; strokes and fills are
+        needed if (and only if) the batch has a stroke and fill for each
+        shape.'''
+        self._extend((xs, ys, radii), strokes, fills)
+
+
+class RectBatch(_Batch):
+
+    __slots__ = ()
+
+    _TAG = 'rect'
+    _ATTRS = ' x="{}" y="{}" width="{}" height="{}"'
+
+    def __init__(self, xs=(), ys=(), widths=(), heights=(), *, stroke=None,
+                 fill=None):
+        '''A batch of rectangles, e.g., for a bar chart or grid.
+        The stroke can be a Stroke, Color, or color string (e.g., 'red',
+        '#ABC123') shared by all the rectangles, or a sequence with a stroke
+        for each rectangle. Similarly for the fill.'''
+        super().__init__((xs, ys, widths, heights), stroke, fill)
+
+
+    def add(self, x, y, width, height, *, stroke=None, fill=None):
+        '''Adds a rectangle; its stroke and fill may only be given if the
+        batch has a stroke and fill for each shape.'''
+        self._add((x, y, width, height), stroke, fill)
+
+
+    def extend(self, xs, ys, widths, heights, *, strokes=None, fills=None):
+        '''Adds a rectangle for each x, y, width, and height; strokes and
+        fills are needed if (and only if) the batch has a stroke and fill
+        for each shape.'''
+        self._extend((xs, ys, widths, heights), strokes, fills)
+
+
+class LineBatch(_Batch):
+
+    __slots__ = ()
+
+    _TAG = 'line'
+    _ATTRS = ' x1="{}" y1="{}" x2="{}" y2="{}"'
+
+    def __init__(self, x1s=(), y1s=(), x2s=(), y2s=(), *, stroke=None):
+        '''A batch of lines, e.g., for a network's edges.
+        The stroke can be a Stroke, Color, or color string (e.g., 'red',
+        '#ABC123') shared by all the lines, or a sequence with a stroke for
+        each line.'''
+        super().__init__((x1s, y1s, x2s, y2s), stroke, None)
+
+
+    def add(self, x1, y1, x2, y2, *, stroke=None):
+        '''Adds a line; its stroke may only be given if the batch has a
+        stroke for each line.'''
+        self._add((x1, y1, x2, y2), stroke, None)
+
+
+    def extend(self, x1s, y1s, x2s, y2s, *, strokes=None):
+        '''Adds a line for each x1, y1, x2, and y2; strokes are needed if
+        (and only if) the batch has a stroke for each line.'''
+        self._extend((x1s, y1s, x2s, y2s), strokes, None)
+
+
+    def _iter_styles(self):
+        if isinstance(self._strokes, list):
+            yield from self._strokes
+        else:
+            yield self._strokes
+
+
+    def _svg(self, stroke, fill, options):
+        return (AbstractShape._STROKE if stroke is None else
+                stroke).svg(options)
+
+
+def _styles(Class, style, size, name):
+    # Returns None for the default style, a shared Stroke or Fill, or a list
+    # with an interned Stroke or Fill (or None) for each shape
+    if style is None or isinstance(style, Class):
+        return style # an explicit Stroke or Fill is used as is
+    if isinstance(style, (str, Color)):
+        return Class.intern(style)
+    styles = [_style(Class, item) for item in style]
+    if len(styles) != size:
+        raise SvgError(f'expected a {name} for each of the {size:,} '
+                       f'shapes, got {len(styles):,}')
+    return styles
+
+
+def _style(Class, style):
+    return None if style is None else Class.intern(style)
@@ -11,14 +11,18 @@ _CURRENTCOLOR = -2
 _URI = -3
 
 
-class Color(tuple):
+class Color:
     '''Holds an RGBA color with each component 0-255 as a single int or a
-    uri for a gradient or pattern.'''
+    uri for a gradient or pattern.
 
-    __slots__ = ()
+    Colors are immutable.'''
+
+    __slots__ = ('_n', '_uri')
 
     Rgb = collections.namedtuple('Rgb', 'red green blue')
     Rgba = collections.namedtuple('Rgba', 'red green blue alpha')
+    CacheInfo = collections.namedtuple('CacheInfo',
+                                       'hits misses maxsize size')
 
     def __new__(Class, color_or_red, green=0, blue=0, alpha=255):
         '''Returns a Color or raises an SvgError.
@@ -47,6 +51,10 @@ class Color(tuple):
         All the methods that access color components (rgb..., alpha, red,
         ...) will raise an SvgError if the color is `NONE`, `CURRENTCOLOR`
         or a gradient or pattern.
+
+        If the parse cache is enabled (see `Color.set_cache_size()`),
+        constructing a Color from a string that has been seen recently
+        returns the very same (immutable) Color.
         '''
         if isinstance(color_or_red, int):
             if color_or_red < 0:
@@ -54,17 +62,31 @@ class Color(tuple):
                     uri = 'none'
                 elif color_or_red == _CURRENTCOLOR:
                     uri = 'currentColor'
-                return super().__new__(Class, (color_or_red, uri))
+                return _new(Class, color_or_red, uri)
             if (0 <= color_or_red < 256 and 0 <= green < 256 and
                     0 <= blue < 256 and 0 <= alpha < 256):
-                return super().__new__(
-                    Class, (_int_for_rgba(color_or_red, green, blue, alpha),
-                            None))
+                color = object.__new__(Class)
+                try:
+                    _set_n(color, (color_or_red << 24) | (green << 16) |
+                           (blue << 8) | alpha)
+                except TypeError: # e.g., a float component
+                    _set_n(color, _int_for_rgba(
+                        round(color_or_red), round(green), round(blue),
+                        round(alpha)))
+                _set_uri(color, None)
+                return color
             raise SvgError(f'out of range color value: ({color_or_red!r},'
                            f'{green!r},{blue!r},{alpha!r})')
+        if Class is Color and _cache.maxsize:
+            return _cache.get(color_or_red)
+        return Class._parse(color_or_red)
+
+
+    @classmethod
+    def _parse(Class, color_or_red):
         color = ''.join(color_or_red.strip().split()).lower()
         if color.startswith('url('):
-            return super().__new__(Class, (_URI, color[4:].rstrip(')')))
+            return _new(Class, _URI, color[4:].rstrip(')'))
         if color.startswith(('rgba(', 'rgb(')):
             FACTOR = 255 / 100.0
             i = color.find('(')
@@ -89,7 +111,7 @@ class Color(tuple):
                     raise SvgError(
                         f'out of range alpha value: {color_or_red!r}')
                 values[-1] = round(255.0 * value)
-            return super().__new__(Class, (_int_for_rgba(*values), None))
+            return _new(Class, _int_for_rgba(*values))
         if color.startswith('#'):
             h = color[1:]
             for c in h:
@@ -109,25 +131,56 @@ class Color(tuple):
             else:
                 n = _int_for_rgba(int(h[:2], 16), int(h[2:4], 16),
                                   int(h[4:6], 16), int(h[6:8], 16))
-            return super().__new__(Class, (n, None))
+            return _new(Class, n)
         if color in {'none', 'transparent'}:
-            return super().__new__(Class, (_TRANSPARENT, 'none'))
+            return _new(Class, _TRANSPARENT, 'none')
         if color == 'currentcolor':
-            return super().__new__(Class, (_CURRENTCOLOR, 'currentColor'))
+            return _new(Class, _CURRENTCOLOR, 'currentColor')
         values = _color_for_name(color_or_red)
         if values is None:
             raise SvgError(f'invalid color: {color_or_red!r}')
-        return super().__new__(Class, (_int_for_rgba(*values), None))
+        return _new(Class, _int_for_rgba(*values))
 
 
-    @property
-    def _n(self):
-        return super().__getitem__(0)
+    @staticmethod
+    def set_cache_size(maxsize):
+        '''Sets the maximum number of color strings whose parsed Colors are
+        kept in the parse cache.
 
+        The cache is off by default (`maxsize=0`). When it is on, the least
+        recently used entry is evicted once `maxsize` is reached. Setting a
+        smaller size evicts entries as necessary; setting it to 0 turns the
+        cache off and clears it.
+
+        See also `cache_info()` and `cache_clear()`.'''
+        if maxsize < 0:
+            raise SvgError(f'invalid cache size: {maxsize!r}')
+        _cache.resize(maxsize)
+
+
+    @staticmethod
+    def cache_info():
+        '''Returns a Color.CacheInfo namedtuple of the parse cache's hits,
+        misses, maxsize, and current size.'''
+        return Color.CacheInfo(_cache.hits, _cache.misses, _cache.maxsize,
+                               len(_cache.colors))
+
+
+    @staticmethod
+    def cache_clear():
+        '''Empties the parse cache and resets its hit and miss counts.'''
+        _cache.clear()
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Colors are immutable')
 
-    @property
-    def _uri(self):
-        return super().__getitem__(1)
+
+    __delattr__ = __setattr__
+
+
+    def __reduce__(self):
+        return (_new, (Color, self._n, self._uri))
 
 
     def __repr__(self):
@@ -146,25 +199,37 @@ class Color(tuple):
 
         Returns the name if it has one and the name is shorter or equal to
         the length of the color's HTML hex value; otherwise returns the
-        color's HTML hex value.
+        color's HTML hex value. For `Color.NONE`, `Color.CURRENTCOLOR`, and
+        gradients and patterns returns the same as the `name` property.
 
         See also the `name` property and the `rgb_html()` and `rgba_html()`
         methods.'''
-        if self._n < 0:
-            return repr(self)
-        if self.alpha != 255: # All named colors are solid so alpha == 255
-            return self.rgba_html()
-        h = self.rgb_html()
-        name = _NAME_FOR_COLOR.get((self.red, self.green, self.blue))
-        return name if name is not None and len(name) <= len(h) else h
+        n = self._n
+        text = _STR_FOR_N.get(n)
+        if text is None:
+            if n < 0:
+                return self.name
+            text = _memoize(_STR_FOR_N, n, _str_for_n(n))
+        return text
 
 
     def __eq__(self, other):
-        return self._n == other._n and self._uri == other._uri
+        try:
+            return self._n == other._n and self._uri == other._uri
+        except AttributeError:
+            return NotImplemented
+
+
+    def __ne__(self, other):
+        try:
+            return self._n != other._n or self._uri != other._uri
+        except AttributeError:
+            return NotImplemented
 
 
     def __hash__(self):
-        return hash((self._n, self._uri))
+        uri = self._uri
+        return hash(self._n) if uri is None else hash(uri)
 
 
     @property
@@ -174,70 +239,78 @@ class Color(tuple):
 
         See also the `__str__()`, `rgb_html()`, and `rgba_html()`
         methods.'''
-        if self._n == _TRANSPARENT:
-            return 'none'
-        elif self._n == _CURRENTCOLOR:
-            return 'currentColor'
-        elif self._n == _URI:
-            return f'url({self._uri})'
-        if self.alpha != 255: # All named colors are solid so alpha == 255
-            return self.rgba_html()
-        name = _NAME_FOR_COLOR.get((self.red, self.green, self.blue))
-        return name or self.rgb_html()
+        n = self._n
+        text = _NAME_FOR_N.get(n)
+        if text is None:
+            if n == _TRANSPARENT:
+                return 'none'
+            elif n == _CURRENTCOLOR:
+                return 'currentColor'
+            elif n == _URI:
+                return f'url({self._uri})'
+            text = _memoize(_NAME_FOR_N, n, _name_for_n(n))
+        return text
 
 
     @property
     def red(self):
         '''Returns the color's red component as an int 0-255 or raises an
         SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no red component as such')
-        return (self._n & 0xFF000000) >> 24
+        return n >> 24
 
 
     @property
     def green(self):
         '''Returns the color's green component as an int 0-255 or raises an
         SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no green component as such')
-        return (self._n & 0x00FF0000) >> 16
+        return (n >> 16) & 0xFF
 
 
     @property
     def blue(self):
         '''Returns the color's blue component as an int 0-255 or raises an
         SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no blue component as such')
-        return (self._n & 0x0000FF00) >> 8
+        return (n >> 8) & 0xFF
 
 
     @property
     def alpha(self):
         '''Returns the color's alpha component as an int 0-255 or raises an
         SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no alpha component as such')
-        return self._n & 0x000000FF
+        return n & 0xFF
 
 
     @property
     def rgb(self):
         '''Returns the color as a Color.Rgb namedtuple of ints 0-255 or
         raises an SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no color components as such')
-        return Color.Rgb(self.red, self.green, self.blue)
+        return Color.Rgb(n >> 24, (n >> 16) & 0xFF, (n >> 8) & 0xFF)
 
 
     @property
     def rgba(self):
         '''Returns the color as an Color.Rgba namedtuple of ints 0-255 or
         raises an SvgError.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no color components as such')
-        return Color.Rgba(self.red, self.green, self.blue, self.alpha)
+        return Color.Rgba(n >> 24, (n >> 16) & 0xFF, (n >> 8) & 0xFF,
+                          n & 0xFF)
 
 
     def rgb_html(self, *, minimize=True):
@@ -247,15 +320,15 @@ class Color(tuple):
 
         See also the `name` property and the `__str__()` and `rgba_html()`
         methods.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no color components as such')
-        r = f'{self.red:02X}'
-        g = f'{self.green:02X}'
-        b = f'{self.blue:02X}'
-        if (minimize and (r[0] == r[1]) and (g[0] == g[1]) and
-                (b[0] == b[1])):
-            return f'#{r[0]}{g[0]}{b[0]}'
-        return f'#{r}{g}{b}'
+        if not minimize:
+            return _rgb_html(n, False)
+        text = _RGB_HTML_FOR_N.get(n)
+        if text is None:
+            text = _memoize(_RGB_HTML_FOR_N, n, _rgb_html(n, True))
+        return text
 
 
     def rgba_html(self, *, minimize=True):
@@ -265,16 +338,111 @@ class Color(tuple):
 
         See also the `name` property and the `__str__()` and `rgb_html()`
         methods.'''
-        if self._n < 0:
+        n = self._n
+        if n < 0:
             raise SvgError('color has no color components as such')
-        r = f'{self.red:02X}'
-        g = f'{self.green:02X}'
-        b = f'{self.blue:02X}'
-        a = f'{self.alpha:02X}'
-        if (minimize and (r[0] == r[1]) and (g[0] == g[1]) and
-                (b[0] == b[1]) and (a[0] == a[1])):
-            return f'#{r[0]}{g[0]}{b[0]}{a[0]}'
-        return f'#{r}{g}{b}{a}'
+        if not minimize:
+            return _rgba_html(n, False)
+        text = _RGBA_HTML_FOR_N.get(n)
+        if text is None:
+            text = _memoize(_RGBA_HTML_FOR_N, n, _rgba_html(n, True))
+        return text
+
+
+    def nearest(self, palette=None):
+        '''Returns the color in the given `palette` (a Palette or sequence
+        of colors) that is nearest to this color.
+
+        If no palette is given the nearest CSS named color is returned
+        (which `str()` will output as a name if that's shortest). The
+        Palettes built for sequences of colors are cached, so looking up
+        many colors one at a time in the same sequence is still fast.
+
+        See also `nearest_all()` and `Palette.nearest()`.'''
+        return _palette_for(palette).nearest(self)
+
+
+    @staticmethod
+    def nearest_all(colors, palette=None):
+        '''Returns a list of the colors in the given `palette` (a Palette or
+        sequence of colors) that are nearest to each of the `colors` (any
+        iterable of Colors, or a ColorArray).
+
+        If no palette is given the nearest CSS named colors are returned.
+        '''
+        return _palette_for(palette).nearest_all(colors)
+
+
+    @staticmethod
+    def to_hsl(colors):
+        '''Returns (hue 0-360, saturation 0-1, lightness 0-1) for each of the
+        `colors`.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().to_hsl(colors)
+
+
+    @staticmethod
+    def from_hsl(values):
+        '''Returns a ColorArray of the colors for the given (hue,
+        saturation, lightness[, alpha 0-1]) values.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().from_hsl(values)
+
+
+    @staticmethod
+    def to_hsv(colors):
+        '''Returns (hue 0-360, saturation 0-1, value 0-1) for each of the
+        `colors`.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().to_hsv(colors)
+
+
+    @staticmethod
+    def from_hsv(values):
+        '''Returns a ColorArray of the colors for the given (hue,
+        saturation, value[, alpha 0-1]) values.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().from_hsv(values)
+
+
+    @staticmethod
+    def to_lab(colors):
+        '''Returns CIE (L* 0-100, a*, b*) for each of the `colors`.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().to_lab(colors)
+
+
+    @staticmethod
+    def from_lab(values):
+        '''Returns a ColorArray of the colors for the given (L*, a*,
+        b*[, alpha 0-1]) values.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().from_lab(values)
+
+
+    @staticmethod
+    def luminance(colors):
+        '''Returns the WCAG relative luminance (0.0-1.0) of each of the
+        `colors`.
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().luminance(colors)
+
+
+    @staticmethod
+    def contrast_ratio(colors, others):
+        '''Returns the WCAG contrast ratio (1.0-21.0) between each of the
+        `colors` and the corresponding color in `others` (or `others` itself
+        if it is a single Color).
+
+        See `svg2.ColorSpace` for details.'''
+        return _color_space().contrast_ratio(colors, others)
 
 
     def rgb_css(self, *, sep=',', percent=False, decimals=2):
@@ -325,10 +493,105 @@ class Color(tuple):
                 f'{alpha})')
 
 
+def _color_space():
+    from . import ColorSpace
+    return ColorSpace
+
+
+def _palette_for(palette):
+    # Returns the Palette for palette, building (and caching) one if it's a
+    # sequence of colors, so repeated lookups needn't rebuild its k-d tree
+    from .Palette import Palette
+    if palette is None:
+        return Palette.css()
+    if isinstance(palette, Palette):
+        return palette
+    key = tuple(palette)
+    built = _palettes.get(key)
+    if built is None:
+        if len(_palettes) >= _PALETTES_SIZE:
+            _palettes.clear()
+        built = _palettes[key] = Palette(key)
+    return built
+
+
+_palettes = {} # key: tuple of colors; value: Palette
+_PALETTES_SIZE = 64
+
+
+def _new(Class, n, uri=None):
+    color = object.__new__(Class)
+    _set_n(color, n)
+    _set_uri(color, uri)
+    return color
+
+
+_set_n = Color._n.__set__ # noqa: E305 (bypasses Color.__setattr__)
+_set_uri = Color._uri.__set__
+
+
 def _int_for_rgba(red, green, blue, alpha=255):
     return (red << 24) + (green << 16) + (blue << 8) + alpha
 
 
+# Colors' texts are memoized in these dicts keyed by the colors' ints; a
+# dict is emptied if it reaches _TEXT_CACHE_SIZE to keep memory bounded.
+_TEXT_CACHE_SIZE = 0x10000
+_STR_FOR_N = {}
+_NAME_FOR_N = {}
+_RGB_HTML_FOR_N = {}
+_RGBA_HTML_FOR_N = {}
+
+_HEX = tuple(f'{i:02X}' for i in range(256))
+# The single hex digit for bytes like 0x00, 0x11, ... 0xFF; otherwise ''
+_HEX1 = tuple(f'{i & 0xF:X}' if (i >> 4) == (i & 0xF) else ''
+              for i in range(256))
+
+
+def _memoize(texts, n, text):
+    if len(texts) >= _TEXT_CACHE_SIZE:
+        texts.clear()
+    texts[n] = text
+    return text
+
+
+def _str_for_n(n):
+    if n & 0xFF != 0xFF: # All named colors are solid so alpha == 255
+        return _rgba_html(n, True)
+    h = _rgb_html(n, True)
+    name = _NAME_FOR_RGB.get(n >> 8)
+    return name if name is not None and len(name) <= len(h) else h
+
+
+def _name_for_n(n):
+    if n & 0xFF != 0xFF: # All named colors are solid so alpha == 255
+        return _rgba_html(n, True)
+    return _NAME_FOR_RGB.get(n >> 8) or _rgb_html(n, True)
+
+
+def _rgb_html(n, minimize):
+    r = (n >> 24) & 0xFF
+    g = (n >> 16) & 0xFF
+    b = (n >> 8) & 0xFF
+    if minimize:
+        h = _HEX1[r] and _HEX1[g] and _HEX1[b]
+        if h:
+            return f'#{_HEX1[r]}{_HEX1[g]}{h}'
+    return f'#{_HEX[r]}{_HEX[g]}{_HEX[b]}'
+
+
+def _rgba_html(n, minimize):
+    r = (n >> 24) & 0xFF
+    g = (n >> 16) & 0xFF
+    b = (n >> 8) & 0xFF
+    a = n & 0xFF
+    if minimize:
+        h = _HEX1[r] and _HEX1[g] and _HEX1[b] and _HEX1[a]
+        if h:
+            return f'#{_HEX1[r]}{_HEX1[g]}{_HEX1[b]}{h}'
+    return f'#{_HEX[r]}{_HEX[g]}{_HEX[b]}{_HEX[a]}'
+
+
 def _color_for_name(name):
     if _color_for_name.d is None:
         _color_for_name.d = {v: k for k, v in _NAME_FOR_COLOR.items()}
@@ -346,6 +609,45 @@ def _color_for_name(name):
 _color_for_name.d = None # noqa: E305
 
 
+class _ParseCache:
+    '''An LRU cache of Colors keyed by the strings they were parsed from.'''
+
+    def __init__(self):
+        self.maxsize = 0
+        self.hits = self.misses = 0
+        self.colors = collections.OrderedDict()
+
+
+    def get(self, text):
+        color = self.colors.get(text)
+        if color is not None:
+            self.hits += 1
+            self.colors.move_to_end(text)
+            return color
+        color = Color._parse(text) # may raise SvgError (not cached)
+        self.misses += 1
+        self.colors[text] = color
+        if len(self.colors) > self.maxsize:
+            self.colors.popitem(last=False)
+        return color
+
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.colors) > maxsize:
+            self.colors.popitem(last=False)
+        if not maxsize:
+            self.clear()
+
+
+    def clear(self):
+        self.colors.clear()
+        self.hits = self.misses = 0
+
+
+_cache = _ParseCache()
+
+
 _NAME_FOR_COLOR = {
     (0x00, 0x00, 0x00): 'black',
     (0xC0, 0xC0, 0xC0): 'silver',
@@ -488,6 +790,9 @@ _NAME_FOR_COLOR = {
     (0x66, 0x33, 0x99): 'rebeccapurple',
     }
 
+_NAME_FOR_RGB = {(r << 16) + (g << 8) + b: name
+                 for (r, g, b), name in _NAME_FOR_COLOR.items()}
+
 for _value, _name in _NAME_FOR_COLOR.items():
     setattr(Color, _name.upper(), Color(*_value))
 for _name, _value in (('AQUA', (0x00, 0xFF, 0xFF)), # synonyms
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import array
+
+from .Color import (Color, _int_for_rgba, _name_for_n, _rgb_html, _rgba_html,
+                    _str_for_n)
+from .SvgError import SvgError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_TYPECODE = 'I' if array.array('I').itemsize >= 4 else 'L'
+
+
+class ColorArray:
+    '''Holds a sequence of RGBA colors each packed into a single unsigned
+    32-bit int (0xRRGGBBAA), in a NumPy array if NumPy is available,
+    otherwise in an `array.array`.
+
+    Use a ColorArray to parse or format thousands or millions of colors
+    in one call, e.g.,
+        colors = ColorArray.from_strings(['red', '#1F77B4', 'rgb(0,0,9)'])
+        texts = colors.strings() # ['red', '#1F77B4', '#000009']
+
+    Only real colors can be held, so `Color.NONE`, `Color.CURRENTCOLOR`,
+    and gradient or pattern urls are not allowed.
+    '''
+
+    def __init__(self, ints=()):
+        '''Returns a ColorArray of the given packed RGBA `ints` or raises an
+        SvgError. See also the `from_...()` static methods.'''
+        if numpy is not None:
+            values = numpy.asarray(ints, dtype=numpy.int64).ravel()
+            if values.size and (values.min() < 0 or
+                                values.max() > 0xFFFFFFFF):
+                raise SvgError('out of range packed color value')
+            self._ints = values.astype(numpy.uint32)
+        else:
+            try:
+                self._ints = array.array(_TYPECODE, ints)
+            except OverflowError as err:
+                raise SvgError(
+                    f'out of range packed color value: {err}') from None
+
+
+    @staticmethod
+    def from_ints(ints):
+        '''Returns a ColorArray of the given packed RGBA `ints` (each
+        0xRRGGBBAA) or raises an SvgError.'''
+        return ColorArray(ints)
+
+
+    @staticmethod
+    def from_strings(strings):
+        '''Returns a ColorArray of the colors in `strings` (each accepted by
+        `Color()`, e.g., '#E4C', 'rgba(38,180,240,0.75)', 'orange') or
+        raises an SvgError.
+
+        Each distinct string is only parsed once.'''
+        seen = {}
+        ints = []
+        for text in strings:
+            n = seen.get(text)
+            if n is None:
+                n = seen[text] = _int_for_color(Color(text))
+            ints.append(n)
+        return ColorArray(ints)
+
+
+    @staticmethod
+    def from_colors(colors):
+        '''Returns a ColorArray of the given Colors or raises an SvgError.
+        '''
+        return ColorArray([_int_for_color(color) for color in colors])
+
+
+    @staticmethod
+    def from_floats(floats):
+        '''Returns a ColorArray of the given `floats` or raises an SvgError.
+
+        `floats` must be a sequence of (red, green, blue) or (red, green,
+        blue, alpha) sequences, or a NumPy array of shape (n, 3) or (n, 4),
+        with every component in the range 0.0-1.0.'''
+        if numpy is not None:
+            try:
+                values = numpy.asarray(floats, dtype=numpy.float64)
+            except ValueError: # e.g., a mixture of 3 and 4 components
+                values = None
+        if numpy is not None and values is not None:
+            if values.size == 0:
+                return ColorArray()
+            if values.ndim != 2 or values.shape[1] not in {3, 4}:
+                raise SvgError('float colors must be 3 or 4 components each')
+            if values.min() < 0.0 or values.max() > 1.0:
+                raise SvgError('out of range float color value')
+            values = numpy.rint(values * 255.0).astype(numpy.uint32)
+            ints = ((values[:, 0] << 24) | (values[:, 1] << 16) |
+                    (values[:, 2] << 8))
+            ints |= values[:, 3] if values.shape[1] == 4 else 0xFF
+            colors = ColorArray()
+            colors._ints = ints
+            return colors
+        ints = []
+        for components in floats:
+            if len(components) not in {3, 4}:
+                raise SvgError('float colors must be 3 or 4 components each')
+            if not all(0.0 <= value <= 1.0 for value in components):
+                raise SvgError(
+                    f'out of range float color value: {components!r}')
+            ints.append(_int_for_rgba(
+                *[round(value * 255.0) for value in components]))
+        return ColorArray(ints)
+
+
+    def __len__(self):
+        return len(self._ints)
+
+
+    def __getitem__(self, index):
+        '''Returns the Color at the given index, or a ColorArray if `index`
+        is a slice.'''
+        if isinstance(index, slice):
+            colors = ColorArray()
+            colors._ints = self._ints[index]
+            return colors
+        return _color_for_int(int(self._ints[index]))
+
+
+    def __iter__(self):
+        for n in self._tolist():
+            yield _color_for_int(n)
+
+
+    def __repr__(self):
+        return f'ColorArray({self._tolist()!r})'
+
+
+    @property
+    def ints(self):
+        '''Returns the underlying array of packed RGBA ints (0xRRGGBBAA).'''
+        return self._ints
+
+
+    def strings(self):
+        '''Returns a list of strings, one per color, each the same as
+        `str(color)` would return.'''
+        return self._format_ints(_str_for_n)
+
+
+    def names(self):
+        '''Returns a list of strings, one per color, each the same as
+        `color.name` would return.'''
+        return self._format_ints(_name_for_n)
+
+
+    def rgb_html(self, *, minimize=True):
+        '''Returns a list of strings, one per color, each the same as
+        `color.rgb_html(minimize=minimize)` would return.'''
+        return self._format_ints(lambda n: _rgb_html(n, minimize))
+
+
+    def rgba_html(self, *, minimize=True):
+        '''Returns a list of strings, one per color, each the same as
+        `color.rgba_html(minimize=minimize)` would return.'''
+        return self._format_ints(lambda n: _rgba_html(n, minimize))
+
+
+    def rgb_css(self, *, sep=',', percent=False, decimals=2):
+        '''Returns a list of strings, one per color, each the same as
+        `color.rgb_css(...)` would return.'''
+        return self._format(lambda color: color.rgb_css(
+                            sep=sep, percent=percent, decimals=decimals))
+
+
+    def rgba_css(self, *, sep=',', percent=False, decimals=2):
+        '''Returns a list of strings, one per color, each the same as
+        `color.rgba_css(...)` would return.'''
+        return self._format(lambda color: color.rgba_css(
+                            sep=sep, percent=percent, decimals=decimals))
+
+
+    def _tolist(self):
+        return self._ints.tolist()
+
+
+    def _format(self, format):
+        return self._format_ints(lambda n: format(_color_for_int(n)))
+
+
+    def _format_ints(self, format):
+        # Each distinct color is only formatted once
+        seen = {}
+        texts = []
+        for n in self._tolist():
+            text = seen.get(n)
+            if text is None:
+                text = seen[n] = format(n)
+            texts.append(text)
+        return texts
+
+
+def _int_for_color(color):
+    n = color._n
+    if n < 0:
+        raise SvgError(f'a ColorArray cannot hold {color!r}')
+    return n
+
+
+def _color_for_int(n):
+    return Color((n >> 24) & 0xFF, (n >> 16) & 0xFF, (n >> 8) & 0xFF,
+                 n & 0xFF)
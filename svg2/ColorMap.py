@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+from .Color import Color
+from .ColorArray import ColorArray
+from .SvgError import SvgError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ColorMap:
+    '''Maps numbers onto colors using a precomputed lookup table of colors
+    interpolated between two or more stop colors.
+
+    For example:
+        heat = ColorMap(['navy', 'yellow', 'red'], vmin=0, vmax=50)
+        circle.fill = heat(23.4)
+        fills = heat.map(temperatures) # one call for all the values
+
+    The colors returned are the lookup table's own Colors, so mapping a
+    million values does not create a million Colors. Use `strings()` to
+    get the colors' text ready for output, or `color_array()` for a
+    ColorArray.
+    '''
+
+    def __init__(self, stops, *, size=256, vmin=0.0, vmax=1.0):
+        '''Returns a ColorMap or raises an SvgError.
+
+        `stops` is a sequence of at least two colors (each a Color or color
+        string) to be evenly spaced, or of (position, color) pairs with
+        positions ascending from 0.0 to 1.0.
+        `size` is the number of entries in the lookup table, e.g., 256 or
+        4096.
+        `vmin` and `vmax` are the default range of values to map: values
+        at or below `vmin` map to the first stop color and values at or
+        above `vmax` map to the last.'''
+        if len(stops) < 2:
+            raise SvgError('a color map needs at least two stops')
+        if size < 2:
+            raise SvgError(f'invalid color map size: {size!r}')
+        if vmin >= vmax:
+            raise SvgError(f'invalid color map range: {vmin!r}-{vmax!r}')
+        self.vmin = vmin
+        self.vmax = vmax
+        self._colors = _interpolate(_positioned(stops), size)
+        self._strings = [str(color) for color in self._colors]
+        self._ints = None # created on demand by color_array()
+
+
+    def __len__(self):
+        return len(self._colors)
+
+
+    @property
+    def colors(self):
+        '''Returns the lookup table as a list of Colors.'''
+        return self._colors
+
+
+    def __call__(self, value, *, vmin=None, vmax=None):
+        '''Returns the Color for the given `value`.'''
+        return self._colors[self.indexes((value,), vmin=vmin,
+                                         vmax=vmax)[0]]
+
+
+    def map(self, values, *, vmin=None, vmax=None):
+        '''Returns a list of Colors, one for each of the `values`.
+
+        `values` may be any iterable of numbers, or a NumPy array. `vmin`
+        and `vmax` default to those given when the map was created.'''
+        colors = self._colors
+        return [colors[i] for i in self.indexes(values, vmin=vmin,
+                                                vmax=vmax)]
+
+
+    def strings(self, values, *, vmin=None, vmax=None):
+        '''Returns a list of color strings, one for each of the `values`,
+        each the same as `str(color)` would return.'''
+        strings = self._strings
+        return [strings[i] for i in self.indexes(values, vmin=vmin,
+                                                 vmax=vmax)]
+
+
+    def color_array(self, values, *, vmin=None, vmax=None):
+        '''Returns a ColorArray with one color for each of the `values`.'''
+        if self._ints is None:
+            self._ints = ColorArray.from_colors(self._colors).ints
+        indexes = self.indexes(values, vmin=vmin, vmax=vmax)
+        if numpy is not None:
+            return ColorArray(self._ints[indexes])
+        ints = self._ints
+        return ColorArray([ints[i] for i in indexes])
+
+
+    def indexes(self, values, *, vmin=None, vmax=None):
+        '''Returns the lookup table index for each of the `values`: a list
+        of ints, or a NumPy array of ints if NumPy is available.'''
+        vmin = self.vmin if vmin is None else vmin
+        vmax = self.vmax if vmax is None else vmax
+        if vmin >= vmax:
+            raise SvgError(f'invalid color map range: {vmin!r}-{vmax!r}')
+        last = len(self._colors) - 1
+        scale = last / (vmax - vmin)
+        # Both paths round halves up and clip (e.g., infinities) before
+        # converting to ints, so they give the same indexes
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=numpy.float64)
+            if numpy.isnan(values).any():
+                raise SvgError('cannot map NaN to a color')
+            indexes = numpy.clip((values - vmin) * scale + 0.5, 0, last)
+            return numpy.floor(indexes).astype(numpy.intp)
+        indexes = []
+        append = indexes.append
+        try:
+            for value in values:
+                x = (value - vmin) * scale + 0.5
+                append(0 if x < 0 else last if x >= last else int(x))
+        except ValueError:
+            raise SvgError('cannot map NaN to a color') from None
+        return indexes
+
+
+def _positioned(stops):
+    first = stops[0]
+    if isinstance(first, (tuple, list)):
+        positions = [position for position, _ in stops]
+        colors = [color for _, color in stops]
+        if (positions[0] != 0 or positions[-1] != 1 or
+                any(a > b for a, b in zip(positions, positions[1:]))):
+            raise SvgError('color map stop positions must ascend from 0.0 '
+                           'to 1.0')
+    else:
+        last = len(stops) - 1
+        positions = [i / last for i in range(len(stops))]
+        colors = stops
+    colors = [color if isinstance(color, Color) else Color(color)
+              for color in colors]
+    return list(zip(positions, [color.rgba for color in colors]))
+
+
+def _interpolate(stops, size):
+    colors = []
+    last = size - 1
+    j = 0
+    for i in range(size):
+        t = i / last
+        while j < len(stops) - 2 and t > stops[j + 1][0]:
+            j += 1
+        (t1, rgba1), (t2, rgba2) = stops[j], stops[j + 1]
+        f = (t - t1) / (t2 - t1) if t2 > t1 else 0.0
+        colors.append(Color(*[round(a + (b - a) * f)
+                              for a, b in zip(rgba1, rgba2)]))
+    return colors
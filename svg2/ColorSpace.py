@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''Batch conversions between RGB colors and HSL, HSV, and CIE Lab (D65),
+plus WCAG relative luminance and contrast ratios.
+
+These are normally used via the `Color` static methods, e.g.,
+`Color.to_hsl()`, `Color.from_lab()`, `Color.contrast_ratio()`.
+
+Each function accepts a list (or other iterable) of Colors or color
+strings, or a ColorArray. Conversions from RGB return a list of tuples (or
+floats), or a NumPy array if NumPy is available; conversions to RGB return
+a ColorArray.
+'''
+
+import colorsys
+
+from .Color import Color
+from .ColorArray import ColorArray, _int_for_color
+from .SvgError import SvgError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _linear(v):
+    v /= 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+# sRGB 0-255 to linear 0.0-1.0 gamma lookup table
+_LINEAR = tuple(_linear(i) for i in range(256))
+
+_WHITE = (0.95047, 1.0, 1.08883) # D65
+_RGB_TO_XYZ = ((0.4124564, 0.3575761, 0.1804375),
+               (0.2126729, 0.7151522, 0.0721750),
+               (0.0193339, 0.1191920, 0.9503041))
+_XYZ_TO_RGB = ((3.2404542, -1.5371385, -0.4985314),
+               (-0.9692660, 1.8760108, 0.0415560),
+               (0.0556434, -0.2040259, 1.0572252))
+_DELTA = 6 / 29
+
+
+def to_hsl(colors):
+    '''Returns (hue 0-360, saturation 0-1, lightness 0-1) for each color.
+    '''
+    ints = _ints(colors)
+    if numpy is not None:
+        return _to_hsx_numpy(ints, lightness=True)
+    return _per_int(ints, _hsl_for_n)
+
+
+def from_hsl(values):
+    '''Returns a ColorArray of the colors for the given (hue, saturation,
+    lightness) or (hue, saturation, lightness, alpha 0-1) values.'''
+    if numpy is not None:
+        return _from_hsx_numpy(values, lightness=True)
+    return ColorArray(_per_value(values, lambda value: _n_for_rgb(
+        colorsys.hls_to_rgb((value[0] / 360) % 1.0, value[2], value[1]),
+        value)))
+
+
+def to_hsv(colors):
+    '''Returns (hue 0-360, saturation 0-1, value 0-1) for each color.'''
+    ints = _ints(colors)
+    if numpy is not None:
+        return _to_hsx_numpy(ints, lightness=False)
+    return _per_int(ints, _hsv_for_n)
+
+
+def from_hsv(values):
+    '''Returns a ColorArray of the colors for the given (hue, saturation,
+    value) or (hue, saturation, value, alpha 0-1) values.'''
+    if numpy is not None:
+        return _from_hsx_numpy(values, lightness=False)
+    return ColorArray(_per_value(values, lambda value: _n_for_rgb(
+        colorsys.hsv_to_rgb((value[0] / 360) % 1.0, value[1], value[2]),
+        value)))
+
+
+def to_lab(colors):
+    '''Returns CIE (L* 0-100, a*, b*) for each color (using D65 white).'''
+    ints = _ints(colors)
+    if numpy is not None:
+        return _to_lab_numpy(ints)
+    return _per_int(ints, _lab_for_n)
+
+
+def from_lab(values):
+    '''Returns a ColorArray of the colors for the given (L*, a*, b*) or
+    (L*, a*, b*, alpha 0-1) values; out of gamut colors are clipped.'''
+    if numpy is not None:
+        return _from_lab_numpy(values)
+    return ColorArray(_per_value(values, lambda value: _n_for_rgb(
+        _rgb_for_lab(value), value)))
+
+
+def luminance(colors):
+    '''Returns the WCAG relative luminance (0.0-1.0) of each color.'''
+    ints = _ints(colors)
+    if numpy is not None:
+        return _luminance_numpy(ints)
+    return _per_int(ints, _luminance_for_n)
+
+
+def contrast_ratio(colors, others):
+    '''Returns the WCAG contrast ratio (1.0-21.0) between each of the
+    `colors` and the corresponding color in `others`, or between each of
+    the `colors` and `others` if `others` is a single Color.'''
+    lums = luminance(colors)
+    if isinstance(others, (Color, str)):
+        other = luminance([others])[0]
+        if numpy is not None:
+            return _contrast_numpy(lums, other)
+        return [_contrast(lum, other) for lum in lums]
+    others = luminance(others)
+    if len(others) != len(lums):
+        raise SvgError('contrast_ratio() needs equal numbers of colors')
+    if numpy is not None:
+        return _contrast_numpy(lums, others)
+    return [_contrast(lum, other) for lum, other in zip(lums, others)]
+
+
+def _ints(colors):
+    if isinstance(colors, ColorArray):
+        return colors.ints.tolist() if numpy is None else colors.ints
+    ints = [_int_for_color(color if isinstance(color, Color)
+                           else Color(color)) for color in colors]
+    return ints if numpy is None else numpy.array(ints, dtype=numpy.uint32)
+
+
+def _per_int(ints, convert):
+    # Each distinct color is only converted once
+    seen = {}
+    values = []
+    for n in ints:
+        value = seen.get(n)
+        if value is None:
+            value = seen[n] = convert(n)
+        values.append(value)
+    return values
+
+
+def _per_value(values, convert):
+    # Each distinct value is only converted once
+    seen = {}
+    ints = []
+    for value in values:
+        key = tuple(value)
+        n = seen.get(key)
+        if n is None:
+            n = seen[key] = convert(key)
+        ints.append(n)
+    return ints
+
+
+def _hsl_for_n(n):
+    h, light, s = colorsys.rgb_to_hls(((n >> 24) & 0xFF) / 255,
+                                      ((n >> 16) & 0xFF) / 255,
+                                      ((n >> 8) & 0xFF) / 255)
+    return (h * 360, s, light)
+
+
+def _hsv_for_n(n):
+    h, s, v = colorsys.rgb_to_hsv(((n >> 24) & 0xFF) / 255,
+                                  ((n >> 16) & 0xFF) / 255,
+                                  ((n >> 8) & 0xFF) / 255)
+    return (h * 360, s, v)
+
+
+def _lab_for_n(n):
+    rgb = (_LINEAR[(n >> 24) & 0xFF], _LINEAR[(n >> 16) & 0xFF],
+           _LINEAR[(n >> 8) & 0xFF])
+    fx, fy, fz = [_f(sum(m * v for m, v in zip(row, rgb)) / white)
+                  for row, white in zip(_RGB_TO_XYZ, _WHITE)]
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def _f(t):
+    return (t ** (1 / 3) if t > _DELTA ** 3 else
+            t / (3 * _DELTA ** 2) + 4 / 29)
+
+
+def _f_inverse(t):
+    return t ** 3 if t > _DELTA else 3 * _DELTA ** 2 * (t - 4 / 29)
+
+
+def _rgb_for_lab(value):
+    fy = (value[0] + 16) / 116
+    xyz = [_f_inverse(f) * white for f, white in zip(
+           (fy + value[1] / 500, fy, fy - value[2] / 200), _WHITE)]
+    return [_gamma(sum(m * v for m, v in zip(row, xyz)))
+            for row in _XYZ_TO_RGB]
+
+
+def _gamma(v): # linear 0.0-1.0 to sRGB 0.0-1.0
+    v = min(max(v, 0.0), 1.0)
+    return 12.92 * v if v <= 0.0031308 else 1.055 * v ** (1 / 2.4) - 0.055
+
+
+def _luminance_for_n(n):
+    return (0.2126 * _LINEAR[(n >> 24) & 0xFF] +
+            0.7152 * _LINEAR[(n >> 16) & 0xFF] +
+            0.0722 * _LINEAR[(n >> 8) & 0xFF])
+
+
+def _contrast(a, b):
+    if a < b:
+        a, b = b, a
+    return (a + 0.05) / (b + 0.05)
+
+
+def _n_for_rgb(rgb, value):
+    r, g, b = [round(min(max(v, 0.0), 1.0) * 255) for v in rgb]
+    alpha = round(value[3] * 255) if len(value) == 4 else 0xFF
+    if not (0 <= alpha <= 0xFF):
+        raise SvgError(f'out of range alpha value: {value!r}')
+    return (r << 24) | (g << 16) | (b << 8) | alpha
+
+
+# NumPy versions of the conversions; values are float arrays
+
+
+def _components_numpy(ints):
+    ints = numpy.asarray(ints, dtype=numpy.uint32)
+    return ((ints >> 24) & 0xFF, (ints >> 16) & 0xFF, (ints >> 8) & 0xFF)
+
+
+def _to_hsx_numpy(ints, *, lightness):
+    r, g, b = [c / 255 for c in _components_numpy(ints)]
+    high = numpy.maximum(numpy.maximum(r, g), b)
+    low = numpy.minimum(numpy.minimum(r, g), b)
+    delta = high - low
+    safe = numpy.where(delta == 0, 1.0, delta)
+    hue = numpy.where(high == r, ((g - b) / safe) % 6,
+                      numpy.where(high == g, (b - r) / safe + 2,
+                                  (r - g) / safe + 4))
+    hue = numpy.where(delta == 0, 0.0, hue * 60)
+    if lightness:
+        light = (high + low) / 2
+        divisor = 1 - numpy.abs(2 * light - 1)
+        s = numpy.where(delta == 0, 0.0,
+                        delta / numpy.where(divisor == 0, 1.0, divisor))
+        return numpy.stack([hue, s, light], axis=1)
+    s = numpy.where(high == 0, 0.0,
+                    delta / numpy.where(high == 0, 1.0, high))
+    return numpy.stack([hue, s, high], axis=1)
+
+
+def _from_hsx_numpy(values, *, lightness):
+    values, alpha = _split_alpha_numpy(values)
+    h = (values[:, 0] / 60) % 6
+    s = values[:, 1]
+    if lightness:
+        light = values[:, 2]
+        c = (1 - numpy.abs(2 * light - 1)) * s
+        m = light - c / 2
+    else:
+        c = values[:, 2] * s
+        m = values[:, 2] - c
+    x = c * (1 - numpy.abs(h % 2 - 1))
+    zero = numpy.zeros_like(c)
+    sector = numpy.minimum(h.astype(numpy.intp), 5)
+    choices = numpy.stack([
+        numpy.stack([c, x, zero], axis=1), numpy.stack([x, c, zero], axis=1),
+        numpy.stack([zero, c, x], axis=1), numpy.stack([zero, x, c], axis=1),
+        numpy.stack([x, zero, c], axis=1), numpy.stack([c, zero, x], axis=1)])
+    rgb = choices[sector, numpy.arange(len(sector))] + m[:, None]
+    return _color_array_numpy(rgb, alpha)
+
+
+def _to_lab_numpy(ints):
+    table = numpy.array(_LINEAR)
+    rgb = numpy.stack([table[c] for c in _components_numpy(ints)], axis=1)
+    xyz = (rgb @ numpy.array(_RGB_TO_XYZ).T) / numpy.array(_WHITE)
+    f = numpy.where(xyz > _DELTA ** 3, numpy.cbrt(xyz),
+                    xyz / (3 * _DELTA ** 2) + 4 / 29)
+    return numpy.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]),
+                        200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def _from_lab_numpy(values):
+    values, alpha = _split_alpha_numpy(values)
+    fy = (values[:, 0] + 16) / 116
+    f = numpy.stack([fy + values[:, 1] / 500, fy, fy - values[:, 2] / 200],
+                    axis=1)
+    xyz = numpy.where(f > _DELTA, f ** 3, 3 * _DELTA ** 2 * (f - 4 / 29))
+    rgb = numpy.clip((xyz * numpy.array(_WHITE)) @
+                     numpy.array(_XYZ_TO_RGB).T, 0.0, 1.0)
+    rgb = numpy.where(rgb <= 0.0031308, 12.92 * rgb,
+                      1.055 * rgb ** (1 / 2.4) - 0.055)
+    return _color_array_numpy(rgb, alpha)
+
+
+def _luminance_numpy(ints):
+    table = numpy.array(_LINEAR)
+    r, g, b = [table[c] for c in _components_numpy(ints)]
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def _contrast_numpy(lums, others):
+    high = numpy.maximum(lums, others)
+    low = numpy.minimum(lums, others)
+    return (high + 0.05) / (low + 0.05)
+
+
+def _split_alpha_numpy(values):
+    try:
+        values = numpy.asarray(values, dtype=numpy.float64)
+    except ValueError: # a mixture of 3 and 4 components
+        values = [tuple(value) + (1.0,) * (4 - len(value))
+                  for value in values]
+        values = numpy.asarray(values, dtype=numpy.float64)
+    if values.size == 0:
+        return numpy.zeros((0, 3)), None
+    if values.ndim != 2 or values.shape[1] not in {3, 4}:
+        raise SvgError('color values must be 3 or 4 components each')
+    if values.shape[1] == 3:
+        return values, None
+    alpha = values[:, 3]
+    if alpha.min() < 0.0 or alpha.max() > 1.0:
+        raise SvgError('out of range alpha value')
+    return values[:, :3], alpha
+
+
+def _color_array_numpy(rgb, alpha):
+    rgb = numpy.rint(numpy.clip(rgb, 0.0, 1.0) * 255).astype(numpy.uint32)
+    ints = (rgb[:, 0] << 24) | (rgb[:, 1] << 16) | (rgb[:, 2] << 8)
+    if alpha is None:
+        ints |= 0xFF
+    else:
+        ints |= numpy.rint(alpha * 255).astype(numpy.uint32)
+    colors = ColorArray()
+    colors._ints = ints
+    return colors
@@ -3,8 +3,10 @@
 # License: GPLv3
 
 import enum
+import weakref
 
 from .Color import Color
+from .SvgError import SvgError
 
 
 @enum.unique
@@ -19,32 +21,100 @@ class FillRule(enum.Enum):
 
 class Fill:
 
+    __slots__ = ('color', 'opacity', 'fillrule', '_shared', '_version',
+                 '_svg_options', '_svg_text', '__weakref__')
+
     NONZERO = FillRule.NONZERO
     EVENODD = FillRule.EVENODD
 
     def __init__(self, color='none', *, opacity=1,
                  fillrule=FillRule.default()):
+        object.__setattr__(self, '_shared', False)
+        object.__setattr__(self, '_version', 0) # +1 per change
         self.color = (color if isinstance(color, Color) or color == 'none'
                       else Color(color))
         self.opacity = opacity # 0.0-1.0
         self.fillrule = fillrule # FillRule
 
 
+    def __setattr__(self, name, value):
+        if self._shared:
+            raise SvgError('cannot change a shared Fill; use a copy() or '
+                           'the shape\'s own_fill()')
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_version', self._version + 1)
+        object.__setattr__(self, '_svg_options', None) # invalidate svg()
+
+
+    def __reduce__(self):
+        return (_fill_for_key, (self._key(), self._shared))
+
+
+    def copy(self):
+        '''Returns a new (unshared) Fill equal to this one.'''
+        return Fill(self.color, opacity=self.opacity, fillrule=self.fillrule)
+
+
+    @staticmethod
+    def intern(fill_or_color):
+        '''Returns the shared Fill equal to the given Fill, or to a default
+        Fill of the given Color.
+
+        All the equal Fills (or Colors) passed to `intern()` get the same
+        shared Fill, which saves memory when many shapes have the same
+        fill. Shared Fills cannot be changed (but can be copied); this is
+        used when a shape's `fill` is set to a Color or color string.
+        '''
+        if isinstance(fill_or_color, Fill):
+            key = fill_or_color._key()
+        else:
+            color = fill_or_color
+            if not (isinstance(color, Color) or color == 'none'):
+                color = Color(color)
+            key = (color, 1, FillRule.default())
+        return _fill_for_key(key, True)
+
+
+    @property
+    def shared(self):
+        '''Returns True if this Fill is shared (and so can't be changed).'''
+        return self._shared
+
+
+    def _key(self):
+        return (self.color, self.opacity, self.fillrule)
+
+
     def svg(self, options):
+        '''Returns the style fragment for the given options: this is
+        memoized for the most recent options and recomputed if any of the
+        attributes are changed.'''
+        if self._svg_options is options:
+            return self._svg_text
+        text = self._svg_for(options)
+        object.__setattr__(self, '_svg_text', text)
+        object.__setattr__(self, '_svg_options', options)
+        return text
+
+
+    def _svg_for(self, options):
         parts = []
+        color = self.color
+        if options.recolor:
+            color = options.recolor.get(color, color)
         if options.use_style:
             sep = options.sep
-            if self.color != Color.BLACK:
-                parts.append(f'fill:{sep}{self.color}')
+            if color != Color.BLACK:
+                parts.append(f'fill:{sep}{color}')
             if self.opacity != 1:
                 parts.append(f'fill-opacity:{sep}{self.opacity}')
             if self.fillrule is not FillRule.default():
-                parts.append(f'fill-rule={sep}{self.fillrule.value}')
+                parts.append(f'fill-rule:{sep}{self.fillrule.value}')
             if parts:
                 return f';{sep}'.join(parts)
         else:
-            if self.color != Color.BLACK:
-                parts.append(f'fill="{self.color}"')
+            if color != Color.BLACK:
+                parts.append(f'fill="{color}"')
             if self.opacity != 1:
                 parts.append(f'fill-opacity="{self.opacity}"')
             if self.fillrule is not FillRule.default():
@@ -52,3 +122,21 @@ class Fill:
             if parts:
                 return ' '.join(parts)
         return ''
+
+
+# key: (Fill._key(), the type of its opacity); value: Fill
+_shared = weakref.WeakValueDictionary()
+
+
+def _fill_for_key(key, shared):
+    color, opacity, fillrule = key
+    if shared: # 1 == 1.0 but they may be written differently
+        typed_key = (key, opacity.__class__)
+        fill = _shared.get(typed_key)
+        if fill is not None:
+            return fill
+    fill = Fill(color, opacity=opacity, fillrule=fillrule)
+    if shared:
+        object.__setattr__(fill, '_shared', True)
+        _shared[typed_key] = fill
+    return fill
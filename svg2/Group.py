@@ -7,6 +7,8 @@ from .Shape import WriteMixin
 
 class Group(WriteMixin):
 
+    __slots__ = ('id', '_shapes')
+
     def __init__(self, id):
         self.id = id
         self._shapes = []
@@ -14,6 +16,7 @@ class Group(WriteMixin):
 
     def __iadd__(self, shape):
         self._shapes.append(shape)
+        return self
 
 
     def svg(self, indent, options):
@@ -23,3 +26,20 @@ class Group(WriteMixin):
             parts.append(shape.svg(indent, options))
         parts.append(f'</g>{options.nl}')
         return f'{options.nl}'.join(parts)
+
+
+    def _iter_write(self, out, indent, options, slice_size):
+        # Writes what svg() returns piece by piece, yielding how many shapes
+        # were written after each shape or slice of a batch (see
+        # aiter_bytes())
+        out.write(f'<g id="{self.id}">')
+        indent += options.tab
+        for shape in self._shapes:
+            out.write(options.nl)
+            iter_write = getattr(shape, '_iter_write', None)
+            if iter_write is None:
+                shape.write(out, indent, options)
+                yield 1
+            else:
+                yield from iter_write(out, indent, options, slice_size)
+        out.write(f'{options.nl}</g>{options.nl}')
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import array
+import bisect
+import io
+import itertools
+import mmap
+import operator
+import os
+import re
+
+from .Options import Options
+from .SvgError import SvgError
+from .SvgLoadMixin import _CSS_RULE, _load, _properties
+
+
+class LazySvg:
+    '''An SVG file opened for reading and changing a few of its elements
+    without loading the whole drawing.
+
+    For example:
+        with Svg.Lazy('map.svg') as svg:
+            shape = svg.get('station-42')
+            shape.fill = 'red'
+            svg += Svg.Circle(10, 10, radius=5)
+            svg.save('map-new.svg')
+
+    The file is memory-mapped and scanned once to index the byte offsets
+    (and any ids) of the `<svg>` element's children; an element is only
+    converted into an svg2 object (as by `Svg.load()`) when it's accessed.
+    `save()` copies every element that hasn't been changed byte for byte
+    from the map and serializes only those that have. The file must be
+    uncompressed UTF-8 and mustn't be changed while it's open.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._map = None
+        self._starts = array.array('q') # of each child of the <svg>
+        self._ends = {} # key: index; value: end offset if not empty
+        self._end = 0 # the offset of </svg>
+        self._ids = {} # key: id; value: index
+        self._classes = {} # from <style> elements; as used by _Loader
+        # key: index; value: (shape, its SVG when read) or (None, None) if
+        # deleted; the SVG is None if the shape replaced the element
+        self._elements = {}
+        self._appended = []
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError: # an empty file can't be mapped
+            self._file.close()
+            raise SvgError('invalid SVG: empty file') from None
+        try:
+            if self._map[:2] == b'\x1F\x8B': # gzip's magic number
+                raise SvgError('can\'t index a gzipped SVG file: use '
+                               'Svg.load()')
+            self._index()
+        except BaseException:
+            self.close()
+            raise
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *_):
+        self.close()
+
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+    def __len__(self):
+        '''Returns the number of indexed elements (including any that have
+        been deleted but not any that have been added).'''
+        return len(self._starts)
+
+
+    def __getitem__(self, index):
+        '''Returns the svg2 object for the index-th child of the `<svg>`
+        element; or None if it was deleted or isn't supported by
+        `Svg.load()` as a single object (e.g., a `<path>`, or a `<g>`
+        without an id).'''
+        index = self._check(index)
+        item = self._elements.get(index)
+        if item is None:
+            parent = _load(_Parent, io.BytesIO(
+                b''.join((b'<svg>', self._map[self._starts[index]:
+                                              self._element_end(index)],
+                          b'</svg>'))), self._classes)
+            if len(parent._shapes) != 1:
+                return None # so it's copied unchanged by save()
+            shape = parent._shapes[0]
+            item = self._elements[index] = (shape, shape.svg('', _OPTIONS))
+        return item[0]
+
+
+    def __setitem__(self, index, shape):
+        '''Replaces the index-th child of the `<svg>` element with the
+        given shape (or Group or batch).'''
+        self._elements[self._check(index)] = (shape, None)
+
+
+    def __delitem__(self, index):
+        '''Deletes the index-th child of the `<svg>` element. (The indexes
+        of the other elements are unchanged.)'''
+        self._elements[self._check(index)] = (None, None)
+
+
+    def __iadd__(self, shape):
+        '''Adds the shape (or Group or batch) after the last element.'''
+        self._appended.append(shape)
+        return self
+
+
+    def index(self, id):
+        '''Returns the index of the child of the `<svg>` element with the
+        given id.'''
+        try:
+            return self._ids[id]
+        except KeyError:
+            raise SvgError(f'no element with id {id!r}') from None
+
+
+    def get(self, id, default=None):
+        '''Returns the svg2 object for the child of the `<svg>` element with
+        the given id (see `__getitem__()`), or `default` if there's no such
+        element.'''
+        index = self._ids.get(id)
+        return default if index is None else self[index]
+
+
+    def tag(self, index):
+        '''Returns the tag name of the index-th child of the `<svg>`
+        element, e.g., `'circle'`, without reading the element.'''
+        return _TAG.match(self._map, self._starts[self._check(index)]
+                          ).group(1).decode('utf-8')
+
+
+    def save(self, filename, *, options=None):
+        '''Saves the drawing to the given file (which can't be the one
+        that is open).
+
+        Deleted elements are left out. Replaced and added elements, and
+        those which were read and then changed, are serialized using the
+        `options` (which defaults to `Svg.Options()` and can't use
+        `max_colors` or `extract_styles`), and replaced and changed ones
+        keep their element's id. Everything else is copied byte for byte
+        from the open file.
+        '''
+        if options is None:
+            options = Options()
+        if options.max_colors or options.extract_styles:
+            raise SvgError('max_colors and extract_styles need the whole '
+                           'drawing so can\'t be used with LazySvg')
+        if os.path.exists(filename) and os.path.samefile(filename,
+                                                         self.filename):
+            raise SvgError('can\'t save over the file that is open')
+        data = memoryview(self._map)
+        try:
+            with open(filename, 'wb') as file:
+                position = 0 # of the first byte not yet copied
+                for index in sorted(self._elements):
+                    shape, text = self._elements[index]
+                    if shape is not None and text is not None:
+                        if shape.svg('', _OPTIONS) == text:
+                            continue # read but unchanged
+                    start = self._starts[index]
+                    file.write(data[position:start])
+                    if shape is not None:
+                        file.write(self._svg(shape, start, options))
+                    position = self._element_end(index)
+                file.write(data[position:self._end])
+                for shape in self._appended:
+                    file.write(shape.svg('', options).encode('utf-8'))
+                file.write(data[self._end:])
+        finally:
+            data.release()
+
+
+    def _svg(self, shape, start, options):
+        # Returns the shape's SVG as UTF-8 bytes, with the id of the element
+        # it replaces (since only Groups have ids)
+        text = shape.svg('', options)
+        if getattr(shape, 'id', None) is None:
+            attributes = _TOKEN.match(self._map, start).group(3)
+            for id in _ID.finditer(attributes):
+                if attributes[id.start() - 1:id.start()].isspace():
+                    text = _NAME.sub(lambda match: f'{match.group()} id="'
+                                     f'{id.group(id.lastindex).decode()}"',
+                                     text, count=1)
+                    break
+        return text.encode('utf-8')
+
+
+    def _check(self, index):
+        # Returns the index made non-negative or raises IndexError
+        size = len(self._starts)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('LazySvg index out of range')
+        return index
+
+
+    def _index(self):
+        # Finds the start offset of each child of the <svg> element (and
+        # the end offset of those that aren't empty), and records their
+        # ids and the classes in any <style>s (e.g., in a <defs>)
+        data = self._map
+        starts = self._starts
+        ends = self._ends
+        styles = [] # the start offset of each <style>
+        depth = 0 # 1 inside the <svg>
+        position = 0
+        retry = 0 # where to next try _index_empty() after it fails
+        while True:
+            if depth == 1 and position >= retry:
+                end = self._index_empty(position)
+                if end == position:
+                    retry = position + _BLOCK_SIZE
+                position = end
+            match = _TOKEN.search(data, position)
+            if match is None:
+                raise SvgError('invalid SVG: no </svg>')
+            position = match.end()
+            closing, name, attributes = match.groups()
+            if name is None: # a comment, CDATA, etc.
+                continue
+            if closing:
+                depth -= 1
+                if depth == 1:
+                    ends[len(starts) - 1] = position
+                elif depth == 0:
+                    self._end = match.start()
+                    break
+                continue
+            if depth == 1:
+                starts.append(match.start())
+            elif depth == 0 and name != b'svg':
+                raise SvgError(f'expected <svg>, got <{name.decode()}>')
+            if not attributes.endswith(b'/'): # not an empty element
+                if name == b'style':
+                    styles.append(position)
+                depth += 1
+            elif depth == 0:
+                raise SvgError('invalid SVG: empty <svg/>')
+        self._read_ids()
+        self._read_styles(styles)
+
+
+    def _index_empty(self, position):
+        # Indexes the run of empty elements (e.g., <circle .../>) starting
+        # at position a block at a time without any per-element Python
+        # code, and returns the position after them. A block's elements
+        # are all empty if it has as many <s as >s and />s, since < can't
+        # be in an attribute value and each > ends a tag and is in a />.
+        data = self._map
+        while True:
+            block = data[position:position + _BLOCK_SIZE]
+            end = block.rfind(b'<') # the tag it starts may be incomplete
+            special = _SPECIAL.search(block, 0, end)
+            if special is not None:
+                end = special.start()
+            count = block.count(b'<', 0, end)
+            if not count or count != block.count(b'>', 0, end) or (
+                    count != block.count(b'/>', 0, end)):
+                return position
+            lengths = map(len, block[:end].split(b'<', count))
+            self._starts.extend(map(operator.add, itertools.accumulate(
+                itertools.islice(lengths, count)),
+                range(position, position + count)))
+            position += end
+            if special is not None or len(block) < _BLOCK_SIZE:
+                return position
+
+
+    def _element_end(self, index):
+        # Returns the offset after the end of the index-th element
+        end = self._ends.get(index)
+        if end is None: # an empty element
+            end = _TOKEN.match(self._map, self._starts[index]).end()
+        return end
+
+
+    def _read_ids(self):
+        # Records the id of each child of the <svg> element that has one
+        data = self._map
+        starts = self._starts
+        for match in _ID.finditer(data, starts[0] if starts else 0,
+                                  self._end):
+            start = match.start()
+            if not data[start - 1:start].isspace(): # e.g., data-id=
+                continue
+            index = bisect.bisect_right(starts, start) - 1
+            if start < _TOKEN.match(data, starts[index]).end():
+                self._ids[match.group(match.lastindex).decode('utf-8')] = (
+                    index)
+
+
+    def _read_styles(self, styles):
+        # Records the classes defined in the <style> elements whose
+        # contents start at the given offsets
+        data = self._map
+        for start in styles:
+            text = data[start:data.find(b'</style', start)].decode('utf-8')
+            for class_name, properties in _CSS_RULE.findall(text):
+                self._classes[class_name] = _properties(properties)
+
+
+class _Parent: # what the loader adds an element's shape to
+
+    def __init__(self):
+        self._shapes = []
+
+
+_OPTIONS = Options() # used to tell whether a shape read has been changed
+_TOKEN = re.compile(rb'''
+    <(/?)([^\s/>!?]+)([^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*)>
+    | <!--.*?--> | <!\[CDATA\[.*?\]\]> | <\?.*?\?>
+    | <!DOCTYPE(?:[^>\[]|\[.*?\])*>''', re.DOTALL | re.VERBOSE)
+_BLOCK_SIZE = 0x10000
+_TAG = re.compile(rb'<([^\s/>]+)')
+_NAME = re.compile(r'<[^\s/>]+')
+_SPECIAL = re.compile(rb'<[/!?]') # an end tag, comment, CDATA, etc.
+_ID = re.compile(rb'''id\s*=\s*(?:"([^"]*)"|'([^']*)')''')
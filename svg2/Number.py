@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''The number formatting used for all coordinates and lengths.
+
+`num()` formats one number and `nums()` a whole sequence of them (e.g., a
+Polyline's points or a batch's column) in a few passes over one string
+rather than number by number. Both honor the `Options` `precision` and
+`strip_zeros`, and for the same values produce the same text.
+'''
+
+import re
+
+
+def num(value, options):
+    '''Returns the text of the given number, e.g., 3 for 3 or 3.0, and for
+    0.30000000000000004, 0.30000000000000004 if options.precision is None
+    or 0.3 if it is 2 (and options.strip_zeros is True).'''
+    precision = options.precision
+    strip_zeros = options.strip_zeros
+    if value.__class__ is int and (strip_zeros or precision is None):
+        return str(value) # fast path: ints are written as is
+    if (strip_zeros and value.__class__ is float and
+            -_MAX_INT < value < _MAX_INT and value.is_integer()):
+        return str(int(value)) # fast path: integral floats; -0.0 is 0
+    if precision is None:
+        text = str(value)
+        if strip_zeros and text.endswith('.0'):
+            return text[:-2]
+        return text
+    text = f'{value:.{precision}f}'
+    if strip_zeros:
+        if precision:
+            text = text.rstrip('0').rstrip('.')
+        if text == '-0':
+            return '0'
+    return text
+
+
+def nums(values, options):
+    '''Returns a list of the text of each of the given numbers, each the
+    same as `num()` would return.'''
+    precision = options.precision
+    strip_zeros = options.strip_zeros
+    if precision is None:
+        text = '\0'.join(map(str, values)) + '\0'
+        if strip_zeros:
+            text = text.replace('.0\0', '\0')
+            if '-0\0' in text:
+                text = _MINUS_ZERO.sub('0', '\0' + text)[1:]
+        return text.split('\0')[:-1]
+    format = f'{{:.{precision}f}}'.format
+    text = '\0' + '\0'.join(map(format, values)) + '\0'
+    if strip_zeros:
+        if precision: # every number has a '.' followed by precision digits
+            for _ in range(precision):
+                if '0\0' not in text:
+                    break
+                text = text.replace('0\0', '\0') # one zero from each
+            text = text.replace('.\0', '\0')
+        if '-0\0' in text:
+            text = _MINUS_ZERO.sub('0', text)
+    return text[1:].split('\0')[:-1]
+
+
+_MAX_INT = 2 ** 53 # above this str(int(value)) would overstate precision
+_MINUS_ZERO = re.compile(r'(?<=\0)-0(?=\0)')
@@ -13,8 +13,13 @@ class Version(enum.Enum):
 
 
 class Options(collections.namedtuple(
-              'Options', 'use_style coord_comma sep nl tab version',
-              defaults=(True, False, '', '', '', Version.V_1_1))):
+              'Options', 'use_style coord_comma sep nl tab version '
+              'max_colors recolor precision strip_zeros extract_styles '
+              'style_classes chunk_size compresslevel compress_threads '
+              'workers worker_chunk_size incremental',
+              defaults=(True, False, '', '', '', Version.V_1_1, None,
+                        None, None, True, False, None, 0x10000, 9, 1, 1,
+                        50_000, False))):
     '''Options used for `Svg.save()` (`Svg.dump()`), `Svg.dumps()` and
     `Svg.write()`.
     If `use_style` is `True` (the default) where possible stroke and fill
@@ -34,6 +39,56 @@ class Options(collections.namedtuple(
     The `tab` is used as the indent at each level and defaults to `''`, so
     normally there is no indent. This only makes sense if `nl='\\n'`, in
     which case use `tab='  '` or similar.
+    If `max_colors` is set (it defaults to `None`) the stroke and fill
+    colors are quantized to at most that many representative colors when
+    the drawing is written. The `Svg.quantization` attribute is set to a
+    report of the colors before and after and of the maximum error (use
+    `Svg.quantize()` for a report that has the sizes before and after).
+    The `recolor` is a dict mapping Colors to the Colors to write in their
+    place; it defaults to `None` and is set automatically if `max_colors`
+    is used.
+    The `precision` is the number of decimal places used for coordinates
+    and lengths; it defaults to `None` meaning as many as are needed to
+    represent each float exactly (e.g., 0.30000000000000004). Ints are
+    always written as is.
+    If `strip_zeros` is `True` (the default) trailing zeros after the
+    decimal point (and then any trailing decimal point) are dropped, so,
+    e.g., 2.50 is written as 2.5 and 3.0 as 3.
+    If `extract_styles` is `True` (it defaults to `False`) each distinct
+    stroke and fill style is written once as a CSS class in a `<style>`
+    block and the shapes that use it get that class (in addition to any
+    added with `add_css_class()`) rather than a `style="..."` attribute.
+    This implies `use_style=True`. The classes are named `svg2-s0`,
+    `svg2-s1`, etc., numbered afresh for each document written. The
+    `style_classes` is a dict mapping style texts to their class names; it
+    defaults to `None` and is set automatically if `extract_styles` is
+    used.
+    The `chunk_size` is the number of characters of SVG to gather before
+    writing them (encoded to UTF-8 if writing to a binary stream) with a
+    single call; it defaults to 65536. Use 0 to write each shape as soon as
+    it's serialized.
+    The `compresslevel` (0-9, default 9) and `compress_threads` (default 1)
+    are used when saving to a compressed (`.svgz` or `.svg.gz`) file. If
+    `compress_threads` is more than 1 (or `None`, meaning the number of
+    CPUs) the file is compressed in blocks using that many threads which is
+    faster on multicore machines but produces slightly larger files.
+    If `workers` is more than 1 (or `None`, meaning the number of CPUs; it
+    defaults to 1) and the drawing has more than `worker_chunk_size` shapes
+    (default 50000), the shapes are serialized in chunks of that many by
+    that many worker processes (or threads if Python is running without
+    the GIL). The output is identical to that of serial writing, but the
+    shapes must be picklable when processes are used and the start up
+    and pickling costs mean it's only worthwhile for very large drawings.
+    If `incremental` is `True` (it defaults to `False`) each shape keeps
+    its SVG when it's written and only shapes which have been changed
+    since (or whose unshared stroke or fill, or points array, has been
+    changed) are serialized again when the drawing is next written with
+    equal options. This speeds up repeatedly writing a drawing of which
+    only a few shapes change, at the cost of keeping each shape's SVG (and
+    checking its attributes). Only the drawing's own shapes keep their
+    SVG: Groups are always serialized again, including all their shapes.
+    The `Svg.fragments` attribute is set to the counts of fragments reused
+    and rebuilt. (`workers` is ignored if `incremental` is `True`.)
 
     Use `Options()` (or just accept the default of `None` which will do the
     same) to get the most compact XML possible.
@@ -43,5 +98,13 @@ class Options(collections.namedtuple(
 
     @staticmethod
     def pretty(*, use_style=True, coord_comma=True, sep=' ', nl='\n',
-               tab='  ', version=Version.V_1_1):
-        return Options(use_style, coord_comma, sep, nl, tab, version)
+               tab='  ', version=Version.V_1_1, max_colors=None,
+               recolor=None, precision=None, strip_zeros=True,
+               extract_styles=False, style_classes=None,
+               chunk_size=0x10000, compresslevel=9, compress_threads=1,
+               workers=1, worker_chunk_size=50_000, incremental=False):
+        return Options(use_style, coord_comma, sep, nl, tab, version,
+                       max_colors, recolor, precision, strip_zeros,
+                       extract_styles, style_classes, chunk_size,
+                       compresslevel, compress_threads, workers,
+                       worker_chunk_size, incremental)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import operator
+
+from .Color import Color, _NAME_FOR_COLOR, _TEXT_CACHE_SIZE
+from .ColorArray import ColorArray
+from .ColorSpace import _lab_for_n
+from .SvgError import SvgError
+
+
+class Palette:
+    '''A fixed set of colors that other colors can be snapped to.
+
+    For example:
+        brand = Palette(['#1F77B4', '#FF7F0E', '#2CA02C'])
+        fill = brand.nearest(Color(0x20, 0x70, 0xB0)) # Color('#1F77B4')
+        fills = brand.nearest_all(colors) # one call for all the colors
+
+    Lookups use a k-d tree over the palette's RGB (or CIE Lab) values and
+    results are cached, so snapping many (and many repeated) colors is
+    fast.
+
+    See also `Color.nearest()` and `Palette.css()`.
+    '''
+
+    def __init__(self, colors, *, space='rgb'):
+        '''Returns a Palette of the given `colors` (each a Color or color
+        string) or raises an SvgError.
+
+        Colors are compared by Euclidean distance in the given `space`,
+        either 'rgb' or 'lab' (perceptually more uniform).'''
+        if space not in {'rgb', 'lab'}:
+            raise SvgError(f'invalid color space: {space!r}')
+        self._point = _lab_point if space == 'lab' else _rgb_point
+        self._colors = []
+        points = []
+        seen = set()
+        for color in colors:
+            if not isinstance(color, Color):
+                color = Color(color)
+            if color._n < 0:
+                raise SvgError(f'a Palette cannot hold {color!r}')
+            rgb = color._n >> 8
+            if rgb not in seen:
+                seen.add(rgb)
+                points.append((*self._point(rgb), len(self._colors)))
+                self._colors.append(color)
+        if not self._colors:
+            raise SvgError('a Palette needs at least one color')
+        self._tree = _build(points, 0)
+        self._cache = {} # key: RGB int; value: index into self._colors
+
+
+    @staticmethod
+    def css():
+        '''Returns the Palette of all the CSS named colors.'''
+        global _css
+        if _css is None:
+            _css = Palette([Color(*rgb) for rgb in _NAME_FOR_COLOR])
+        return _css
+
+
+    def __len__(self):
+        return len(self._colors)
+
+
+    @property
+    def colors(self):
+        '''Returns the palette's colors as a list of Colors.'''
+        return self._colors
+
+
+    def nearest(self, color):
+        '''Returns the palette color nearest to the given `color`.
+
+        If `color` isn't solid (its alpha isn't 255) the result is the
+        nearest palette color with `color`'s alpha. `Color.NONE`,
+        `Color.CURRENTCOLOR`, and gradients and patterns are returned
+        unchanged.'''
+        n = color._n
+        if n < 0:
+            return color
+        return self._nearest_for_n(n)
+
+
+    def nearest_all(self, colors):
+        '''Returns a list of the nearest palette colors, one for each of
+        the given `colors` (any iterable of Colors, or a ColorArray).'''
+        if isinstance(colors, ColorArray):
+            nearest = self._nearest_for_n
+            return [nearest(n) for n in colors.ints.tolist()]
+        nearest = self.nearest
+        return [nearest(color) for color in colors]
+
+
+    def _nearest_for_n(self, n):
+        rgb = n >> 8
+        i = self._cache.get(rgb)
+        if i is None:
+            if len(self._cache) >= _TEXT_CACHE_SIZE:
+                self._cache.clear()
+            i = self._cache[rgb] = _nearest(self._tree, self._point(rgb))
+        color = self._colors[i]
+        alpha = n & 0xFF
+        if alpha == 0xFF:
+            return color
+        return Color(*color.rgb, alpha)
+
+
+_css = None
+
+
+def _rgb_point(rgb):
+    return (rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF
+
+
+def _lab_point(rgb):
+    return _lab_for_n((rgb << 8) | 0xFF)
+
+
+def _build(points, axis):
+    # A k-d tree node is (point, axis, left, right) where point is
+    # (red, green, blue, index) or (L*, a*, b*, index)
+    if not points:
+        return None
+    points.sort(key=operator.itemgetter(axis))
+    middle = len(points) // 2
+    following = (axis + 1) % 3
+    return (points[middle], axis, _build(points[:middle], following),
+            _build(points[middle + 1:], following))
+
+
+def _nearest(tree, target):
+    best = [float('inf'), 0] # squared distance, index
+    _search(tree, target, best)
+    return best[1]
+
+
+def _search(node, target, best):
+    point, axis, left, right = node
+    distance = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 +
+                (point[2] - target[2]) ** 2)
+    if distance < best[0] or (distance == best[0] and point[3] < best[1]):
+        best[0] = distance
+        best[1] = point[3]
+    diff = target[axis] - point[axis]
+    near, far = (left, right) if diff < 0 else (right, left)
+    if near is not None:
+        _search(near, target, best)
+    if far is not None and diff * diff <= best[0]:
+        _search(far, target, best)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import collections
+import concurrent.futures
+import io
+import os
+import struct
+import time
+import zlib
+
+
+class ParallelGzipFile(io.BufferedIOBase):
+    '''A binary file for writing that gzip-compresses its data using
+    several threads (zlib releases the GIL while compressing).
+
+    In the style of pigz the data is split into blocks which are compressed
+    independently (each primed with the last 32 KiB of the block before it
+    so that little compression is lost) and the compressed blocks are
+    written in order as a single valid gzip stream.
+    '''
+
+    BLOCK_SIZE = 0x20000 # 128 KiB as used by pigz
+
+    def __init__(self, filename, *, compresslevel=9, threads=None):
+        '''Opens `filename` for writing. `threads` defaults to the number of
+        CPUs.'''
+        super().__init__()
+        self._compresslevel = compresslevel
+        self._threads = threads or os.cpu_count() or 1
+        self._file = open(filename, 'wb')
+        self._pool = concurrent.futures.ThreadPoolExecutor(self._threads)
+        self._pending = collections.deque() # futures of compressed blocks
+        self._parts = []
+        self._size = 0 # of the data in _parts
+        self._previous = b'' # the last 32 KiB of the previous block
+        self._crc = 0
+        self._length = 0
+        xfl = (2 if compresslevel == 9 else 4 if compresslevel == 1 else
+               0)
+        self._file.write(struct.pack('<BBBBLBB', 0x1F, 0x8B, 8, 0,
+                                     int(time.time()), xfl, 255))
+
+
+    def writable(self):
+        return True
+
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to closed file')
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        if self._size >= self.BLOCK_SIZE:
+            self._submit()
+        return len(data)
+
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._submit()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+            compressor = zlib.compressobj(self._compresslevel,
+                                          zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._file.write(compressor.flush(zlib.Z_FINISH)) # empty end
+            self._file.write(struct.pack('<LL', self._crc,
+                                         self._length & 0xFFFFFFFF))
+        finally:
+            self._pool.shutdown()
+            self._file.close()
+            super().close()
+
+
+    def _submit(self):
+        if not self._parts:
+            return
+        block = b''.join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self._crc = zlib.crc32(block, self._crc)
+        self._length += len(block)
+        self._pending.append(self._pool.submit(
+            _compress, block, self._previous, self._compresslevel))
+        self._previous = block[-0x8000:]
+        while len(self._pending) > 2 * self._threads: # bound memory
+            self._file.write(self._pending.popleft().result())
+
+
+def _compress(block, previous, compresslevel):
+    # Returns the block as raw deflate data ending on a byte boundary
+    # (Z_SYNC_FLUSH) so that it can be followed by the next block
+    if previous:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED,
+                                      -zlib.MAX_WBITS, zdict=previous)
+    else:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED,
+                                      -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import collections
+import math
+
+from .ColorArray import _color_for_int
+from .SvgError import SvgError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+Quantization = collections.namedtuple(
+    'Quantization', 'recolor colors_before colors_after max_error '
+    'bytes_before bytes_after', defaults=(None, None))
+Quantization.__doc__ = '''The result of quantizing colors.
+`recolor` is a dict mapping each original Color to its representative;
+`colors_before` and `colors_after` are the numbers of distinct colors;
+`max_error` is the largest Euclidean RGBA distance (0-510) between an
+original color and its representative; `bytes_before` and `bytes_after`
+are the sizes of the drawing's UTF-8 SVG without and with the recoloring
+(only set by `Svg.quantize()`).'''
+
+
+def quantize(colors, max_colors):
+    '''Returns a Quantization that maps the given `colors` to at most
+    `max_colors` representative colors using median-cut.
+
+    `colors` is an iterable of Colors or a dict whose keys are Colors and
+    whose values are the numbers of times each is used (more used colors
+    weigh more when choosing representatives). `Color.NONE`,
+    `Color.CURRENTCOLOR`, and gradients and patterns are ignored.'''
+    if max_colors < 1:
+        raise SvgError(f'invalid maximum number of colors: {max_colors!r}')
+    items = (colors.items() if isinstance(colors, dict) else
+             ((color, 1) for color in colors))
+    counts = collections.Counter()
+    for color, count in items:
+        if color._n >= 0:
+            counts[color._n] += count
+    if len(counts) <= max_colors:
+        return Quantization({}, len(counts), len(counts), 0.0)
+    cut = _median_cut_numpy if numpy is not None else _median_cut
+    representative_for_n = cut(counts, max_colors)
+    recolor = {}
+    max_error = 0
+    for n, m in representative_for_n.items():
+        if n != m:
+            recolor[_color_for_int(n)] = _color_for_int(m)
+            max_error = max(max_error, _distance2(n, m))
+    return Quantization(recolor, len(counts),
+                        len(set(representative_for_n.values())),
+                        math.sqrt(max_error))
+
+
+def _median_cut(counts, max_colors):
+    # Each box is (width, channel, items) for its widest channel where each
+    # item is (red, green, blue, alpha, count, n)
+    boxes = [_box([(*_components(n), count, n)
+                   for n, count in counts.items()])]
+    while len(boxes) < max_colors:
+        i = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        width, channel, items = boxes[i]
+        if width == 0:
+            break
+        items = sorted(items, key=lambda item: item[channel])
+        middle = _weighted_middle([item[4] for item in items],
+                                  [item[channel] for item in items])
+        boxes[i:i + 1] = [_box(items[:middle]), _box(items[middle:])]
+    representative_for_n = {}
+    for _, _, items in boxes:
+        total = sum(item[4] for item in items)
+        mean = [round(sum(item[channel] * item[4] for item in items) /
+                      total) for channel in range(4)]
+        m = (mean[0] << 24) | (mean[1] << 16) | (mean[2] << 8) | mean[3]
+        for item in items:
+            representative_for_n[item[5]] = m
+    return representative_for_n
+
+
+def _box(items):
+    widest = (0, 0)
+    for channel in range(4):
+        values = [item[channel] for item in items]
+        width = max(values) - min(values)
+        if width > widest[0]:
+            widest = (width, channel)
+    return (*widest, items)
+
+
+def _median_cut_numpy(counts, max_colors):
+    ns = numpy.fromiter(counts.keys(), dtype=numpy.int64, count=len(counts))
+    weights = numpy.fromiter(counts.values(), dtype=numpy.float64,
+                             count=len(counts))
+    components = numpy.stack([(ns >> 24) & 0xFF, (ns >> 16) & 0xFF,
+                              (ns >> 8) & 0xFF, ns & 0xFF], axis=1)
+
+    def box(indexes):
+        widths = numpy.ptp(components[indexes], axis=0)
+        channel = int(numpy.argmax(widths))
+        return int(widths[channel]), channel, indexes
+
+    boxes = [box(numpy.arange(len(ns)))]
+    while len(boxes) < max_colors:
+        i = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        width, channel, indexes = boxes[i]
+        if width == 0:
+            break
+        indexes = indexes[numpy.argsort(components[indexes, channel],
+                                        kind='stable')]
+        middle = _weighted_middle(weights[indexes].tolist(),
+                                  components[indexes, channel].tolist())
+        boxes[i:i + 1] = [box(indexes[:middle]), box(indexes[middle:])]
+    representative_for_n = {}
+    for _, _, indexes in boxes:
+        mean = numpy.rint(numpy.average(components[indexes], axis=0,
+                                        weights=weights[indexes]))
+        mean = mean.astype(numpy.int64).tolist()
+        m = (mean[0] << 24) | (mean[1] << 16) | (mean[2] << 8) | mean[3]
+        for n in ns[indexes].tolist():
+            representative_for_n[n] = m
+    return representative_for_n
+
+
+def _weighted_middle(weights, values):
+    # Returns the split index (keeping both halves nonempty) that puts the
+    # weight nearest to half the total in the lower half, preferring the
+    # bigger gap between the values either side of the split on a tie
+    half = sum(weights) / 2
+    total = 0
+    for i, weight in enumerate(weights):
+        if total + weight >= half:
+            break
+        total += weight
+    candidates = [middle for middle in (i, i + 1)
+                  if 0 < middle < len(weights)]
+    return min(candidates, key=lambda middle: (
+        abs(sum(weights[:middle]) - half),
+        values[middle - 1] - values[middle]))
+
+
+def _components(n):
+    return (n >> 24) & 0xFF, (n >> 16) & 0xFF, (n >> 8) & 0xFF, n & 0xFF
+
+
+def _distance2(n, m):
+    return sum((a - b) ** 2 for a, b in zip(_components(n), _components(m)))
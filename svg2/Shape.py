@@ -2,9 +2,14 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+import array
+import itertools
+import numbers
+import sys
 from xml.sax.saxutils import escape as esc
 
 from . import AbstractShape
+from .Number import num, nums
 from .SvgError import SvgError
 
 # TODO change css_style(options.sep) to css_style(options)
@@ -12,12 +17,16 @@ from .SvgError import SvgError
 
 class WriteMixin:
 
+    __slots__ = ()
+
     def write(self, out, indent, options):
         out.write(self.svg(indent, options))
 
 
 class Line(AbstractShape.AbstractStroke, WriteMixin):
 
+    __slots__ = ('x1', 'y1', 'x2', 'y2')
+
     def __init__(self, x1, y1, x2, y2, *, stroke=None):
         '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123').'''
@@ -29,15 +38,19 @@ class Line(AbstractShape.AbstractStroke, WriteMixin):
 
 
     def svg(self, indent, options):
-        svg = _svg(options.use_style, self.stroke.svg(options),
-                   self.css_style(options.sep))
-        return (f'{indent}<line x1="{self.x1}" y1="{self.y1}" '
-                f'x2="{self.x2}" y2="{self.y2}"{self.css_classes}{svg}/>'
-                f'{options.nl}')
+        svg = self._style_svg(options)
+        x1 = num(self.x1, options)
+        y1 = num(self.y1, options)
+        x2 = num(self.x2, options)
+        y2 = num(self.y2, options)
+        return (f'{indent}<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}"'
+                f'{svg}/>{options.nl}')
 
 
 class Rect(AbstractShape.AbstractPositionStrokeFill, WriteMixin):
 
+    __slots__ = ('width', 'height')
+
     def __init__(self, x, y, *, width, height, stroke=None, fill=None):
         '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123'). The fill can be a Fill, Color, or color string.'''
@@ -47,15 +60,19 @@ class Rect(AbstractShape.AbstractPositionStrokeFill, WriteMixin):
 
 
     def svg(self, indent, options):
-        svg = _svg(options.use_style, super().svg(options),
-                   self.css_style(options.sep))
-        return (f'{indent}<rect x="{self.x}" y="{self.y}" '
-                f'width="{self.width}" height="{self.height}"'
-                f'{self.css_classes}{svg}/>{options.nl}')
+        svg = self._style_svg(options)
+        x = num(self.x, options)
+        y = num(self.y, options)
+        width = num(self.width, options)
+        height = num(self.height, options)
+        return (f'{indent}<rect x="{x}" y="{y}" width="{width}" '
+                f'height="{height}"{svg}/>{options.nl}')
 
 
 class Circle(AbstractShape.AbstractPositionStrokeFill, WriteMixin):
 
+    __slots__ = ('radius',)
+
     def __init__(self, x, y, *, radius, stroke=None, fill=None):
         '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123'). The fill can be a Fill, Color, or color string.'''
@@ -64,14 +81,18 @@ class Circle(AbstractShape.AbstractPositionStrokeFill, WriteMixin):
 
 
     def svg(self, indent, options):
-        svg = _svg(options.use_style, super().svg(options),
-                   self.css_style(options.sep))
-        return (f'{indent}<circle cx="{self.x}" cy="{self.y}" '
-                f'r="{self.radius}"{self.css_classes}{svg}/>{options.nl}')
+        svg = self._style_svg(options)
+        x = num(self.x, options)
+        y = num(self.y, options)
+        radius = num(self.radius, options)
+        return (f'{indent}<circle cx="{x}" cy="{y}" r="{radius}"'
+                f'{svg}/>{options.nl}')
 
 
 class Ellipse(Circle):
 
+    __slots__ = ('yradius',)
+
     def __init__(self, x, y, *, xradius, yradius, stroke=None, fill=None):
         '''`radius` is a synonym for `xradius`.
         The stroke can be a Stroke, Color, or color string (e.g., 'red',
@@ -93,66 +114,127 @@ class Ellipse(Circle):
     def svg(self, indent, options):
         if self.xradius == self.yradius:
             return super().svg(indent, options)
-        svg = _svg(options.use_style, super().svg(options),
-                   self.css_style(options.sep))
-        return (f'{indent}<ellipse cx="{self.x}" cy="{self.y}" '
-                f'rx="{self.xradius}" ry="{self.yradius}"{self.css_classes}'
-                f'{svg}/>{options.nl}')
+        svg = self._style_svg(options)
+        x = num(self.x, options)
+        y = num(self.y, options)
+        xradius = num(self.xradius, options)
+        yradius = num(self.yradius, options)
+        return (f'{indent}<ellipse cx="{x}" cy="{y}" rx="{xradius}" '
+                f'ry="{yradius}"{svg}/>{options.nl}')
 
 
 class Polygon(AbstractShape.AbstractStrokeFill, WriteMixin):
 
-    def __init__(self, *, stroke=None, fill=None):
-        '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
-        '#ABC123'). The fill can be a Fill, Color, or color string.'''
-        super().__init__(stroke, fill)
-
-    # TODO
-
+    __slots__ = ('_points', '_ints')
 
-class Polyline(AbstractShape.AbstractStrokeFill, WriteMixin):
+    _TAG = 'polygon'
 
     def __init__(self, points=None, *, stroke=None, fill=None):
-        '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
+        '''The points are stored as an array('d') of x, y coordinates: see
+        `set()`.
+        The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123'). The fill can be a Fill, Color, or color string.'''
         super().__init__(stroke, fill)
-        self._points = []
-        if points:
+        self._points = _doubles()
+        self._ints = None # flags the ints among the points: see _int_flags()
+        if points is not None:
             self.set(points)
 
 
+    @property
+    def points(self):
+        '''Returns the points as an array('d') of x, y coordinates (which
+        can be used directly, e.g., with `numpy.frombuffer()`).'''
+        return self._points
+
+
+    def __len__(self):
+        return len(self._points) // 2
+
+
     def add(self, x, y):
-        self._points += [x, y]
+        self._points.append(x)
+        self._points.append(y)
+        if (self._ints is not None or x.__class__ is not float or
+                y.__class__ is not float):
+            self._ints = _extended_ints(self._ints, len(self._points) - 2,
+                                        _int_flags((x, y)), 2)
+        self._fragment = None
+
+
+    def extend(self, points):
+        '''Appends the given `points`: see `set()`.'''
+        size = len(self._points)
+        self._fragment = None
+        if not hasattr(points, '__len__'):
+            points = list(points) # since they're read twice
+        _extend_doubles(self._points, points)
+        count = len(self._points) - size
+        if count % 2:
+            del self._points[size:]
+            raise SvgError('an even number of coordinates is required, '
+                           f'{count:,} were passed')
+        self._ints = _extended_ints(self._ints, size, _int_flags(points),
+                                    count)
 
 
     def set(self, points):
-        '''`points` must be a list or tuple of numbers.'''
-        if len(points) % 2:
+        '''`points` must be a flat sequence of x, y coordinates, e.g., a
+        list or tuple of numbers, or an object supporting the buffer
+        protocol such as an array('d'), a NumPy float64 array (of shape (n,)
+        or (n, 2)), or a memoryview. Buffers of C doubles are copied
+        directly without creating a Python float for each coordinate.'''
+        if not hasattr(points, '__len__'):
+            points = list(points) # since they're read twice
+        doubles = _doubles(points)
+        if len(doubles) % 2:
             raise SvgError('an even number of coordinates is required, '
-                           f'{len(points):,} were passed')
-        self._points = points
+                           f'{len(doubles):,} were passed')
+        self._points = doubles
+        self._ints = _int_flags(points)
 
 
     def clear(self):
-        self._points.clear()
+        del self._points[:]
+        self._ints = None
+        self._fragment = None
+
+
+    def _state(self):
+        # The points array may be changed in place by whoever has it (e.g.,
+        # through a NumPy array from numpy.frombuffer()), so it's compared
+        # by value
+        return super()._state() + (self._points.tobytes(),)
 
 
     def svg(self, indent, options):
         if not self._points:
             return ''
-        svg = _svg(options.use_style, super().svg(options),
-                   self.css_style(options.sep))
+        svg = self._style_svg(options)
+        texts = nums(self._points, options)
+        if (self._ints is not None and options.precision is None and
+                not options.strip_zeros): # else ints and floats are alike
+            _int_texts(texts, self._points, self._ints)
         if options.coord_comma:
-            points = ' '.join(f'{x},{y}' for x, y in zip(
-                              self._points[::2], self._points[1::2]))
+            texts = iter(texts)
+            points = ' '.join(map(','.join, zip(texts, texts)))
         else:
-            points = ' '.join(str(n) for n in self._points)
-        return (f'{indent}<polyline points="{points}"{self.css_classes}'
-                f'{svg}/>{options.nl}')
+            points = ' '.join(texts)
+        return (f'{indent}<{self._TAG} points="{points}"{svg}/>'
+                f'{options.nl}')
+
+
+class Polyline(Polygon):
+
+    __slots__ = ()
+
+    _TAG = 'polyline'
 
 
 class Path(AbstractShape.AbstractStrokeFill, WriteMixin):
 
+    __slots__ = ('_d',)
+
     def __init__(self, *, stroke=None, fill=None):
         '''The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123'). The fill can be a Fill, Color, or color string.'''
@@ -164,33 +246,89 @@ class Path(AbstractShape.AbstractStrokeFill, WriteMixin):
 
 class Text(AbstractShape.AbstractPositionStrokeFill, WriteMixin):
 
-    def __init__(self, text, *, font=None, stroke=None, fill=None):
+    __slots__ = ('text', 'font')
+
+    def __init__(self, x, y, text, *, font=None, stroke=None, fill=None):
         '''The font ###########
         The stroke can be a Stroke, Color, or color string (e.g., 'red',
         '#ABC123'). The fill can be a Fill, Color, or color string.'''
-        super().__init__(stroke, fill)
+        super().__init__(x, y, stroke, fill)
         self.text = text
         self.font = font
 
 
     def svg(self, indent, options):
-        stroke = self.stroke.svg(options)
-        fill = self.fill.svg(options)
-        if stroke and fill:
-            sep = f';{options.sep}' if options.use_style else ' '
-            svg = stroke + sep + fill
-        else:
-            svg = stroke + fill
+        svg = self._style_svg(options)
         # TODO add font either as style or inline and add to svg
-        return (f'{indent}<text x="{self.x}" y="{self.y}"{self.css_classes}'
-                f'{svg}>{esc(self.text)}</text>{options.nl}')
-
-
-def _svg(use_style, svg, css_style):
-    if use_style:
-        if svg and css_style:
-            svg = svg + '; ' + css_style
-        else:
-            svg = svg + css_style
-        return f' style="{svg}"' if svg else ''
-    return svg if svg.startswith((' ', ';')) else f' {svg}'
+        x = num(self.x, options)
+        y = num(self.y, options)
+        return (f'{indent}<text x="{x}" y="{y}"{svg}>{esc(str(self.text))}'
+                f'</text>{options.nl}')
+
+
+def _doubles(values=()):
+    doubles = array.array('d')
+    _extend_doubles(doubles, values)
+    return doubles
+
+
+def _extend_doubles(doubles, values):
+    # Copies C doubles directly from buffer protocol objects (e.g.,
+    # array('d'), NumPy float64 arrays, memoryviews) without creating
+    # Python floats
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+    if view is not None and view.format in _DOUBLE_FORMATS and (
+            view.c_contiguous):
+        doubles.frombytes(view.cast('B'))
+    else:
+        doubles.extend(iter(values)) # iter() so any array typecode works
+
+
+def _int_flags(values):
+    # Returns an array('b') flagging which of the values are ints (which
+    # num() writes without a '.0' if strip_zeros is False), or None if none
+    # are (e.g., for a list of floats or a NumPy float64 array)
+    try:
+        view = memoryview(values)
+    except TypeError:
+        is_int = {Class: issubclass(Class, numbers.Integral)
+                  for Class in set(map(type, values))}
+        if not any(is_int.values()):
+            return None
+        return array.array('b', map(is_int.__getitem__, map(type, values)))
+    if view.format[-1:] in 'efd': # C floating-point numbers
+        return None
+    return array.array('b', bytes((1,)) * (view.nbytes // view.itemsize))
+
+
+def _is_int(value):
+    return value.__class__ is not float and isinstance(value,
+                                                       numbers.Integral)
+
+
+def _extended_ints(ints, size, flags, count):
+    # Returns the int flags for size values (or None if none are ints)
+    # extended by those for count more (or None)
+    if ints is None:
+        if flags is None:
+            return None
+        ints = array.array('b', bytes(size))
+    ints.extend(array.array('b', bytes(count)) if flags is None else flags)
+    return ints
+
+
+def _int_texts(texts, doubles, ints, start=0):
+    # Rewrites the texts of the doubles from start on that were ints as
+    # ints, as num() writes them if precision is None and not strip_zeros
+    for k in itertools.compress(range(len(texts)),
+                                ints[start:start + len(texts)]):
+        value = doubles[start + k]
+        if value.is_integer(): # unless changed through the points array
+            texts[k] = str(int(value))
+
+
+_DOUBLE_FORMATS = {'d', '@d', '=d', '<d' if sys.byteorder == 'little'
+                   else '>d'}
@@ -3,8 +3,11 @@
 # License: GPLv3
 
 import enum
+import weakref
 
 from .Color import Color
+from .Number import num, nums
+from .SvgError import SvgError
 
 
 @enum.unique
@@ -33,28 +36,103 @@ class LineJoin(enum.Enum):
 
 class Stroke:
 
+    __slots__ = ('color', 'width', 'opacity', 'linejoin', 'linecap',
+                 'dasharray', '_shared', '_version', '_svg_options',
+                 '_svg_text', '__weakref__')
+
     LineCap = LineCap
     LineJoin = LineJoin
 
     def __init__(self, color=Color.BLACK, width=1, *, opacity=1,
                  linecap=LineCap.default(), linejoin=LineJoin.default(),
                  dasharray=None):
+        object.__setattr__(self, '_shared', False)
+        object.__setattr__(self, '_version', 0) # +1 per change
         self.color = color if isinstance(color, Color) else Color(color)
         self.width = width # Length
         self.opacity = opacity # 0.0-1.0
         self.linejoin = linejoin # LineJoin
         self.linecap = linecap # LineCap
-        self.dasharray = dasharray # sequence of ints
+        self.dasharray = dasharray # sequence of numbers; kept as a tuple
+
+
+    def __setattr__(self, name, value):
+        if self._shared:
+            raise SvgError('cannot change a shared Stroke; use a copy() or '
+                           'the shape\'s own_stroke()')
+        if name == 'dasharray' and value is not None:
+            value = tuple(value) # so it can't be changed behind our back
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_version', self._version + 1)
+        object.__setattr__(self, '_svg_options', None) # invalidate svg()
+
+
+    def __reduce__(self):
+        return (_stroke_for_key, (self._key(), self._shared))
+
+
+    def copy(self):
+        '''Returns a new (unshared) Stroke equal to this one.'''
+        return Stroke(self.color, self.width, opacity=self.opacity,
+                      linecap=self.linecap, linejoin=self.linejoin,
+                      dasharray=self.dasharray)
+
+
+    @staticmethod
+    def intern(stroke_or_color):
+        '''Returns the shared Stroke equal to the given Stroke, or to a
+        default Stroke of the given Color.
+
+        All the equal Strokes (or Colors) passed to `intern()` get the same
+        shared Stroke, which saves memory when many shapes have the same
+        stroke. Shared Strokes cannot be changed (but can be copied); this
+        is used when a shape's `stroke` is set to a Color or color string.
+        '''
+        if isinstance(stroke_or_color, Stroke):
+            key = stroke_or_color._key()
+        else:
+            color = stroke_or_color
+            if not isinstance(color, Color):
+                color = Color(color)
+            key = (color, 1, 1, LineCap.default(), LineJoin.default(), None)
+        return _stroke_for_key(key, True)
+
+
+    @property
+    def shared(self):
+        '''Returns True if this Stroke is shared (and so can't be changed).
+        '''
+        return self._shared
+
+
+    def _key(self):
+        return (self.color, self.width, self.opacity, self.linecap,
+                self.linejoin, self.dasharray)
 
 
     def svg(self, options):
+        '''Returns the style fragment for the given options: this is
+        memoized for the most recent options and recomputed if any of the
+        attributes are changed.'''
+        if self._svg_options is options:
+            return self._svg_text
+        text = self._svg_for(options)
+        object.__setattr__(self, '_svg_text', text)
+        object.__setattr__(self, '_svg_options', options)
+        return text
+
+
+    def _svg_for(self, options):
         parts = []
+        color = self.color
+        if options.recolor:
+            color = options.recolor.get(color, color)
         if options.use_style:
             sep = options.sep
-            if self.color != Color.BLACK:
-                parts = [f'stroke:{sep}{self.color}']
+            if color != Color.BLACK:
+                parts = [f'stroke:{sep}{color}']
             if self.width != 1:
-                parts.append(f'stroke-width:{sep}{self.width}')
+                parts.append(f'stroke-width:{sep}{num(self.width, options)}')
             if self.opacity != 1:
                 parts.append(f'stroke-opacity:{sep}{self.opacity}')
             if self.linecap is not LineCap.default():
@@ -62,15 +140,15 @@ class Stroke:
             if self.linejoin is not LineJoin.default():
                 parts.append(f'stroke-linejoin:{sep}{self.linejoin.value}')
             if self.dasharray:
-                dashes = ' '.join(self.dasharray)
+                dashes = ' '.join(nums(self.dasharray, options))
                 parts.append(f'stroke-dasharray:{sep}{dashes}')
             if parts:
                 return f';{sep}'.join(parts)
         else:
-            if self.color != Color.BLACK:
-                parts = [f'stroke="{self.color}"']
+            if color != Color.BLACK:
+                parts = [f'stroke="{color}"']
             if self.width != 1:
-                parts.append(f'stroke-width="{self.width}"')
+                parts.append(f'stroke-width="{num(self.width, options)}"')
             if self.opacity != 1:
                 parts.append(f'stroke-opacity="{self.opacity}"')
             if self.linecap is not LineCap.default():
@@ -78,8 +156,29 @@ class Stroke:
             if self.linejoin is not LineJoin.default():
                 parts.append(f'stroke-linejoin="{self.linejoin.value}"')
             if self.dasharray:
-                dashes = ' '.join(self.dasharray)
+                dashes = ' '.join(nums(self.dasharray, options))
                 parts.append(f'stroke-dasharray="{dashes}"')
             if parts:
                 return ' '.join(parts)
         return ''
+
+
+# key: (Stroke._key(), the types of its numbers); value: Stroke
+_shared = weakref.WeakValueDictionary()
+
+
+def _stroke_for_key(key, shared):
+    color, width, opacity, linecap, linejoin, dasharray = key
+    if shared: # 2 == 2.0 but they may be written differently
+        typed_key = (key, width.__class__, opacity.__class__,
+                     dasharray and tuple(value.__class__
+                                         for value in dasharray))
+        stroke = _shared.get(typed_key)
+        if stroke is not None:
+            return stroke
+    stroke = Stroke(color, width, opacity=opacity, linecap=linecap,
+                    linejoin=linejoin, dasharray=dasharray)
+    if shared:
+        object.__setattr__(stroke, '_shared', True)
+        _shared[typed_key] = stroke
+    return stroke
@@ -2,10 +2,16 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-from . import SvgCommonMixin, SvgWriteMixin
+import collections
 
+from . import SvgCommonMixin, SvgLoadMixin, SvgWriteMixin
+from .Color import Color
+from .Options import Options
+from .Quantize import quantize
 
-class Svg(SvgCommonMixin.Mixin, SvgWriteMixin.Mixin): # Class and namespace
+
+class Svg(SvgCommonMixin.Mixin, SvgLoadMixin.Mixin, SvgWriteMixin.Mixin):
+    # Class and namespace
 
     def __init__(self, title=None, desc=None, *, stylesheet=None):
         self.title = title
@@ -15,7 +21,54 @@ class Svg(SvgCommonMixin.Mixin, SvgWriteMixin.Mixin): # Class and namespace
         # another common one: 'xmlns:xlink="http://www.w3.org/1999/xlink"'
         # TODO add automatically as needed or provide an API?
         self._shapes = []
+        self.quantization = None # set by write() if options.max_colors
+        self.fragments = None # set by write() if options.incremental
+        self._fragment_options = None # the options fragments were made for
 
 
     def __iadd__(self, shape):
         self._shapes.append(shape)
+        return self
+
+
+    def quantize(self, max_colors, *, options=None):
+        '''Returns a Quantization of all the drawing's stroke and fill
+        colors to at most `max_colors` representative colors.
+
+        The Quantization's `bytes_before` and `bytes_after` are the sizes
+        of the drawing written using the `options` (which default to
+        `Svg.Options()`) without and with the colors quantized; to get
+        them the drawing is serialized twice.
+
+        This does not change the drawing: to write it with the colors
+        quantized use `Options(max_colors=...)` (or pass the returned
+        Quantization's `recolor` as the `Options` `recolor`).'''
+        quantization = self._quantize(max_colors)
+        options = (Options() if options is None else options)._replace(
+            max_colors=None)
+        return quantization._replace(
+            bytes_before=len(self.dumps(options=options).encode('utf-8')),
+            bytes_after=len(self.dumps(options=options._replace(
+                recolor=quantization.recolor)).encode('utf-8')))
+
+
+    def _quantize(self, max_colors):
+        # Returns the Quantization without the sizes (see quantize())
+        counts = collections.Counter()
+        for shape in self._iter_shapes():
+            iter_styles = getattr(shape, '_iter_styles', None)
+            if iter_styles is None: # e.g., a Group
+                continue
+            for style in iter_styles(): # a style is None if default
+                if (style is not None and isinstance(style.color, Color) and
+                        style.color != Color.BLACK): # black isn't output
+                    counts[style.color] += 1
+        return quantize(counts, max_colors)
+
+
+    def _iter_shapes(self, shapes=None):
+        for shape in self._shapes if shapes is None else shapes:
+            yield shape
+            children = getattr(shape, '_shapes', None)
+            if children is not None: # e.g., a Group
+                yield from self._iter_shapes(children)
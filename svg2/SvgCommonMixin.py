@@ -2,22 +2,35 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+from .Batch import CircleBatch, LineBatch, RectBatch
 from .Fill import Fill
+from .LazySvg import LazySvg
 from .Options import Options, Version
-from .Shape import Circle, Ellipse, Line, Path, Polygon, Polyline, Rect
+from .Shape import (Circle, Ellipse, Line, Path, Polygon, Polyline, Rect,
+                    Text)
 from .Stroke import Stroke
+from .SvgTemplate import Slot, SvgTemplate
+from .SvgWriter import SvgWriter
 
 
 class Mixin:
 
     Circle = Circle
+    CircleBatch = CircleBatch
     Ellipse = Ellipse
     Fill = Fill
+    Lazy = LazySvg
     Line = Line
+    LineBatch = LineBatch
     Options = Options
     Path = Path
     Polygon = Polygon
     Polyline = Polyline
     Rect = Rect
+    RectBatch = RectBatch
+    Slot = Slot
     Stroke = Stroke
+    Template = SvgTemplate
+    Text = Text
     Version = Version
+    Writer = SvgWriter
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import array
+import gzip
+import io
+import os
+import re
+import xml.parsers.expat
+
+from .AbstractShape import _FILL
+from .Color import Color
+from .Fill import Fill, FillRule
+from .Group import Group
+from .Shape import Circle, Ellipse, Line, Polygon, Polyline, Rect, Text
+from .Stroke import LineCap, LineJoin, Stroke
+from .SvgError import SvgError
+
+
+class Mixin:
+
+    @classmethod
+    def load(Class, filename):
+        '''Returns a new drawing read from the given SVG file (or binary
+        stream), which is decompressed if it is gzipped (e.g., `.svgz`).
+
+        The file is parsed incrementally and each element is converted
+        into an svg2 object as soon as it has been read, so no document
+        tree is built. Supported elements are `line`, `rect`, `circle`,
+        `ellipse`, `polyline`, `polygon`, `text`, and `g` (a Group if it
+        has an `id`, otherwise its shapes are added to its parent), plus
+        the drawing's `title` and `desc`. Strokes and fills are read from
+        presentation attributes, `style` attributes, and classes defined in
+        `<style>` elements (wherever they are, e.g., in a `<defs>`); other
+        style properties are kept with `add_css_style()` and unknown
+        classes with `add_css_class()`. Lengths in px are read as numbers
+        and those in other units (e.g., `50%` or `2mm`) are kept as
+        strings. Unsupported elements (and their contents) are skipped.
+
+        See also loads().
+        '''
+        if isinstance(filename, (str, os.PathLike)):
+            with open(filename, 'rb') as file:
+                return _load(Class, file)
+        return _load(Class, filename)
+
+
+    @classmethod
+    def loads(Class, text):
+        '''Returns a new drawing read from the given string (or bytes) of
+        SVG.
+
+        See also load().
+        '''
+        if isinstance(text, str):
+            text = text.encode('utf-8')
+        return _load(Class, io.BytesIO(text))
+
+
+def _load(Class, file, classes=None):
+    if not hasattr(file, 'peek'):
+        file = io.BufferedReader(file)
+    if file.peek(2)[:2] == b'\x1F\x8B': # gzip's magic number
+        file = gzip.GzipFile(fileobj=file)
+    loader = _Loader(Class, classes)
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = loader.start
+    parser.EndElementHandler = loader.end
+    parser.CharacterDataHandler = loader.characters
+    try:
+        while True:
+            data = file.read(_READ_SIZE)
+            if not data:
+                break
+            parser.Parse(data, False)
+        parser.Parse(b'', True)
+    except xml.parsers.expat.ExpatError as err:
+        raise SvgError(f'invalid SVG: {err}') from None
+    return loader.svg
+
+
+class _Loader:
+    # expat handlers which build the drawing element by element
+
+    def __init__(self, Class, classes=None):
+        self.svg = Class()
+        self.svg._namespaces = [] # set from the <svg> element
+        self.containers = [] # the Svg and any Groups; last is current
+        self.skipping = 0 # depth within an unsupported element
+        self.texts = None # gathers character data for the current element
+        self.css = None # gathers the text of the current <style>
+        self.text_shape = None # the current Text
+        # key: class name; value: style properties dict
+        self.classes = {} if classes is None else dict(classes)
+        self.styles = {} # key: style attributes; value: _style() tuple
+
+
+    def start(self, name, attrs):
+        if name == 'style': # wherever it is, e.g., in a skipped <defs>
+            self.css = []
+            return
+        if self.skipping:
+            self.skipping += 1
+            return
+        if name == 'svg' and not self.containers:
+            self.svg._namespaces = [f'{key}="{value}"' for key, value in
+                                    attrs.items() if key == 'xmlns' or
+                                    key.startswith('xmlns:')]
+            self.containers.append(self.svg)
+            return
+        if not self.containers:
+            raise SvgError(f'expected <svg>, got <{name}>')
+        if name in {'title', 'desc'}:
+            self.texts = []
+            return
+        make = _MAKERS.get(name)
+        if make is not None:
+            key = tuple(map(attrs.get, _STYLE_KEYS))
+            style = self.styles.get(key) # most shapes share a few styles
+            if style is None:
+                style = self.styles[key] = self._style(attrs)
+            stroke, fill, css_classes, css_style = style
+            try:
+                shape = make(attrs, stroke, fill)
+            except (KeyError, ValueError) as err:
+                raise SvgError(f'invalid <{name}>: {err}') from None
+            for css_class in css_classes:
+                shape.add_css_class(css_class)
+            for key, value in css_style:
+                shape.add_css_style(key, value)
+            self.containers[-1]._shapes.append(shape)
+            if name == 'text':
+                self.text_shape = shape
+                self.texts = []
+            else:
+                self.skipping = 1 # skip any child elements
+        elif name == 'g':
+            group_id = attrs.get('id')
+            if group_id is None:
+                self.containers.append(self.containers[-1]) # flatten
+            else:
+                group = Group(group_id)
+                self.containers[-1]._shapes.append(group)
+                self.containers.append(group)
+        else:
+            self.skipping = 1
+
+
+    def end(self, name):
+        if name == 'style':
+            for class_name, properties in _CSS_RULE.findall(
+                    ''.join(self.css)):
+                self.classes[class_name] = _properties(properties)
+            self.css = None
+        elif self.skipping:
+            self.skipping -= 1
+        elif name == 'g':
+            self.containers.pop()
+        elif self.texts is not None:
+            text = ''.join(self.texts)
+            self.texts = None
+            if name == 'text':
+                self.text_shape.text = text
+                self.text_shape = None
+            elif len(self.containers) == 1: # title or desc of the <svg>
+                setattr(self.svg, name, text)
+
+
+    def characters(self, text):
+        if self.css is not None:
+            self.css.append(text)
+        elif self.texts is not None and not self.skipping:
+            self.texts.append(text)
+
+
+    def _style(self, attrs):
+        # Returns the stroke (or None for the default), fill, CSS classes,
+        # and other CSS style properties, given by the attributes
+        properties = {key: value for key, value in attrs.items()
+                      if key in _STYLE_NAMES}
+        css_classes = []
+        for class_name in attrs.get('class', '').split():
+            class_properties = self.classes.get(class_name)
+            if class_properties is None:
+                css_classes.append(class_name)
+            else:
+                properties.update(class_properties)
+        style = attrs.get('style')
+        if style:
+            properties.update(_properties(style))
+        try:
+            stroke = (_stroke(properties) if any(
+                      key.startswith('stroke') for key in properties)
+                      else None)
+            fill = _fill(properties) # SVG's default fill is black
+        except (KeyError, ValueError) as err:
+            raise SvgError(f'invalid style: {err}') from None
+        css_style = [(key, value) for key, value in properties.items()
+                     if key not in _STYLE_NAMES]
+        return stroke, fill, css_classes, css_style
+
+
+def _properties(style):
+    # Returns a dict of the properties in a CSS declarations string
+    properties = {}
+    for declaration in style.split(';'):
+        key, colon, value = declaration.partition(':')
+        if colon:
+            properties[key.strip()] = value.strip()
+    return properties
+
+
+def _stroke(properties):
+    # Returns a shared Stroke
+    color = properties.get('stroke')
+    dasharray = properties.get('stroke-dasharray')
+    return Stroke.intern(Stroke(
+        Color.BLACK if color is None else Color(color),
+        _number(properties.get('stroke-width', '1')),
+        opacity=_number(properties.get('stroke-opacity', '1')),
+        linecap=LineCap(properties.get('stroke-linecap',
+                                       LineCap.default().value)),
+        linejoin=LineJoin(properties.get('stroke-linejoin',
+                                         LineJoin.default().value)),
+        dasharray=(None if dasharray is None or dasharray == 'none' else
+                   _numbers(dasharray))))
+
+
+def _fill(properties):
+    # Returns a shared Fill or None for the default Fill
+    color = properties.get('fill', 'black')
+    fill = Fill.intern(Fill(
+        color if color == 'none' else Color(color),
+        opacity=_number(properties.get('fill-opacity', '1')),
+        fillrule=FillRule(properties.get('fill-rule',
+                                         FillRule.default().value))))
+    return None if fill is _FILL else fill
+
+
+def _number(text):
+    try:
+        if '.' in text or 'e' in text or 'E' in text:
+            return float(text)
+        return int(text)
+    except ValueError:
+        text = text.strip()
+        if text.endswith('px'):
+            return _number(text[:-2])
+        if _LENGTH.fullmatch(text):
+            return _Length(text)
+        raise
+
+
+class _Length(str):
+    # A length in units other than px (e.g., '50%' or '2mm'), which is kept
+    # and written as is since it can't be converted to user units
+
+    __slots__ = ()
+
+    def __format__(self, _spec): # so that num() works with any precision
+        return str(self)
+
+
+def _numbers(text):
+    return [_number(value) for value in text.replace(',', ' ').split()]
+
+
+def _points(text):
+    return array.array('d', map(float, text.replace(',', ' ').split()))
+
+
+_MAKERS = { # each takes the attributes, stroke, and fill
+    'line': lambda attrs, stroke, _: Line(
+        _number(attrs.get('x1', '0')), _number(attrs.get('y1', '0')),
+        _number(attrs.get('x2', '0')), _number(attrs.get('y2', '0')),
+        stroke=stroke),
+    'rect': lambda attrs, stroke, fill: Rect(
+        _number(attrs.get('x', '0')), _number(attrs.get('y', '0')),
+        width=_number(attrs['width']), height=_number(attrs['height']),
+        stroke=stroke, fill=fill),
+    'circle': lambda attrs, stroke, fill: Circle(
+        _number(attrs.get('cx', '0')), _number(attrs.get('cy', '0')),
+        radius=_number(attrs['r']), stroke=stroke, fill=fill),
+    'ellipse': lambda attrs, stroke, fill: Ellipse(
+        _number(attrs.get('cx', '0')), _number(attrs.get('cy', '0')),
+        xradius=_number(attrs['rx']), yradius=_number(attrs['ry']),
+        stroke=stroke, fill=fill),
+    'polyline': lambda attrs, stroke, fill: Polyline(
+        _points(attrs.get('points', '')), stroke=stroke, fill=fill),
+    'polygon': lambda attrs, stroke, fill: Polygon(
+        _points(attrs.get('points', '')), stroke=stroke, fill=fill),
+    'text': lambda attrs, stroke, fill: Text(
+        _number(attrs.get('x', '0')), _number(attrs.get('y', '0')), '',
+        stroke=stroke, fill=fill),
+}
+_STYLE_NAMES = frozenset((
+    'stroke', 'stroke-width', 'stroke-opacity', 'stroke-linecap',
+    'stroke-linejoin', 'stroke-dasharray', 'fill', 'fill-opacity',
+    'fill-rule'))
+_STYLE_KEYS = ('class', 'style', *_STYLE_NAMES) # attributes for styles
+_LENGTH = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?:%|[a-z]+)')
+_CSS_RULE = re.compile(r'\.([-\w]+)\s*\{([^}]*)\}')
+_READ_SIZE = 0x10000
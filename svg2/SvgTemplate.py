@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import contextvars
+import io
+import re
+from xml.sax.saxutils import escape as esc
+
+from .Number import num
+from .Options import Options
+from .SvgError import SvgError
+
+
+class Slot(str):
+    '''A named placeholder for a value that's given when an SvgTemplate is
+    rendered.
+
+    A Slot can be added to a drawing (or Group) in place of a shape, e.g.,
+    `svg += Svg.Slot('bars')`, in which case its value is a shape (or
+    Group or batch) or a list of them. Or it can be used in place of a
+    shape's number or text, e.g., `Svg.Rect(0, 0, width=Svg.Slot('w'),
+    height=10)` or `Svg.Text(5, 5, Svg.Slot('title'))`, in which case its
+    value is a number or string. (To vary a shape's stroke or fill make
+    the whole shape a slot.) Writing a drawing that has a Slot other than
+    by rendering an SvgTemplate of it raises an SvgError.
+    '''
+
+    __slots__ = ()
+
+    def __new__(Class, name):
+        if not name.isidentifier():
+            raise SvgError(f'invalid slot name {name!r}')
+        return super().__new__(Class, f'\0{name}\x01\0')
+
+
+    @property
+    def name(self):
+        return self[1:-2]
+
+
+    def __repr__(self):
+        return f'Slot({self.name!r})'
+
+
+    def __getnewargs__(self):
+        return (self.name,)
+
+
+    def __str__(self): # used by num() and Text.svg()
+        _check_compiling(self)
+        return str.__str__(self)
+
+
+    def __format__(self, _spec): # so that num() works with any precision
+        return str(self)
+
+
+    def svg(self, indent, options):
+        _check_compiling(self)
+        return f'\0{self.name}\x01{indent}\0'
+
+
+    def write(self, out, indent, options):
+        out.write(self.svg(indent, options))
+
+
+class SvgTemplate:
+    '''A drawing compiled for fast repeated rendering with different slot
+    values.
+
+    For example:
+        svg = Svg('Sales')
+        ... # add axes, grid lines, legend, etc.
+        svg += Svg.Text(10, 20, Svg.Slot('title'))
+        svg += Svg.Slot('bars')
+        template = Svg.Template(svg)
+        ...
+        data = template.render(title='Q3', bars=Svg.RectBatch(...))
+
+    The drawing is serialized once, when the template is created, and its
+    static parts are kept as UTF-8 bytes; `render()` only serializes the
+    slot values and joins them with the static parts. Later changes to the
+    drawing don't affect the template.
+    '''
+
+    def __init__(self, svg, *, options=None):
+        '''The `options` (which defaults to `Svg.Options()`) are used both to
+        compile the template and to serialize slot values; `max_colors` and
+        `extract_styles` can't be used since they depend on every shape.
+        '''
+        if options is None:
+            options = Options()
+        if options.max_colors or options.extract_styles:
+            raise SvgError('max_colors and extract_styles need the whole '
+                           'drawing so can\'t be used with templates')
+        self._options = options
+        token = _compiling.set(True) # so Slots write their markers
+        try: # in this process with no fragments to reuse or keep
+            text = svg.dumps(options=options._replace(workers=1,
+                                                      incremental=False))
+        finally:
+            _compiling.reset(token)
+        parts = _SLOT.split(text)
+        self._statics = [part.encode('utf-8') for part in parts[::3]]
+        self._slots = list(zip(parts[1::3], parts[2::3])) # (name, indent)
+        self.names = frozenset(parts[1::3])
+
+
+    def render(self, **values):
+        '''Returns the drawing as UTF-8 bytes of SVG with each slot replaced
+        by its value.'''
+        options = self._options
+        statics = self._statics
+        pieces = [statics[0]]
+        for (name, indent), static in zip(self._slots, statics[1:]):
+            try:
+                value = values[name]
+            except KeyError:
+                raise SvgError(f'no value for slot {name!r}') from None
+            pieces.append(_text(value, indent, options).encode('utf-8'))
+            pieces.append(static)
+        return b''.join(pieces)
+
+
+    def renders(self, **values):
+        '''Returns the drawing as a string of SVG with each slot replaced by
+        its value.'''
+        return self.render(**values).decode('utf-8')
+
+
+def _check_compiling(slot):
+    # Raises an SvgError unless an SvgTemplate is being compiled, since
+    # otherwise the slot's marker would make the SVG invalid
+    if not _compiling.get():
+        raise SvgError(f'{slot!r} has no value: it can only be written by '
+                       'rendering an SvgTemplate')
+
+
+def _text(value, indent, options):
+    # Returns the SVG for a slot's value
+    if isinstance(value, str):
+        return esc(value, _QUOTE) # may be in an attribute
+    if isinstance(value, (int, float)):
+        return num(value, options)
+    out = io.StringIO()
+    for shape in ((value,) if hasattr(value, 'write') else value):
+        shape.write(out, indent, options)
+    return out.getvalue()
+
+
+_compiling = contextvars.ContextVar('_compiling', default=False)
+_SLOT = re.compile('\0(\\w+)\x01([^\0]*)\0')
+_QUOTE = {'"': '&quot;'}
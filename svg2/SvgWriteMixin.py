@@ -2,12 +2,22 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+import asyncio
+import collections
+import concurrent.futures
+import functools
 import gzip
 import io
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
 from xml.sax.saxutils import escape as esc
 
 from .SvgError import SvgError
 from .Options import Options, Version
+from .ParallelGzip import ParallelGzipFile
 
 # from xml.sax.saxutils import quoteattr as qa
 
@@ -26,11 +36,10 @@ class Mixin:
 
         See also dumps() and write().
         '''
-        opener = (gzip.open
-                  if filename[-7:].upper().endswith(('.SVGZ', '.SVG.GZ'))
-                  else open)
-        with opener(filename, 'wt', encoding='utf-8') as file:
-            self.write(file, options if options is not None else Options())
+        if options is None:
+            options = Options()
+        with _open(filename, options) as file:
+            self.write(file, options)
 
 
     dump = save # dump is more Pythonic; save is more meaningful
@@ -42,7 +51,7 @@ class Mixin:
         The `options` defaults to `Svg.Options()`; for human readability
         use `options=Svg.Options.pretty()`.
 
-        See also save(), and write().
+        See also dumpb(), save(), and write().
         '''
         out = io.StringIO()
         try:
@@ -52,40 +61,333 @@ class Mixin:
             out.close()
 
 
+    def dumpb(self, *, options=None, view=False):
+        '''Returns the drawing as UTF-8 bytes of SVG, or as a memoryview of
+        them if `view` is `True` (which avoids a final copy).
+
+        This is equivalent to, but faster and using less memory than,
+        `dumps().encode('utf-8')` since each chunk of SVG is encoded as it
+        is written.
+
+        The `options` defaults to `Svg.Options()`; for human readability
+        use `options=Svg.Options.pretty()`.
+
+        See also dumps().
+        '''
+        out = io.BytesIO()
+        self.write(out, options if options is not None else Options())
+        return out.getbuffer() if view else out.getvalue()
+
+
     def write(self, out, options):
         '''Saves the drawing as a string of SVG to the given `out` stream.
 
         This is a low-level method: it is more convenient to use `save()` or
         `dumps()` (or `dump()`).
 
-        `out` should be file-like writable; `options` should be an
-        `Svg.Options` object.
+        `out` should be file-like writable, either a text stream or a
+        binary stream (e.g., a file opened in 'wb' mode, a `GzipFile`, or a
+        pipe) in which case UTF-8 is written; `options` should be an
+        `Svg.Options` object. Output is gathered into chunks of about
+        `options.chunk_size` characters, each written (and if need be
+        encoded) with one call.
 
         It's the caller's responsibility to close the `out` stream if
         appropriate.
         '''
-        # Always use newlines for XML declaration and DOCTYPE (ignoring nl)
-        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-        version = options.version
-        if version is Version.V_1_1:
-            out.write(
-                '<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" '
-                '"http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">\n')
+        options = self._prepare(options)
+        if options.incremental:
+            if options == self._fragment_options: # keep the options the
+                options = self._fragment_options # fragments were made for
+            else:
+                self._fragment_options = options
+        out = _chunked(out, options)
+        _write_head(out, options, self)
+        if options.incremental:
+            self.fragments = _write_fragments(out, self._shapes, options)
+        elif (options.workers != 1 and
+                len(self._shapes) > options.worker_chunk_size):
+            _write_parallel(out, self._shapes, options)
         else:
-            raise SvgError(f'unsupported SVG version {version.value}')
-        out.write(f'<svg version="{version.value}"')
-        for ns in self._namespaces:
-            out.write(f' {ns}')
-        # TODO write any other <svg> attributes, e.g., x, y, width, height,
-        # viewBox, etc.
-        out.write('>\n')
-        nl = options.nl
-        if self.title:
-            out.write(f'<title>{esc(self.title)}</title>{nl}')
-        if self.desc:
-            out.write(f'<desc>{esc(self.desc)}</desc>{nl}')
-        if self.stylesheet:
-            print('TODO: output stylesheet') # TODO
+            for shape in self._shapes:
+                shape.write(out, '', options)
+        out.write('</svg>\n')
+        out.flush()
+
+
+    async def aiter_bytes(self, *, options=None, slice_size=1000):
+        '''An async generator which yields the drawing as chunks of UTF-8
+        SVG bytes of about `options.chunk_size` bytes each, yielding control
+        to the event loop after serializing every `slice_size` shapes
+        (counting each shape in a Group or batch, so even one huge batch
+        doesn't block the loop for long).
+
+        For example, to send a chunked HTTP response:
+            async for chunk in svg.aiter_bytes():
+                await response.write(chunk)
+
+        The `options` defaults to `Svg.Options()`; its `workers` is
+        ignored.
+
+        See also awrite().
+        '''
+        options = self._prepare(options if options is not None else
+                                Options())
+        chunks = _Chunks()
+        out = _chunked(chunks, options)
+        _write_head(out, options, self)
+        count = 0 # shapes serialized since control was last yielded
         for shape in self._shapes:
-            shape.write(out, '', options)
+            iter_write = getattr(shape, '_iter_write', None)
+            if iter_write is None:
+                shape.write(out, '', options)
+                counts = (1,)
+            else: # a Group or batch
+                counts = iter_write(out, '', options, slice_size)
+            for written in counts:
+                count += written
+                if count >= slice_size:
+                    count = 0
+                    for chunk in chunks.pop():
+                        yield chunk
+                    await asyncio.sleep(0)
+        if count: # the last (partial) slice
+            for chunk in chunks.pop():
+                yield chunk
+            await asyncio.sleep(0)
         out.write('</svg>\n')
+        out.flush()
+        for chunk in chunks.pop():
+            yield chunk
+
+
+    async def awrite(self, writer, *, options=None, slice_size=1000):
+        '''Writes the drawing as UTF-8 SVG to the given `writer` which must
+        have a `write(bytes)` method and an async `drain()` method (e.g.,
+        an `asyncio.StreamWriter`), awaiting `drain()` after each chunk.
+
+        See aiter_bytes() for the `options` and `slice_size`.
+        '''
+        async for chunk in self.aiter_bytes(options=options,
+                                            slice_size=slice_size):
+            writer.write(chunk)
+            await writer.drain()
+
+
+    def _prepare(self, options):
+        # Returns the options to write with, quantizing and extracting
+        # styles if requested
+        if options.max_colors:
+            self.quantization = self._quantize(options.max_colors)
+            options = options._replace(recolor=self.quantization.recolor)
+        if options.extract_styles: # style_classes is filled in place so
+            # that the styles' svg() memos are for the options used to write
+            options = options._replace(use_style=True, style_classes={})
+            self._add_style_classes(options)
+        return options
+
+
+    def _add_style_classes(self, options):
+        # Maps each distinct stroke and fill style text in the drawing to a
+        # generated class name in options.style_classes
+        for shape in self._iter_shapes():
+            add_style_classes = getattr(shape, '_add_style_classes', None)
+            if add_style_classes is not None: # e.g., not a Group
+                add_style_classes(options)
+
+
+
+
+Fragments = collections.namedtuple('Fragments', 'reused rebuilt')
+
+
+def _write_fragments(out, shapes, options):
+    # Writes the shapes reusing the fragments of those that haven't changed
+    # (Groups and Slots are always rebuilt); returns the Fragments counts
+    reused = 0
+    parts = []
+    for shape in shapes:
+        fragment_svg = getattr(shape, '_fragment_svg', None)
+        if fragment_svg is None:
+            parts.append(shape.svg('', options))
+        else:
+            text, was_reused = fragment_svg('', options)
+            parts.append(text)
+            reused += was_reused
+        if len(parts) >= 1000:
+            out.write(''.join(parts))
+            parts.clear()
+    out.write(''.join(parts))
+    return Fragments(reused, len(shapes) - reused)
+
+
+def _write_parallel(out, shapes, options):
+    # Serializes contiguous chunks of shapes in parallel and writes them in
+    # their original order. Uses threads if the GIL is disabled (in a
+    # free-threaded build) and otherwise processes. Forked processes
+    # inherit the shapes so only each chunk's span is sent to them (since
+    # pickling a shape takes longer than serializing it); otherwise each
+    # chunk of shapes is pickled. A process that has other threads (e.g.,
+    # ParallelGzipFile's, or an asyncio loop's executor's) isn't forked
+    # since a thread holding a lock when it's forked can deadlock the child.
+    size = options.worker_chunk_size
+    spans = [(i, i + size) for i in range(0, len(shapes), size)]
+    chunks = (shapes[i:j] for i, j in spans)
+    if not getattr(sys, '_is_gil_enabled', lambda: True)():
+        Executor = concurrent.futures.ThreadPoolExecutor
+        serialize = _serialize
+    elif ('fork' in multiprocessing.get_all_start_methods() and
+            threading.active_count() == 1):
+        Executor = functools.partial(
+            concurrent.futures.ProcessPoolExecutor,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_set_shapes, initargs=(shapes,))
+        serialize = _serialize_span
+        chunks = spans
+    else:
+        Executor = functools.partial(
+            concurrent.futures.ProcessPoolExecutor,
+            mp_context=multiprocessing.get_context(_START_METHOD))
+        serialize = _serialize
+    with Executor(options.workers) as executor:
+        for text in executor.map(serialize, chunks,
+                                 itertools.repeat(options)):
+            out.write(text)
+
+
+def _serialize(shapes, options):
+    out = io.StringIO()
+    for shape in shapes:
+        shape.write(out, '', options)
+    return out.getvalue()
+
+
+def _set_shapes(shapes):
+    # Called in each forked worker process
+    global _shapes
+    _shapes = shapes
+
+
+def _serialize_span(span, options):
+    i, j = span
+    return _serialize(_shapes[i:j], options)
+
+
+_shapes = None # A forked worker process's inherited shapes
+_START_METHOD = ('forkserver' if 'forkserver' in
+                 multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def _open(filename, options):
+    # Returns a binary file for writing, compressed if filename ends .svgz
+    # or .svg.gz
+    filename = os.fspath(filename)
+    if not filename[-7:].upper().endswith(('.SVGZ', '.SVG.GZ')):
+        return open(filename, 'wb')
+    if options.compress_threads == 1:
+        return gzip.open(filename, 'wb',
+                         compresslevel=options.compresslevel)
+    return ParallelGzipFile(filename, compresslevel=options.compresslevel,
+                            threads=options.compress_threads)
+
+
+def _chunked(out, options):
+    # Returns a _ChunkedWriter for out unless out is a text stream that's to
+    # be written to directly (chunk_size=0)
+    if options.chunk_size or isinstance(out, (io.RawIOBase,
+                                              io.BufferedIOBase)):
+        return _ChunkedWriter(out, options.chunk_size)
+    return out
+
+
+class _ChunkedWriter:
+    # Gathers text written to it into chunks of about chunk_size
+    # characters and writes each to the underlying stream with one call,
+    # encoding it to UTF-8 if the stream is binary
+
+    __slots__ = ('out', '_encode', '_chunk_size', '_parts', '_size')
+
+    def __init__(self, out, chunk_size):
+        self.out = out
+        self._encode = isinstance(out, (io.RawIOBase, io.BufferedIOBase))
+        self._chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_size:
+            self.flush()
+
+
+    def flush(self):
+        # Only flushes our buffer, not the underlying stream
+        if self._parts:
+            text = ''.join(self._parts)
+            self._parts.clear()
+            self._size = 0
+            self.out.write(text.encode('utf-8') if self._encode else text)
+
+
+class _Chunks(io.RawIOBase):
+    # A binary stream (so that a _ChunkedWriter writes UTF-8 to it) which
+    # keeps the chunks written to it until they're popped
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+
+    def writable(self):
+        return True
+
+
+    def write(self, data):
+        self._chunks.append(data)
+        return len(data)
+
+
+    def pop(self):
+        chunks = self._chunks
+        self._chunks = []
+        return chunks
+
+
+def _write_head(out, options, svg):
+    # Writes everything before the shapes; svg is an Svg or an SvgWriter
+    # Always use newlines for XML declaration and DOCTYPE (ignoring nl)
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    version = options.version
+    if version is Version.V_1_1:
+        out.write(
+            '<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" '
+            '"http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">\n')
+    else:
+        raise SvgError(f'unsupported SVG version {version.value}')
+    out.write(f'<svg version="{version.value}"')
+    for ns in svg._namespaces:
+        out.write(f' {ns}')
+    # TODO write any other <svg> attributes, e.g., x, y, width, height,
+    # viewBox, etc.
+    out.write('>\n')
+    nl = options.nl
+    if svg.title:
+        out.write(f'<title>{esc(svg.title)}</title>{nl}')
+    if svg.desc:
+        out.write(f'<desc>{esc(svg.desc)}</desc>{nl}')
+    if svg.stylesheet:
+        print('TODO: output stylesheet') # TODO
+    if options.style_classes:
+        _write_style_classes(out, options)
+
+
+def _write_style_classes(out, options):
+    nl = options.nl
+    tab = options.tab
+    sep = options.sep
+    out.write(f'<style>{nl}')
+    for text, name in options.style_classes.items():
+        out.write(f'{tab}.{name}{sep}{{{text}}}{nl}')
+    out.write(f'</style>{nl}')
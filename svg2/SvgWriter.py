@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import os
+
+from .Options import Options
+from .SvgError import SvgError
+from .SvgWriteMixin import _chunked, _open, _write_head
+
+
+class SvgWriter:
+    '''Writes a drawing shape by shape, so that documents of any number of
+    shapes can be written in constant memory.
+
+    For example:
+        with Svg.Writer('big.svgz', title='Big') as svg:
+            for x, y in points:
+                svg += Svg.Circle(x, y, radius=2, fill='red')
+
+    The XML prolog and `<svg>` start tag (and the title and description)
+    are written immediately, each shape is written as soon as it is added
+    and is not kept, and `</svg>` is written by `close()` (which is called
+    automatically at the end of a `with` block).
+
+    Options that need the whole drawing before writing (`max_colors` and
+    `extract_styles`) can't be used; however, a `recolor` dict can.
+    '''
+
+    def __init__(self, file, title=None, desc=None, *, stylesheet=None,
+                 options=None):
+        '''`file` is a filename or a file-like writable text or binary
+        stream. A file that's opened is compressed if its name ends `.svgz`
+        or `.svg.gz` and is closed by `close()`; a stream that's passed is
+        left open. The `options` defaults to `Svg.Options()`.
+        Output is gathered into chunks of about `options.chunk_size`
+        characters: use `flush()` to write what's been gathered so far.'''
+        if options is None:
+            options = Options()
+        if options.max_colors or options.extract_styles:
+            raise SvgError('max_colors and extract_styles need the whole '
+                           'drawing so can\'t be used when streaming')
+        self.title = title
+        self.desc = desc
+        self.stylesheet = stylesheet
+        self._namespaces = ['xmlns="http://www.w3.org/2000/svg"']
+        self._options = options
+        self._file = (_open(file, options)
+                      if isinstance(file, (str, os.PathLike))
+                      else None) # only set if opened here
+        self._out = _chunked(file if self._file is None else self._file,
+                             options)
+        self.count = 0 # the number of shapes written
+        _write_head(self._out, options, self)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *_):
+        self.close()
+
+
+    def __iadd__(self, shape):
+        self.add(shape)
+        return self
+
+
+    def add(self, shape):
+        '''Writes the given shape (or Group or batch).'''
+        if self._out is None:
+            raise SvgError('cannot add to a closed SvgWriter')
+        shape.write(self._out, '', self._options)
+        self.count += 1
+
+
+    def flush(self):
+        '''Writes any gathered output to the file or stream (but doesn't
+        flush the file or stream itself).'''
+        if self._out is not None:
+            self._out.flush()
+
+
+    def close(self):
+        '''Writes `</svg>` and closes the file if it was opened by the
+        SvgWriter. Does nothing if already closed.'''
+        if self._out is not None:
+            out = self._out
+            self._out = None
+            try:
+                out.write('</svg>\n')
+                out.flush()
+            finally:
+                if self._file is not None:
+                    self._file.close()
@@ -6,5 +6,11 @@ __version__ = '0.1.1'
 
 
 from .Color import Color
+from .ColorArray import ColorArray
+from .ColorMap import ColorMap
+from .LazySvg import LazySvg
+from .Palette import Palette
 from .Svg import Svg
 from .SvgError import SvgError
+from .SvgTemplate import Slot, SvgTemplate
+from .SvgWriter import SvgWriter
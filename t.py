@@ -2,9 +2,23 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+import array
+import asyncio
+import gzip
+import io
+import os
+import pickle
+import re
+import tempfile
+import threading
 import unittest
+from xml.sax.saxutils import escape as esc
 
-from svg2 import Color, Svg, SvgError
+from svg2 import Color, ColorArray, ColorMap, Palette, Svg, SvgError
+from svg2.AbstractShape import _class_name
+from svg2.Color import _palette_for
+from svg2.Group import Group
+from svg2.Number import num, nums
 
 
 class TestSvg(unittest.TestCase):
@@ -132,6 +146,206 @@ class TestSvg(unittest.TestCase):
         self.assertEqual(Color.CURRENTCOLOR.name, 'currentColor')
 
 
+    def test_color4(self):
+        color = Color(0x12, 0x34, 0x56, 0x78)
+        self.assertEqual(color.rgba, (0x12, 0x34, 0x56, 0x78))
+        with self.assertRaises(AttributeError):
+            color._n = 0
+        with self.assertRaises(AttributeError):
+            color.red = 0
+        self.assertEqual(pickle.loads(pickle.dumps(color)), color)
+        self.assertIs(pickle.loads(pickle.dumps(Color.NONE)).name, 'none')
+        uri = Color('url(#grad1)')
+        self.assertEqual(pickle.loads(pickle.dumps(uri)), uri)
+        self.assertEqual(len({Color('red'), Color.RED, Color(255), uri,
+                              Color('url(#grad1)'), Color.NONE,
+                              Color.TRANSPARENT}), 3)
+        self.assertNotEqual(Color.RED, 'red')
+        self.assertNotEqual(Color.NONE, Color.CURRENTCOLOR)
+        self.assertNotEqual(uri, Color('url(#grad2)'))
+        self.assertEqual(Color(0, 0, 127.0, 255 * 0.8),
+                         Color('rgba(0,0,127,0.8)'))
+
+
+    def test_color_cache(self):
+        self.assertEqual(Color.cache_info(), (0, 0, 0, 0))
+        self.assertIsNot(Color('steelblue'), Color('steelblue'))
+        try:
+            Color.set_cache_size(2)
+            a = Color('steelblue')
+            self.assertIs(a, Color('steelblue'))
+            self.assertEqual(a, Color.STEELBLUE)
+            b = Color('#1f77b4')
+            self.assertIs(b, Color('#1f77b4'))
+            Color('red') # evicts 'steelblue'
+            self.assertIsNot(a, Color('steelblue'))
+            self.assertEqual(Color.cache_info(), (2, 4, 2, 2))
+            with self.assertRaises(SvgError):
+                Color('bad name')
+            self.assertEqual(Color.cache_info().size, 2)
+            Color.cache_clear()
+            self.assertEqual(Color.cache_info(), (0, 0, 2, 0))
+        finally:
+            Color.set_cache_size(0)
+        self.assertEqual(Color.cache_info(), (0, 0, 0, 0))
+
+
+    def test_color_array(self):
+        texts = ['orange', '#22CCBB', '#7FA1F0D0', 'rgb(0,255,0)', 'orange']
+        colors = ColorArray.from_strings(texts)
+        self.assertEqual(len(colors), 5)
+        self.assertEqual(colors[0], Color.ORANGE)
+        self.assertEqual(list(colors), [Color(text) for text in texts])
+        self.assertEqual(colors.strings(),
+                         [str(Color(text)) for text in texts])
+        self.assertEqual(colors.names(), [Color(text).name for text in texts])
+        self.assertEqual(colors.rgb_html(),
+                         ['#FFA500', '#2CB', '#7FA1F0', '#0F0', '#FFA500'])
+        self.assertEqual(colors.rgba_html(minimize=False)[2], '#7FA1F0D0')
+        self.assertEqual(colors.rgba_css(sep=', ')[2],
+                         'rgba(127, 161, 240, 0.82)')
+        self.assertEqual(colors[1:3].rgb_css(),
+                         ['rgb(34,204,187)', 'rgb(127,161,240)'])
+        self.assertEqual(list(ColorArray.from_ints([0xFF0000FF, 0x0000FF80])),
+                         [Color.RED, Color(0, 0, 0xFF, 0x80)])
+        self.assertEqual(list(ColorArray.from_floats([(1.0, 0.0, 0.0),
+                                                      (0, 0, 1.0, 0.5)])),
+                         [Color.RED, Color(0, 0, 0xFF, 0x80)])
+        self.assertEqual(
+            list(ColorArray.from_colors([Color.BLUE])), [Color.BLUE])
+        with self.assertRaises(SvgError):
+            ColorArray.from_strings(['red', 'none'])
+        with self.assertRaises(SvgError):
+            ColorArray.from_floats([(1.5, 0, 0)])
+        with self.assertRaises(SvgError):
+            ColorArray.from_ints([-1])
+
+
+    def test_color_map(self):
+        cmap = ColorMap(['black', 'white'])
+        self.assertEqual(len(cmap), 256)
+        self.assertEqual(cmap(0), Color.BLACK)
+        self.assertEqual(cmap(1), Color.WHITE)
+        self.assertEqual(cmap(-5), Color.BLACK)
+        self.assertEqual(cmap(0.5), Color(0x80, 0x80, 0x80))
+        colors = cmap.map([0.25, 0.5, 0.25, 9])
+        self.assertIs(colors[0], colors[2])
+        self.assertEqual(colors[1], Color.GRAY)
+        self.assertEqual(cmap.strings([0, 0.5, 1]), ['#000', 'grey', '#FFF'])
+        self.assertEqual(cmap.strings([10, 20], vmin=10, vmax=20),
+                         ['#000', '#FFF'])
+        self.assertEqual(list(cmap.color_array([0, 1])),
+                         [Color.BLACK, Color.WHITE])
+        cmap = ColorMap([(0, 'red'), (0.75, 'lime'), (1, Color.BLUE)],
+                        size=5, vmin=0, vmax=100)
+        self.assertEqual(cmap.strings(range(0, 101, 25)),
+                         ['red', '#A50', '#5A0', 'lime', 'blue'])
+        circle = Svg.Circle(1, 2, radius=3, fill=cmap(75))
+        self.assertEqual(circle.svg('', Svg.Options()),
+                         '<circle cx="1" cy="2" r="3" style="fill:lime"/>')
+        with self.assertRaises(SvgError):
+            ColorMap(['red'])
+        with self.assertRaises(SvgError):
+            cmap.map([float('nan')])
+        cmap = ColorMap(['black', 'white'], size=5) # same with(out) NumPy
+        self.assertEqual(list(cmap.indexes([0.125, 0.375, 0.625, -0.125,
+                                            float('inf'), -float('inf')])),
+                         [1, 2, 3, 0, 4, 0])
+
+
+    def test_palette(self):
+        self.assertEqual(Color(0xFE, 1, 2).nearest(), Color.RED)
+        self.assertEqual(Color(0x47, 0x80, 0xB3).nearest().name, 'steelblue')
+        self.assertEqual(Color(0xFE, 1, 2, 0x80).nearest(),
+                         Color(0xFF, 0, 0, 0x80))
+        self.assertIs(Color.NONE.nearest(), Color.NONE)
+        brand = Palette(['#1F77B4', '#FF7F0E', '#2CA02C', '#1F77B4'])
+        self.assertEqual(len(brand), 3)
+        self.assertEqual(Color(0x20, 0x70, 0xB0).nearest(brand),
+                         Color('#1F77B4'))
+        colors = ['#1F77B4', '#FF7F0E'] # its Palette is built only once
+        self.assertEqual(Color(0xF0, 0x80, 0x10).nearest(colors),
+                         Color('#FF7F0E'))
+        self.assertIs(_palette_for(colors), _palette_for(tuple(colors)))
+        colors = [Color(0xF0, 0x80, 0x10), Color(0x30, 0xA0, 0x30)]
+        expected = [Color('#FF7F0E'), Color('#2CA02C')]
+        self.assertEqual(brand.nearest_all(colors), expected)
+        self.assertEqual(brand.nearest_all(ColorArray.from_colors(colors)),
+                         expected)
+        self.assertEqual(Color.nearest_all(colors, ['black', 'white']),
+                         [Color.WHITE, Color.BLACK])
+        # The k-d tree must agree with a linear scan
+        css = Palette.css()
+        for n in range(0, 0xFFFFFF, 0x10101 * 7):
+            color = Color((n >> 16) & 0xFF, (n >> 8) & 0xFF, n & 0xFF)
+            best = min(css.colors, key=lambda c: sum(
+                (a - b) ** 2 for a, b in zip(c.rgb, color.rgb)))
+            self.assertEqual(sum((a - b) ** 2 for a, b in zip(
+                             best.rgb, color.rgb)), sum((a - b) ** 2 for a, b
+                             in zip(color.nearest().rgb, color.rgb)))
+        with self.assertRaises(SvgError):
+            Palette([])
+        lab = Palette(['#62F0F3', '#CB4D76'], space='lab')
+        rgb = Palette(['#62F0F3', '#CB4D76'])
+        color = Color('#4DC707')
+        self.assertEqual(rgb.nearest(color), Color('#CB4D76'))
+        self.assertEqual(lab.nearest(color), Color('#62F0F3'))
+
+
+    def test_quantize(self):
+        svg = Svg()
+        for i in range(8):
+            svg += Svg.Rect(i, 0, width=1, height=1, fill=Color(240 + i, 0, 0))
+            svg += Svg.Rect(i, 1, width=1, height=1, fill=Color(0, 0, 240 + i))
+        svg += Svg.Line(0, 0, 9, 9, stroke=Color(0, 0, 0xF8))
+        quantization = svg.quantize(2)
+        self.assertEqual(quantization.colors_before, 17)
+        self.assertEqual(quantization.colors_after, 2)
+        self.assertLessEqual(quantization.max_error, 5)
+        self.assertIsNone(svg.quantization)
+        text = svg.dumps(options=Svg.Options(max_colors=2))
+        self.assertEqual(quantization.bytes_before,
+                         len(svg.dumps().encode('utf-8')))
+        self.assertEqual(quantization.bytes_after, len(text.encode('utf-8')))
+        self.assertEqual(svg.quantization, quantization._replace(
+            bytes_before=None, bytes_after=None)) # only set by quantize()
+        self.assertEqual(text.count('fill:'), 16)
+        self.assertEqual(set(re.findall(r'(?:fill|stroke):([^;"]+)', text)),
+                         {'#F40000', '#0000F4'})
+        self.assertEqual(svg.quantize(17).recolor, {})
+        self.assertEqual(len(set(re.findall(r'(?:fill|stroke):([^;"]+)',
+                                            svg.dumps()))), 17)
+
+
+    def test_color_space(self):
+        colors = [Color.ORANGE, Color('#2CB'), Color.WHITE, Color.BLACK,
+                  Color(10, 200, 30)]
+        for to, from_ in ((Color.to_hsl, Color.from_hsl),
+                          (Color.to_hsv, Color.from_hsv),
+                          (Color.to_lab, Color.from_lab)):
+            self.assertEqual(list(from_(to(colors))), colors)
+        hsl = [tuple(round(v, 3) for v in value)
+               for value in Color.to_hsl(['red', 'lime', '#808080'])]
+        self.assertEqual(hsl, [(0, 1, 0.5), (120, 1, 0.5), (0, 0, 0.502)])
+        hsv = [tuple(round(v, 3) for v in value)
+               for value in Color.to_hsv(ColorArray.from_strings(['blue']))]
+        self.assertEqual(hsv, [(240, 1, 1)])
+        lab = [round(v, 2) for v in Color.to_lab([Color.RED])[0]]
+        self.assertEqual(lab, [53.24, 80.09, 67.2])
+        self.assertEqual(Color.from_hsl([(30, 0.5, 0.5, 0.5),
+                                         (390, 1, 0.25)]).strings(),
+                         ['#BF804080', '#804000'])
+        self.assertEqual(list(Color.luminance([Color.BLACK, Color.WHITE])),
+                         [0.0, 1.0])
+        self.assertEqual(list(Color.contrast_ratio(['black', 'white'],
+                                                   Color.WHITE)), [21.0, 1.0])
+        self.assertAlmostEqual(
+            Color.contrast_ratio([Color('#777')], [Color.WHITE])[0], 4.48,
+            places=2)
+        with self.assertRaises(SvgError):
+            Color.contrast_ratio(['black'], ['white', 'red'])
+
+
     def test_line(self):
         raw = Svg.Options(use_style=False)
         basic = Svg.Options()
@@ -203,6 +417,246 @@ style="stroke:#00FF7F"/>')
 style="stroke: #00FF7F"/>\n')
 
 
+    def test_shape_defaults(self):
+        basic = Svg.Options()
+        a = Svg.Circle(1, 2, radius=3)
+        b = Svg.Circle(4, 5, radius=6)
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertIsNone(a._stroke)
+        self.assertIsNone(a._fill)
+        self.assertIsNone(a._css_classes)
+        self.assertIsNone(a._css_style)
+        self.assertEqual(a.svg('', basic),
+                         '<circle cx="1" cy="2" r="3" style="fill:none"/>')
+        with self.assertRaises(SvgError):
+            a.stroke.width = 2 # the default stroke is shared
+        a.own_stroke().width = 2 # a now has a stroke of its own
+        a.own_fill().color = Color.RED
+        self.assertIsNotNone(a._stroke)
+        self.assertIs(a.own_stroke(), a.stroke)
+        self.assertEqual(a.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'style="stroke-width:2;fill:red"/>')
+        self.assertEqual(b.svg('', basic),
+                         '<circle cx="4" cy="5" r="6" style="fill:none"/>')
+        a.stroke = None
+        self.assertEqual(a.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'style="fill:red"/>')
+        self.assertTrue(a.add_css_class('dot'))
+        self.assertFalse(a.add_css_class('dot'))
+        a.add_css_style('cursor', 'pointer')
+        self.assertEqual(a.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'class="dot" style="fill:red; cursor: pointer"/>')
+        self.assertIsNone(b._css_classes)
+
+
+    def test_style_interning(self):
+        basic = Svg.Options()
+        circles = [Svg.Circle(i, i, radius=2, fill='red' if i % 2 else
+                              Color.RED) for i in range(500)]
+        self.assertEqual(len({id(circle._fill) for circle in circles}), 1)
+        shared = circles[0]._fill
+        self.assertTrue(shared.shared)
+        self.assertIs(Svg.Fill.intern(Svg.Fill(Color.RED)), shared)
+        with self.assertRaises(SvgError):
+            shared.opacity = 0.5
+        circle = circles[1]
+        self.assertIs(circle.fill, shared) # reading doesn't copy
+        self.assertEqual(circles[3].stroke.width, 1) # the default stroke
+        self.assertIsNone(circles[3]._stroke)
+        old = circles[4].fill
+        circles[4].fill = 'blue'
+        circles[2].fill = old
+        self.assertEqual(old.color, Color.RED) # old keeps its value
+        self.assertIs(circles[2]._fill, shared)
+        circle.own_fill().opacity = 0.5 # copy on write
+        self.assertFalse(circle._fill.shared)
+        self.assertIs(circle.own_fill(), circle.fill) # already its own
+        self.assertTrue(shared.shared)
+        self.assertEqual(shared.opacity, 1)
+        self.assertEqual(circle.svg('', basic), '<circle cx="1" cy="1" r="2" '
+                         'style="fill:red;fill-opacity:0.5"/>')
+        self.assertEqual(circles[2].svg('', basic), '<circle cx="2" cy="2" '
+                         'r="2" style="fill:red"/>')
+        line = Svg.Line(0, 0, 1, 1, stroke='blue')
+        self.assertIs(line._stroke, Svg.Stroke.intern(Color.BLUE))
+        line.stroke = Svg.Stroke(Color.BLUE) # own Strokes aren't shared
+        self.assertFalse(line._stroke.shared)
+        self.assertEqual(Svg.Circle(0, 0, radius=1, fill='none').svg(
+            '', basic), '<circle cx="0" cy="0" r="1" style="fill:none"/>')
+        self.assertEqual(str(Color.NONE), 'none')
+        self.assertIs(pickle.loads(pickle.dumps(shared)), shared)
+        wide = Svg.Stroke.intern(Svg.Stroke('red', 2.0))
+        self.assertIsNot(Svg.Stroke.intern(Svg.Stroke('red', 2)), wide)
+        self.assertIs(Svg.Stroke.intern(Svg.Stroke('red', 2.0)), wide)
+        self.assertEqual(Svg.Stroke.intern(Svg.Stroke('red', 2)).svg(
+            Svg.Options(strip_zeros=False)), 'stroke:red;stroke-width:2')
+        self.assertIsNot(Svg.Fill.intern(Svg.Fill('red', opacity=0.0)),
+                         Svg.Fill.intern(Svg.Fill('red', opacity=0)))
+        copy = pickle.loads(pickle.dumps(circle._fill))
+        self.assertFalse(copy.shared)
+        self.assertEqual(copy.opacity, 0.5)
+
+
+    def test_style_memo(self):
+        basic = Svg.Options()
+        attributes = Svg.Options(use_style=False)
+        stroke = Svg.Stroke('blue', dasharray=[4, 2])
+        circle = Svg.Circle(1, 2, radius=3, stroke=stroke, fill='red')
+        line = Svg.Line(0, 0, 5, 5, stroke=stroke)
+        self.assertEqual(circle.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'style="stroke:blue;stroke-dasharray:4 2;fill:red"/>')
+        self.assertIs(stroke.svg(basic), stroke.svg(basic)) # memoized
+        stroke.width = 2
+        stroke.dasharray = [1]
+        self.assertEqual(stroke.dasharray, (1,))
+        self.assertEqual(circle.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'style="stroke:blue;stroke-width:2;'
+                         'stroke-dasharray:1;fill:red"/>')
+        self.assertEqual(line.svg('', basic), '<line x1="0" y1="0" x2="5" '
+                         'y2="5" style="stroke:blue;stroke-width:2;'
+                         'stroke-dasharray:1"/>')
+        self.assertEqual(line.svg('', attributes), '<line x1="0" y1="0" '
+                         'x2="5" y2="5" stroke="blue" stroke-width="2" '
+                         'stroke-dasharray="1"/>')
+        circle.own_fill().fillrule = Svg.Fill.EVENODD
+        self.assertEqual(circle.svg('', basic), '<circle cx="1" cy="2" r="3" '
+                         'style="stroke:blue;stroke-width:2;'
+                         'stroke-dasharray:1;fill:red;fill-rule:evenodd"/>')
+        circle.add_css_style('cursor', 'move')
+        self.assertTrue(circle.svg('', basic).endswith(
+                        'fill-rule:evenodd; cursor: move"/>'))
+        # Two shapes sharing one (changeable) Stroke with different Fills:
+        # rebuilding one's cached style text mustn't revalidate the other's
+        svg = Svg()
+        svg += Svg.Circle(0, 0, radius=1, stroke=stroke, fill='red')
+        svg += Svg.Circle(0, 0, radius=1, stroke=stroke, fill='lime')
+        self.assertEqual(svg.dumps(options=basic).count('stroke-width:2'), 2)
+        stroke.width = 3
+        text = svg.dumps(options=basic)
+        self.assertEqual(text.count('stroke-width:3'), 2)
+        self.assertNotIn('stroke-width:2', text)
+
+
+    def test_extract_styles(self):
+        svg = Svg()
+        for i in range(4):
+            circle = Svg.Circle(i, i, radius=2, fill='red' if i % 2 else
+                                Color.BLUE, stroke=Svg.Stroke(width=2))
+            if i == 3:
+                circle.add_css_class('hot')
+            svg += circle
+        svg += Svg.Line(0, 0, 1, 1) # no style so no class
+        svg += Svg.CircleBatch([5, 6], [5, 6], [1, 1], fill=['red', 'lime'])
+        text = svg.dumps(options=Svg.Options(extract_styles=True))
+        self.assertIn('<style>.svg2-s0{stroke-width:2;fill:blue}'
+                      '.svg2-s1{stroke-width:2;fill:red}'
+                      '.svg2-s2{fill:red}.svg2-s3{fill:lime}</style>'
+                      '<circle cx="0" cy="0" r="2" class="svg2-s0"/>'
+                      '<circle cx="1" cy="1" r="2" class="svg2-s1"/>'
+                      '<circle cx="2" cy="2" r="2" class="svg2-s0"/>'
+                      '<circle cx="3" cy="3" r="2" class="hot svg2-s1"/>'
+                      '<line x1="0" y1="0" x2="1" y2="1"/>'
+                      '<circle cx="5" cy="5" r="1" class="svg2-s2"/>'
+                      '<circle cx="6" cy="6" r="1" class="svg2-s3"/>'
+                      '</svg>', text)
+        text = svg.dumps(options=Svg.Options.pretty(extract_styles=True))
+        self.assertIn('<style>\n  .svg2-s0 {stroke-width: 2; fill: blue}\n',
+                      text)
+        other = Svg() # classes are numbered afresh for each document
+        circle = Svg.Circle(0, 0, radius=1, fill='lime')
+        circle.add_css_class('s0') # and don't clash with the user's
+        other += circle
+        self.assertIn('<style>.svg2-s0{fill:lime}</style><circle cx="0" '
+                      'cy="0" r="1" class="s0 svg2-s0"/>', other.dumps(
+                          options=Svg.Options(extract_styles=True)))
+        names = [_class_name(i) for i in range(1300)]
+        self.assertEqual(len(set(names)), 1300)
+        self.assertEqual(names[35:38], ['svg2-sz', 'svg2-s10', 'svg2-s11'])
+        text = svg.dumps()
+        self.assertNotIn('<style>', text)
+        self.assertIn('class="hot" style="stroke-width:2;fill:red"', text)
+
+
+    def test_batches(self):
+        basic = Svg.Options()
+        pretty = Svg.Options.pretty()
+        zeros = Svg.Options(strip_zeros=False) # 1 vs 1.0
+        xs = [10, 20.5, 30]
+        ys = [15, 25, 35.25]
+        sizes = [1, 2, 3]
+        fills = ['red', Color.BLUE, None]
+        circles = Svg.CircleBatch(xs, ys, sizes, fill=fills,
+                                  stroke=Svg.Stroke('green', width=2))
+        self.assertEqual(len(circles), 3)
+        circles.add(4.0, 5, 6, fill=None)
+        xs.append(4.0)
+        ys.append(5)
+        sizes.append(6)
+        fills.append(None)
+        for options in (basic, pretty, zeros):
+            self.assertEqual(circles.svg('  ', options), ''.join(
+                Svg.Circle(x, y, radius=r, fill=fill,
+                           stroke=Svg.Stroke('green', width=2)).svg(
+                               '  ', options)
+                for x, y, r, fill in zip(xs, ys, sizes, fills)))
+        self.assertIn('<circle cx="4.0" cy="5" r="6" ',
+                      circles.svg('', zeros))
+        self.assertIn('<line x1="1" y1="1.0" x2="2" y2="2.5"',
+                      Svg.LineBatch(array.array('i', [1]), array.array(
+                          'd', [1]), iter([2]), [2.5]).svg('', zeros))
+        rects = Svg.RectBatch(array.array('d', xs), ys, sizes, sizes,
+                              fill='yellow')
+        rects.add_css_class('bar')
+        rects.add(1, 2, 3, 4)
+        self.assertEqual(rects.svg('', basic).count('<rect '), 5)
+        self.assertTrue(rects.svg('', basic).endswith(
+            '<rect x="1" y="2" width="3" height="4" class="bar" '
+            'style="fill:#FF0"/>'))
+        with self.assertRaises(SvgError):
+            rects.add(1, 2, 3, 4, fill='red') # fill is shared
+        with self.assertRaises(SvgError):
+            Svg.LineBatch([1, 2], [1], [1], [1])
+        lines = Svg.LineBatch(stroke=[])
+        lines.extend([0, 1], [0, 1], [5, 6], [5, 6], strokes=['red', None])
+        svg = Svg()
+        svg += lines
+        self.assertIn('<line x1="0" y1="0" x2="5" y2="5" '
+                      'style="stroke:red"/><line x1="1" y1="1" x2="6" '
+                      'y2="6"/></svg>', svg.dumps())
+        self.assertEqual(svg.quantize(1).colors_before, 1)
+
+
+    def test_number(self):
+        values = [0, 3, -7, 3.0, -0.0, 2.5, 0.30000000000000004, -0.0001,
+                  1e16, 1e15, 123.456789, -2.004, 1e-7]
+        for precision in (None, 0, 2):
+            for strip_zeros in (True, False):
+                options = Svg.Options(precision=precision,
+                                      strip_zeros=strip_zeros)
+                self.assertEqual(nums(values, options),
+                                 [num(value, options) for value in values])
+        options = Svg.Options(precision=2)
+        self.assertEqual(nums(values, options), [
+            '0', '3', '-7', '3', '0', '2.5', '0.3', '0', '10000000000000000',
+            '1000000000000000', '123.46', '-2', '0'])
+        self.assertEqual(nums(values[:7], Svg.Options()), [
+            '0', '3', '-7', '3', '0', '2.5', '0.30000000000000004'])
+        self.assertEqual(nums(values[:6], Svg.Options(strip_zeros=False)),
+                         ['0', '3', '-7', '3.0', '-0.0', '2.5'])
+        self.assertEqual(num(3, Svg.Options(precision=1, strip_zeros=False)),
+                         '3.0')
+        line = Svg.Line(0.1 + 0.2, 1 / 3, 2.0, 4, stroke=Svg.Stroke(
+            'red', width=0.5000001, dasharray=[2, 1.25]))
+        self.assertEqual(line.svg('', Svg.Options(precision=3)),
+                         '<line x1="0.3" y1="0.333" x2="2" y2="4" '
+                         'style="stroke:red;stroke-width:0.5;'
+                         'stroke-dasharray:2 1.25"/>')
+        polyline = Svg.Polyline([0.125, 1 / 3, 10, 20.5])
+        self.assertEqual(polyline.svg('', Svg.Options.pretty(precision=1)),
+                         '<polyline points="0.1,0.3 10,20.5" '
+                         'style="fill: none"/>\n')
+
+
     def test_polyline(self):
         basic = Svg.Options()
         pretty = Svg.Options.pretty()
@@ -219,6 +673,456 @@ style="stroke:#F0F;stroke-width:1.5;fill:#F5FFFA"/>')
         self.assertEqual(polyline.svg('', pretty), '\
 <polyline points="50,375 150,375 150,325 250,325 250,375" \
 style="stroke: #F0F; stroke-width: 1.5; fill: #F5FFFA"/>\n')
+        self.assertIsInstance(polyline.points, array.array)
+        self.assertEqual(len(polyline), 5)
+        polygon = Svg.Polygon(memoryview(array.array('d', points[:6])))
+        polygon.add(0.5, 2)
+        with self.assertRaises(SvgError):
+            polygon.extend([1, 2, 3])
+        self.assertEqual(len(polygon), 4) # the failed extend() had no effect
+        polygon.extend(array.array('i', [7, 8]))
+        self.assertEqual(polygon.svg('', basic), '<polygon points="50 375 '
+                         '150 375 150 325 0.5 2 7 8" style="fill:none"/>')
+        zeros = Svg.Options(strip_zeros=False) # ints as for Line etc.
+        self.assertEqual(polygon.svg('', zeros), '<polygon points="50.0 '
+                         '375.0 150.0 375.0 150.0 325.0 0.5 2 7 8" '
+                         'style="fill:none"/>')
+        polyline.extend(iter([1.0, 2]))
+        polyline.add(3, 4.0)
+        self.assertEqual(polyline.svg('', zeros), '<polyline points="50 375 '
+                         '150 375 150 325 250 325 250 375 1.0 2 3 4.0" '
+                         'style="stroke:#F0F;stroke-width:1.5;fill:#F5FFFA"/>')
+        polygon.clear()
+        self.assertEqual(polygon.svg('', basic), '')
+        with self.assertRaises(SvgError):
+            polygon.set((1, 2, 3))
+
+
+    def test_writer(self):
+        def shapes():
+            yield Svg.Circle(1, 2, radius=3, fill='red')
+            group = Group('g1')
+            group += Svg.Line(0, 0, 4, 4, stroke='blue')
+            yield group
+            yield Svg.CircleBatch([5, 6], [5, 6], [1, 1], fill='lime')
+
+        pretty = Svg.Options.pretty()
+        svg = Svg('Streamed')
+        for shape in shapes():
+            svg += shape
+        out = io.StringIO()
+        with Svg.Writer(out, 'Streamed', options=pretty) as writer:
+            for shape in shapes():
+                writer += shape
+        self.assertEqual(writer.count, 3)
+        self.assertEqual(out.getvalue(), svg.dumps(options=pretty))
+        with self.assertRaises(SvgError):
+            writer += Svg.Circle(1, 1, radius=1)
+        with self.assertRaises(SvgError):
+            Svg.Writer(out, options=Svg.Options(extract_styles=True))
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'streamed.svgz')
+            with Svg.Writer(filename, 'Streamed') as writer:
+                for shape in shapes():
+                    writer.add(shape)
+            with gzip.open(filename, 'rt', encoding='utf-8') as file:
+                self.assertEqual(file.read(), svg.dumps())
+
+
+    def test_chunked_write(self):
+        class Out(io.BytesIO):
+            writes = 0
+
+            def write(self, data):
+                Out.writes += 1
+                return super().write(data)
+
+        svg = Svg('Chunked ©')
+        for i in range(1000):
+            svg += Svg.Circle(i, i, radius=2, fill='red')
+        text = svg.dumps()
+        for chunk_size, writes in ((0, 1007), (1000, 50), (0x10000, 1)):
+            out = Out()
+            Out.writes = 0
+            svg.write(out, Svg.Options(chunk_size=chunk_size))
+            self.assertEqual(out.getvalue().decode('utf-8'), text)
+            self.assertEqual(Out.writes, writes)
+        out = io.BytesIO()
+        with Svg.Writer(out, 'Chunked ©') as writer:
+            for shape in svg._shapes:
+                writer += shape
+        self.assertEqual(out.getvalue(), text.encode('utf-8'))
+
+
+    def test_compress(self):
+        svg = Svg('Compressed')
+        for i in range(20_000):
+            svg += Svg.Circle(i, i % 97, radius=i % 5, fill='red')
+        text = svg.dumps().encode('utf-8')
+        sizes = {}
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'test.svgz')
+            for compresslevel, compress_threads in ((1, 1), (9, 1), (1, 4),
+                                                    (9, 4), (6, None)):
+                options = Svg.Options(compresslevel=compresslevel,
+                                      compress_threads=compress_threads)
+                svg.save(filename, options=options)
+                with gzip.open(filename) as file:
+                    self.assertEqual(file.read(), text)
+                sizes[compresslevel, compress_threads] = os.path.getsize(
+                    filename)
+                with Svg.Writer(filename, 'Compressed',
+                                options=options) as writer:
+                    for shape in svg._shapes:
+                        writer += shape
+                with gzip.open(filename) as file:
+                    self.assertEqual(file.read(), text)
+        self.assertLess(sizes[9, 1], sizes[1, 1])
+        self.assertLess(sizes[9, 4], sizes[1, 4])
+
+
+    def test_parallel_write(self):
+        svg = Svg('Parallel')
+        strokes = [Svg.Stroke(color, width=1.5) for color in
+                   ('red', 'green', 'blue')]
+        for i in range(1000):
+            svg += Svg.Circle(i, i / 3, radius=2, fill='#ABC',
+                              stroke=strokes[i % 3])
+            if i % 100 == 0:
+                group = Group(f'g{i}')
+                group += Svg.Rect(i, i, width=3, height=4, fill='yellow')
+                svg += group
+                svg += Svg.Polyline([i, i, i + 0.5, i + 1])
+                svg += Svg.CircleBatch([i, i + 1], [2, 3], [1, 1],
+                                       fill=['red', 'blue'])
+        for options in (Svg.Options(), Svg.Options.pretty(precision=2),
+                        Svg.Options(extract_styles=True),
+                        Svg.Options(max_colors=2)):
+            text = svg.dumps(options=options)
+            self.assertEqual(svg.dumps(options=options._replace(
+                workers=3, worker_chunk_size=97)), text)
+        out = io.BytesIO()
+        svg.write(out, Svg.Options(workers=2, worker_chunk_size=500))
+        self.assertEqual(out.getvalue(), svg.dumps().encode('utf-8'))
+        done = threading.Event() # with another thread the shapes are
+        thread = threading.Thread(target=done.wait) # pickled not forked
+        thread.start()
+        try:
+            self.assertEqual(svg.dumps(options=Svg.Options(
+                workers=2, worker_chunk_size=500)), svg.dumps())
+        finally:
+            done.set()
+            thread.join()
+
+
+    def test_load(self):
+        svg = Svg('Round & trip ©', 'A description')
+        svg += Svg.Line(1, 2, 3.5, 4, stroke=Svg.Stroke(
+            'blue', 2.5, opacity=0.5, linecap=Svg.Stroke.LineCap.ROUND,
+            dasharray=[1, 2.5]))
+        svg += Svg.Rect(0, 0, width=10, height=20, fill='red')
+        circle = Svg.Circle(5, 5, radius=1 / 3, stroke='green',
+                            fill=Svg.Fill('#ABC', opacity=0.25,
+                                          fillrule=Svg.Fill.EVENODD))
+        circle.add_css_class('dot')
+        circle.add_css_style('cursor', 'pointer')
+        svg += circle
+        svg += Svg.Ellipse(1, 2, xradius=3, yradius=4)
+        group = Group('g1')
+        group += Svg.Polyline([1, 2, 3.25, 4])
+        group += Svg.Polygon([5, 6, 7, 8, 9, 10], fill='none')
+        svg += group
+        svg += Svg.Text(3, 4, 'a < b & "c"', fill='black')
+        for options in (Svg.Options(), Svg.Options.pretty(),
+                        Svg.Options(use_style=False),
+                        Svg.Options(extract_styles=True),
+                        Svg.Options.pretty(extract_styles=True)):
+            text = svg.dumps(options=options)
+            self.assertEqual(Svg.loads(text).dumps(options=options), text)
+            self.assertEqual(Svg.loads(text.encode('utf-8')).dumps(
+                options=options), text)
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ('test.svg', 'test.svgz'):
+                filename = os.path.join(folder, name)
+                svg.save(filename)
+                self.assertEqual(Svg.load(filename).dumps(), svg.dumps())
+        loaded = Svg.loads('''<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="100px">
+<defs><linearGradient id="x"><stop offset="0"/></linearGradient></defs>
+<g><circle cx="1px" cy="2" r="3"><title>skipped</title></circle>
+<path d="M 0 0 L 1 1"/></g>
+<rect x="1" y="2" width="3" height="4" fill="none" stroke="red"
+ style="stroke-width: 2; opacity: 0.5"/>
+</svg>''')
+        self.assertIsNone(loaded.title)
+        self.assertEqual(len(loaded._shapes), 2) # path and defs skipped
+        self.assertEqual(loaded.dumps().split('\n')[-2], (
+            '<circle cx="1" cy="2" r="3"/><rect x="1" y="2" width="3" '
+            'height="4" style="stroke:red;stroke-width:2;fill:none; '
+            'opacity: 0.5"/></svg>')) # the circle's fill is black
+        loaded = Svg.loads('''<svg xmlns="http://www.w3.org/2000/svg">
+<defs><style>.cls-1 { fill: red; stroke-width: 0.5mm }</style></defs>
+<rect class="cls-1" x="1.5" y="2" width="50%" height="2.5em"/></svg>''')
+        for options in (Svg.Options(), Svg.Options(precision=2),
+                        Svg.Options(strip_zeros=False)):
+            self.assertEqual(loaded.dumps(options=options).split('\n')[-2],
+                             '<rect x="1.5" y="2" width="50%" height="2.5em" '
+                             'style="stroke-width:0.5mm;fill:red"/></svg>')
+        for text in ('<svg><circle r="1"', '<svg><rect x="1"/></svg>',
+                     '<svg><circle r="x"/></svg>', '<circle r="1"/>',
+                     '<svg><circle r="1 mm"/></svg>'):
+            with self.assertRaises(SvgError):
+                Svg.loads(text)
+
+
+    def test_lazy(self):
+        svg = Svg('Lazy')
+        for i in range(3000): # enough for several of LazySvg's blocks
+            svg += Svg.Circle(i, i / 8, radius=2, fill='red')
+        head = '''<?xml version="1.0"?>
+<!DOCTYPE svg [<!ENTITY e "<g>">]>
+<svg xmlns="http://www.w3.org/2000/svg">
+<style>.hot { fill: red }</style>
+<!-- <rect/> --><g id="g1"><defs><style>.cold { stroke: blue }</style>
+</defs><rect width="1" height="2"/><g/></g>
+<text x="1" y="2" id='t' title="a > b/>"><![CDATA[</text>]]></text>
+<circle data-id="x" class="hot cold" id="c1" r="3"/>
+<path d="M 0 0"/>\n'''
+        text = svg.dumps(options=Svg.Options.pretty())
+        text = head + text[text.index('<circle'):]
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'test.svg')
+            with open(filename, 'w', encoding='utf-8') as file:
+                file.write(text)
+            target = os.path.join(folder, 'new.svg')
+            with Svg.Lazy(filename) as lazy:
+                self.assertEqual(len(lazy), 3005)
+                self.assertEqual([lazy.tag(i) for i in range(6)],
+                                 ['style', 'g', 'text', 'circle', 'path',
+                                  'circle'])
+                self.assertEqual(lazy.index('g1'), 1)
+                self.assertEqual(lazy.index('t'), 2)
+                self.assertEqual(lazy.index('c1'), 3)
+                with self.assertRaises(SvgError):
+                    lazy.index('x')
+                self.assertIsNone(lazy.get('x'))
+                self.assertIsNone(lazy[4]) # <path> isn't supported
+                self.assertEqual(lazy[2].text, '</text>')
+                self.assertEqual(lazy[-1].svg('', Svg.Options()),
+                                 '<circle cx="2999" cy="374.875" r="2" '
+                                 'style="fill:red"/>')
+                with self.assertRaises(IndexError):
+                    lazy[3005]
+                lazy.save(target) # only read so copied unchanged
+                with open(target, encoding='utf-8') as file:
+                    self.assertEqual(file.read(), text)
+                lazy.get('c1').radius = 4
+                lazy[6] = Svg.Rect(1, 2, width=3, height=4)
+                del lazy[7]
+                lazy += Svg.Line(1, 2, 3, 4)
+                with self.assertRaises(SvgError):
+                    lazy.save(filename)
+                lazy.save(target)
+            with open(target, encoding='utf-8') as file:
+                new = file.read()
+            self.assertEqual(new, text.replace(
+                '<circle data-id="x" class="hot cold" id="c1" r="3"/>',
+                '<circle id="c1" cx="0" cy="0" r="4" '
+                'style="stroke:blue;fill:red"/>').replace(
+                '<circle cx="1" cy="0.125" r="2" style="fill: red"/>',
+                '<rect x="1" y="2" width="3" height="4" '
+                'style="fill:none"/>').replace(
+                '<circle cx="2" cy="0.25" r="2" style="fill: red"/>',
+                '').replace('</svg>', '<line x1="1" y1="2" x2="3" y2="4"/>'
+                            '</svg>'))
+            for text in (b'', b'<svg><circle/>', b'<svg/>',
+                         b'<circle r="1"/>', gzip.compress(b'<svg></svg>')):
+                with open(filename, 'wb') as file:
+                    file.write(text)
+                with self.assertRaises(SvgError):
+                    Svg.Lazy(filename)
+
+
+    def test_incremental(self):
+        svg = Svg('Incremental')
+        circles = [Svg.Circle(i, i, radius=2, fill='red')
+                   for i in range(100)]
+        for circle in circles:
+            svg += circle
+        polyline = Svg.Polyline([1, 2, 3, 4])
+        svg += polyline
+        batch = Svg.CircleBatch([1, 2], [3, 4], [5, 6], fill='blue')
+        svg += batch
+        group = Group('g')
+        group += Svg.Rect(1, 2, width=3, height=4)
+        svg += group
+        options = Svg.Options(incremental=True)
+
+        def check(reused, rebuilt, options=options):
+            self.assertEqual(svg.dumps(options=options),
+                             svg.dumps(options=options._replace(
+                                 incremental=False)))
+            self.assertEqual(svg.fragments, (reused, rebuilt))
+            self.assertEqual(svg.dumps(options=options),
+                             svg.dumps(options=options._replace(
+                                 incremental=False)))
+
+        self.assertIsNone(svg.fragments)
+        svg.dumps(options=options)
+        self.assertEqual(svg.fragments, (0, 103))
+        check(102, 1) # the Group is always rebuilt
+        circles[5].x = 50
+        circles[6].fill = 'green'
+        check(100, 3)
+        self.assertEqual(circles[7].stroke.width, 1) # reading doesn't
+        check(102, 1) # change circles[7]
+        circles[7].own_stroke().width = 3 # but changing it does
+        check(101, 2)
+        polyline.add(5, 6)
+        batch.add(7, 8, 9)
+        circles[8].add_css_class('dot')
+        check(99, 4)
+        for options in (Svg.Options.pretty(incremental=True),
+                        Svg.Options(incremental=True, extract_styles=True)):
+            svg.dumps(options=options)
+            self.assertEqual(svg.fragments, (0, 103))
+            check(102, 1, options)
+        # Back to back incremental dumps (i.e., with no others to refresh
+        # the styles' memos) after changes made in place
+        svg = Svg()
+        a = Svg.Circle(0, 0, radius=1, stroke=Svg.Stroke('red'))
+        svg += a
+        polyline = Svg.Polyline([1, 2, 3, 4])
+        svg += polyline
+        points = polyline.points # kept, e.g., as a numpy.frombuffer()
+        options = Svg.Options(incremental=True, strip_zeros=False)
+        svg.dumps(options=options)
+        svg.dumps(options=options)
+        self.assertEqual(svg.fragments, (2, 0))
+        a.stroke.color = Color.LIME # a's own Stroke
+        points[0] = 9.5
+        text = svg.dumps(options=options)
+        self.assertEqual(svg.fragments, (0, 2))
+        self.assertIn('stroke:lime', text)
+        self.assertIn('points="9.5 2 3 4"', text)
+        a.radius = 1.0 # equal but written differently
+        self.assertIn('r="1.0"', svg.dumps(options=options))
+        self.assertEqual(svg.fragments, (1, 1))
+
+
+    def test_template(self):
+        def tile(title, width, bars):
+            svg = Svg('Tile')
+            for i in range(5):
+                svg += Svg.Line(0, i * 10, 100, i * 10, stroke='gray')
+            svg += Svg.Text(5, 5, title, fill='black')
+            svg += Svg.Rect(0, 90, width=width, height=10, fill='blue')
+            group = Group('bars')
+            group += bars
+            svg += group
+            return svg
+
+        options = Svg.Options.pretty(precision=1)
+        template = Svg.Template(tile(Svg.Slot('title'), Svg.Slot('width'),
+                                     Svg.Slot('bars')), options=options)
+        self.assertEqual(template.names, {'title', 'width', 'bars'})
+        for title, width in (('Q1 <"&">', 12.25), ('Q2 ©', 7)):
+            bars = [Svg.Rect(i, 0, width=1, height=i * 1.5, fill='red')
+                    for i in range(10)]
+            expected = tile(title, width, bars[0]).dumps(options=options)
+            expected = expected.replace( # Group only holds bars[0]
+                bars[0].svg('  ', options),
+                ''.join(bar.svg('  ', options) for bar in bars))
+            expected = expected.replace(esc(title),
+                                        esc(title, {'"': '&quot;'}))
+            self.assertEqual(template.renders(title=title, width=width,
+                                              bars=bars), expected)
+            self.assertEqual(template.render(title=title, width=width,
+                                             bars=bars),
+                             expected.encode('utf-8'))
+        with self.assertRaises(SvgError):
+            template.render(title='x', width=1)
+        with self.assertRaises(SvgError):
+            Svg.Slot('not a name')
+        self.assertEqual(pickle.loads(pickle.dumps(Svg.Slot('x'))).name,
+                         'x')
+        with self.assertRaises(SvgError):
+            Svg.Template(Svg(), options=Svg.Options(extract_styles=True))
+        bar = Svg.Rect(0, 0, width=1, height=1)
+        for values in ((Svg.Slot('title'), 1, bar), ('t', Svg.Slot('w'), bar),
+                       ('t', 1, Svg.Slot('bars'))): # not in a template
+            svg = tile(*values)
+            for options in (Svg.Options(), options):
+                with self.assertRaises(SvgError): # rather than write \0s
+                    svg.dumps(options=options)
+
+
+    def test_dumpb(self):
+        svg = Svg('Bytes ©')
+        for i in range(5000):
+            svg += Svg.Circle(i, i, radius=2, fill='red')
+        text = svg.dumps().encode('utf-8')
+        self.assertEqual(svg.dumpb(), text)
+        self.assertIsInstance(svg.dumpb(), bytes)
+        view = svg.dumpb(view=True)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view, text)
+        pretty = Svg.Options.pretty()
+        self.assertEqual(svg.dumpb(options=pretty),
+                         svg.dumps(options=pretty).encode('utf-8'))
+
+
+    def test_async(self):
+        svg = Svg('Async ©')
+        for i in range(2500):
+            svg += Svg.Circle(i, i, radius=2, fill='red')
+        text = svg.dumps().encode('utf-8')
+
+        class Writer:
+            def __init__(self):
+                self.chunks = []
+                self.drains = 0
+
+            def write(self, data):
+                self.chunks.append(data)
+
+            async def drain(self):
+                self.drains += 1
+
+        async def main():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            ticker = asyncio.ensure_future(tick())
+            chunks = [chunk async for chunk in svg.aiter_bytes(
+                      options=Svg.Options(chunk_size=1000))]
+            self.assertEqual(b''.join(chunks), text)
+            self.assertGreater(len(chunks), 50)
+            self.assertGreaterEqual(ticks, 3) # one per slice of 1000
+            writer = Writer()
+            await svg.awrite(writer, slice_size=100)
+            self.assertEqual(b''.join(writer.chunks), text)
+            self.assertEqual(writer.drains, len(writer.chunks))
+            big = Svg() # a Group's and batch's shapes are sliced too
+            group = Group('g1')
+            group += Svg.CircleBatch(range(2500), range(2500), [1] * 2500)
+            group += Svg.Line(0, 0, 1, 1)
+            big += group
+            for options in (Svg.Options(), Svg.Options.pretty()):
+                before = ticks
+                chunks = [chunk async for chunk in big.aiter_bytes(
+                          options=options)]
+                self.assertEqual(b''.join(chunks),
+                                 big.dumpb(options=options))
+                self.assertGreaterEqual(ticks - before, 3)
+            ticker.cancel()
+
+        asyncio.run(main())
 
 
     def test_dumps(self):